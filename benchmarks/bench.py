@@ -0,0 +1,331 @@
+"""Offline latency, throughput, memory and recall benchmarks.
+
+Runs entirely offline: every Retriever gets its model from a registry that loads
+``HashingEncoder``, a deterministic model-free encoder, and documents and queries come
+from a seeded synthetic corpus. Numbers are therefore comparable across runs and
+machines of the same kind, but exclude real model inference time.
+
+Usage::
+
+    python benchmarks/bench.py --docs 20000 --queries 500 --output results.json
+    python benchmarks/bench.py --compare baseline.json results.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from conversational_rag.backends import (
+    BinaryBackend,
+    ExactBackend,
+    Int8Backend,
+    IVFBackend,
+    SearchBackend,
+)
+from conversational_rag.encoders import EncoderRegistry, HashingEncoder
+from conversational_rag.models import Message
+from conversational_rag.pipeline import ConversationalRAG
+from conversational_rag.reformulator import QueryReformulator
+from conversational_rag.retriever import Retriever
+
+DEFAULT_DOCS = 10_000
+DEFAULT_QUERIES = 200
+DEFAULT_TOP_K = 5
+DEFAULT_DIM = 384
+DEFAULT_VOCABULARY = 5_000
+DOC_WORDS = (20, 60)
+QUERY_WORDS = (3, 8)
+WARMUP_QUERIES = 10
+BENCHMARKS = ("index", "search", "reformulate", "query")
+
+BACKENDS: dict[str, Callable[[], SearchBackend]] = {
+    "exact": ExactBackend,
+    "ivf": IVFBackend,
+    "int8": Int8Backend,
+    "binary": BinaryBackend,
+}
+
+
+STUB_REGISTRY = EncoderRegistry(loader=lambda _: HashingEncoder(dim=DEFAULT_DIM))
+
+
+def synthetic_corpus(
+    n_docs: int, n_queries: int, seed: int = 0, vocabulary: int = DEFAULT_VOCABULARY
+) -> tuple[list[str], list[str]]:
+    """Generate Zipf-distributed documents and queries sampled from them.
+
+    Args:
+        n_docs: Number of documents.
+        n_queries: Number of queries.
+        seed: Random seed.
+        vocabulary: Number of distinct words.
+
+    Returns:
+        (documents, queries). Each query is a few words drawn from a random document.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, vocabulary + 1)
+    weights /= weights.sum()
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+
+    documents = []
+    for _ in range(n_docs):
+        length = rng.integers(*DOC_WORDS)
+        documents.append(" ".join(words[rng.choice(vocabulary, size=length, p=weights)]))
+
+    queries = []
+    for doc in rng.integers(0, n_docs, size=n_queries):
+        tokens = documents[doc].split()
+        length = min(len(tokens), int(rng.integers(*QUERY_WORDS)))
+        picked = rng.choice(len(tokens), size=length, replace=False)
+        queries.append(" ".join(tokens[i] for i in sorted(picked)))
+    return documents, queries
+
+
+def latency_summary(latencies: Sequence[float]) -> dict[str, float]:
+    """Summarize per-call latencies given in seconds.
+
+    Args:
+        latencies: Wall-clock duration of each call.
+
+    Returns:
+        p50/p95/p99/mean latency in milliseconds and throughput in calls per second.
+    """
+    values = np.asarray(latencies, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(values.mean()),
+        "qps": float(len(values) / (values.sum() / 1000.0)) if values.sum() > 0 else 0.0,
+    }
+
+
+def recall_at_k(found: Sequence[Sequence[str]], expected: Sequence[Sequence[str]]) -> float:
+    """Fraction of the exact top-k documents that an approximate search also returned.
+
+    Args:
+        found: Approximate result texts per query.
+        expected: Exact result texts per query.
+
+    Returns:
+        Mean recall over all queries.
+    """
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found, expected))
+    total = sum(len(e) for e in expected)
+    return hits / total if total else 1.0
+
+
+def timed(fn: Callable[[Any], Any], inputs: Sequence[Any]) -> tuple[list[Any], list[float]]:
+    """Call ``fn`` on every input after a short warm-up.
+
+    Returns:
+        (outputs, latencies_in_seconds).
+    """
+    for item in inputs[:WARMUP_QUERIES]:
+        fn(item)
+    outputs, latencies = [], []
+    for item in inputs:
+        start = time.perf_counter()
+        outputs.append(fn(item))
+        latencies.append(time.perf_counter() - start)
+    return outputs, latencies
+
+
+def peak_memory_mb(fn: Callable[[], Any]) -> tuple[Any, float]:
+    """Run ``fn`` under tracemalloc and return its result and peak traced allocation in MiB."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / 2**20
+
+
+def bench_index(documents: list[str], **_: Any) -> dict[str, Any]:
+    """Time a full index build, then trace a second build for its peak memory."""
+    start = time.perf_counter()
+    Retriever(registry=STUB_REGISTRY, query_cache_size=0).index(documents)
+    elapsed = time.perf_counter() - start
+    _, peak = peak_memory_mb(
+        lambda: Retriever(registry=STUB_REGISTRY, query_cache_size=0).index(documents)
+    )
+    return {
+        "seconds": elapsed,
+        "docs_per_second": len(documents) / elapsed,
+        "peak_memory_mb": peak,
+    }
+
+
+def bench_search(documents: list[str], queries: list[str], top_k: int) -> dict[str, Any]:
+    """Time single-query search per backend and mode, with recall against exact search.
+
+    Each backend also reports ``scan``, the latency of searching already-encoded queries,
+    which isolates the nearest-neighbour scan from query encoding.
+    """
+    exact = Retriever(registry=STUB_REGISTRY, query_cache_size=0)
+    exact.index(documents)
+    expected = [[text for text, _ in exact.search(q, top_k)] for q in queries]
+    encoded = list(exact.encode_queries(queries))
+
+    results: dict[str, Any] = {}
+    for name, factory in BACKENDS.items():
+        retriever = Retriever(registry=STUB_REGISTRY, query_cache_size=0, backend=factory())
+        _, build_peak = peak_memory_mb(lambda r=retriever: r.index(documents))
+        found, latencies = timed(lambda q, r=retriever: r.search(q, top_k), queries)
+        _, scan_latencies = timed(lambda e, r=retriever: r.search_embeddings(e, top_k), encoded)
+        results[name] = {
+            **latency_summary(latencies),
+            "recall_at_k": recall_at_k([[t for t, _ in f] for f in found], expected),
+            "index_peak_memory_mb": build_peak,
+            "scan": latency_summary(scan_latencies),
+        }
+
+    for mode in ("lexical", "hybrid"):
+        found, latencies = timed(lambda q, m=mode: exact.search(q, top_k, mode=m), queries)
+        results[mode] = {
+            **latency_summary(latencies),
+            "recall_at_k": recall_at_k([[t for t, _ in f] for f in found], expected),
+        }
+
+    start = time.perf_counter()
+    exact.search_batch(queries, top_k)
+    elapsed = time.perf_counter() - start
+    results["exact_batch"] = {"qps": len(queries) / elapsed, "batch_size": len(queries)}
+    return results
+
+
+def bench_reformulate(queries: list[str], **_: Any) -> dict[str, Any]:
+    """Time follow-up reformulation against a short synthetic history."""
+    reformulator = QueryReformulator()
+    history = [
+        Message(role="user", content=queries[0]),
+        Message(role="assistant", content=queries[-1]),
+    ]
+    followups = [f"what about it {query}" for query in queries]
+    _, latencies = timed(lambda q: reformulator.reformulate(q, history), followups)
+    return latency_summary(latencies)
+
+
+def bench_query(documents: list[str], queries: list[str], top_k: int) -> dict[str, Any]:
+    """Time end-to-end pipeline queries within one conversation."""
+    rag = ConversationalRAG(retriever=Retriever(registry=STUB_REGISTRY, query_cache_size=0))
+    rag.index(documents)
+    _, latencies = timed(lambda q: rag.query(q, top_k=top_k), queries)
+    return latency_summary(latencies)
+
+
+def run(
+    n_docs: int = DEFAULT_DOCS,
+    n_queries: int = DEFAULT_QUERIES,
+    top_k: int = DEFAULT_TOP_K,
+    seed: int = 0,
+    benchmarks: Sequence[str] = BENCHMARKS,
+) -> dict[str, Any]:
+    """Run the selected benchmarks and return a JSON-serializable report.
+
+    Args:
+        n_docs: Synthetic corpus size.
+        n_queries: Number of timed queries per benchmark.
+        top_k: Results per query.
+        seed: Corpus seed.
+        benchmarks: Names of the benchmarks to run.
+
+    Returns:
+        Report with the configuration, environment and one entry per benchmark.
+    """
+    documents, queries = synthetic_corpus(n_docs, n_queries, seed)
+    runners = {
+        "index": bench_index,
+        "search": bench_search,
+        "reformulate": bench_reformulate,
+        "query": bench_query,
+    }
+    results = {}
+    for name in benchmarks:
+        results[name] = runners[name](documents=documents, queries=queries, top_k=top_k)
+    return {
+        "config": {
+            "docs": n_docs,
+            "queries": n_queries,
+            "top_k": top_k,
+            "seed": seed,
+            "dim": DEFAULT_DIM,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Describe the relative change of every shared numeric metric.
+
+    Args:
+        baseline: An earlier report.
+        current: A newer report.
+
+    Returns:
+        One line per metric, ``name: old -> new (+x.x%)``.
+    """
+    lines = []
+
+    def walk(old: Any, new: Any, prefix: str) -> None:
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key in old.keys() & new.keys():
+                walk(old[key], new[key], f"{prefix}.{key}" if prefix else key)
+        elif isinstance(old, int | float) and isinstance(new, int | float):
+            change = (new - old) / old * 100 if old else 0.0
+            lines.append(f"{prefix}: {old:.4g} -> {new:.4g} ({change:+.1f}%)")
+
+    walk(baseline["results"], current["results"], "")
+    return sorted(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=DEFAULT_DOCS)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        type=Path,
+        metavar=("BASELINE", "CURRENT"),
+        help="Print metric changes between two saved reports instead of running",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        print("\n".join(compare(baseline, current)))
+        return 0
+
+    report = run(args.docs, args.queries, args.top_k, args.seed, args.benchmarks)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,36 @@
 """Conversational RAG - RAG with memory and query reformulation."""
 
 __all__ = [
+    "ContextBuilder",
     "ConversationMemory",
     "ConversationTurn",
     "ConversationalRAG",
+    "EmbeddingCache",
+    "InMemoryStore",
     "Message",
+    "MessageStore",
+    "MetricsHook",
+    "PrometheusMetrics",
     "QueryReformulator",
+    "Reranker",
     "Retriever",
+    "SQLiteStore",
+    "SamplingProfiler",
+    "SemanticResultCache",
+    "SessionStore",
+    "ShardedRetriever",
 ]
 
+from .cache import SemanticResultCache
+from .context import ContextBuilder
+from .embedding_cache import EmbeddingCache
+from .instrumentation import MetricsHook, PrometheusMetrics, SamplingProfiler
 from .memory import ConversationMemory
 from .models import ConversationTurn, Message
 from .pipeline import ConversationalRAG
 from .reformulator import QueryReformulator
+from .rerank import Reranker
 from .retriever import Retriever
+from .sessions import SessionStore
+from .sharding import ShardedRetriever
+from .storage import InMemoryStore, MessageStore, SQLiteStore
@@ -0,0 +1,514 @@
+"""Nearest-neighbour search backends used by the Retriever.
+
+A backend sees the retriever's normalized embedding matrix row by row: rows are appended
+via ``add``, tombstoned via ``remove`` and forgotten via ``reset`` whenever the retriever
+renumbers its rows (re-indexing, compaction, loading). ``search`` returns row numbers and
+cosine scores, which the retriever maps back to documents.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+SCORE_BLOCK_ROWS = 65_536
+DEFAULT_NPROBE = 8
+DEFAULT_KMEANS_ITERATIONS = 10
+DEFAULT_TRAINING_SAMPLE = 100_000
+RETRAIN_GROWTH_FACTOR = 4
+DEFAULT_HNSW_M = 16
+DEFAULT_EF_CONSTRUCTION = 200
+DEFAULT_EF_SEARCH = 64
+DEFAULT_INT8_RESCORE_FACTOR = 4
+DEFAULT_BINARY_RESCORE_FACTOR = 10
+INT8_MAX = 127
+INT8_SCAN_TILE_BYTES = 1 << 19
+
+SearchResult = tuple[np.ndarray, np.ndarray]
+
+
+def score_rows(embeddings: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Score normalized float32 queries against normalized embedding rows.
+
+    Half-precision rows are upcast block by block so that scoring never materializes a
+    float32 copy of the whole matrix.
+
+    Args:
+        embeddings: Row-normalized matrix of shape (n_rows, dim), float32 or float16.
+        queries: Normalized float32 matrix of shape (n_queries, dim).
+
+    Returns:
+        Float32 cosine similarity matrix of shape (n_queries, n_rows).
+    """
+    if embeddings.dtype == np.float32:
+        return queries @ embeddings.T
+    scores = np.empty((len(queries), len(embeddings)), dtype=np.float32)
+    for start in range(0, len(embeddings), SCORE_BLOCK_ROWS):
+        block = np.asarray(embeddings[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        scores[:, start : start + len(block)] = queries @ block.T
+    return scores
+
+
+def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the ``k`` highest scores in descending order.
+
+    Uses ``np.argpartition`` so selection is linear in the number of scores, and only
+    the ``k`` winners are sorted.
+
+    Args:
+        scores: One-dimensional score array.
+        k: Number of indices to return.
+
+    Returns:
+        Indices into ``scores``, best first.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def score_subset(
+    embeddings: np.ndarray, queries: np.ndarray, rows: np.ndarray, k: int
+) -> list[SearchResult]:
+    """Exactly score only the given rows against every query and keep the best ``k``.
+
+    The cost is proportional to ``len(rows)`` rather than to the whole matrix, which makes
+    this the scan used for pre-filtered searches and shortlist rescoring.
+
+    Args:
+        embeddings: Row-normalized matrix of shape (n_rows, dim).
+        queries: Normalized float32 matrix of shape (n_queries, dim).
+        rows: Row numbers to score, preferably sorted for sequential reads.
+        k: Maximum number of rows per query.
+
+    Returns:
+        One (rows, scores) pair per query, sorted by descending score.
+    """
+    if len(rows) == 0:
+        return [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)) for _ in queries]
+    scores = score_rows(embeddings[rows], queries)
+    results = []
+    for row_scores in scores:
+        order = select_top_k(row_scores, k)
+        results.append((rows[order], row_scores[order]))
+    return results
+
+
+def _top_k_among(
+    embeddings: np.ndarray, query: np.ndarray, rows: np.ndarray, k: int
+) -> SearchResult:
+    """Exactly score ``rows`` against one query and keep the best ``k``."""
+    return score_subset(embeddings, query[None], rows, k)[0]
+
+
+class SearchBackend(ABC):
+    """Interface for pluggable nearest-neighbour search over the retriever's rows."""
+
+    def reset(self) -> None:
+        """Forget every row. Called before the retriever re-adds renumbered rows."""
+
+    @abstractmethod
+    def add(self, embeddings: np.ndarray, start: int) -> None:
+        """Register newly appended rows.
+
+        Args:
+            embeddings: The retriever's full embedding matrix.
+            start: First new row; rows ``start:`` were just appended.
+        """
+
+    def remove(self, rows: np.ndarray) -> None:
+        """Register tombstoned rows. Backends that honour the ``alive`` mask may ignore this.
+
+        Args:
+            rows: Row numbers that were removed.
+        """
+
+    @abstractmethod
+    def search(
+        self, embeddings: np.ndarray, queries: np.ndarray, k: int, alive: np.ndarray | None
+    ) -> list[SearchResult]:
+        """Find the ``k`` best rows for each query.
+
+        Args:
+            embeddings: The retriever's full embedding matrix.
+            queries: Normalized float32 query matrix of shape (n_queries, dim).
+            k: Maximum number of rows per query.
+            alive: Boolean mask of live rows, or None if no row is tombstoned.
+
+        Returns:
+            One (rows, scores) pair per query, sorted by descending score.
+        """
+
+
+class ExactBackend(SearchBackend):
+    """Brute-force scan of every row; the default backend with perfect recall."""
+
+    def add(self, embeddings: np.ndarray, start: int) -> None:
+        """Nothing to maintain: every search scans the full matrix."""
+
+    def search(
+        self, embeddings: np.ndarray, queries: np.ndarray, k: int, alive: np.ndarray | None
+    ) -> list[SearchResult]:
+        """Score all rows with one matrix product and select top-k per query."""
+        similarities = score_rows(embeddings, queries)
+        if alive is not None:
+            similarities[:, ~alive] = -np.inf
+            k = min(k, int(alive.sum()))
+        results = []
+        for row in similarities:
+            top = select_top_k(row, k)
+            results.append((top, row[top]))
+        return results
+
+
+class IVFBackend(SearchBackend):
+    """Inverted-file index: a spherical k-means coarse quantizer plus per-centroid row lists.
+
+    A query is scored against the centroids, and only rows in the ``nprobe`` closest lists
+    are scanned exactly. Higher ``nprobe`` trades latency for recall. New rows are assigned
+    to the existing centroids; the quantizer is retrained once the corpus has grown by
+    ``RETRAIN_GROWTH_FACTOR`` since the last training.
+    """
+
+    def __init__(
+        self,
+        n_lists: int | None = None,
+        nprobe: int = DEFAULT_NPROBE,
+        iterations: int = DEFAULT_KMEANS_ITERATIONS,
+        training_sample: int = DEFAULT_TRAINING_SAMPLE,
+        seed: int = 0,
+    ) -> None:
+        """Create the backend.
+
+        Args:
+            n_lists: Number of inverted lists. Defaults to ``sqrt(n_rows)`` at training time.
+            nprobe: Number of closest lists scanned per query.
+            iterations: K-means iterations used to train the coarse quantizer.
+            training_sample: Maximum number of rows sampled for training.
+            seed: Random seed for centroid initialisation and sampling.
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.training_sample = training_sample
+        self.seed = seed
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop the trained quantizer and every inverted list."""
+        self._centroids: np.ndarray | None = None
+        self._lists: list[np.ndarray] = []
+        self._trained_rows = 0
+
+    def add(self, embeddings: np.ndarray, start: int) -> None:
+        """Assign new rows to their closest centroid, training or retraining when needed."""
+        total = len(embeddings)
+        if total == 0:
+            return
+        if self._centroids is None or total > self._trained_rows * RETRAIN_GROWTH_FACTOR:
+            self._train(embeddings)
+            start = 0
+        rows = np.arange(start, total)
+        assignments = self._assign(embeddings[start:])
+        for list_id in np.unique(assignments):
+            members = rows[assignments == list_id]
+            self._lists[list_id] = np.concatenate([self._lists[list_id], members])
+
+    def search(
+        self, embeddings: np.ndarray, queries: np.ndarray, k: int, alive: np.ndarray | None
+    ) -> list[SearchResult]:
+        """Scan only the rows in the ``nprobe`` lists closest to each query."""
+        if self._centroids is None:
+            return ExactBackend().search(embeddings, queries, k, alive)
+        centroid_scores = queries @ self._centroids.T
+        results = []
+        for query, scores in zip(queries, centroid_scores):
+            probe = select_top_k(scores, self.nprobe)
+            rows = np.concatenate([self._lists[list_id] for list_id in probe])
+            if alive is not None:
+                rows = rows[alive[rows]]
+            results.append(_top_k_among(embeddings, query, rows, k))
+        return results
+
+    def _train(self, embeddings: np.ndarray) -> None:
+        """Fit centroids with spherical k-means on a sample of the rows."""
+        rng = np.random.default_rng(self.seed)
+        total = len(embeddings)
+        n_lists = self.n_lists or max(1, int(np.sqrt(total)))
+        n_lists = min(n_lists, total)
+
+        sample_rows = np.sort(
+            rng.choice(total, size=min(total, self.training_sample), replace=False)
+        )
+        sample = np.asarray(embeddings[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = sample[assignments == list_id]
+                if len(members):
+                    centroids[list_id] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+
+        self._centroids = centroids
+        self._lists = [np.empty(0, dtype=np.intp) for _ in range(n_lists)]
+        self._trained_rows = total
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the closest centroid for each vector."""
+        return np.argmax(score_rows(vectors, self._centroids).T, axis=1)
+
+
+class HNSWBackend(SearchBackend):
+    """Hierarchical navigable small-world graph index backed by the optional ``hnswlib``.
+
+    ``ef_search`` trades latency for recall at query time; ``m`` and ``ef_construction``
+    control graph quality at build time. Install with ``pip install conversational-rag[ann]``.
+    """
+
+    def __init__(
+        self,
+        m: int = DEFAULT_HNSW_M,
+        ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+        ef_search: int = DEFAULT_EF_SEARCH,
+    ) -> None:
+        """Create the backend.
+
+        Args:
+            m: Maximum number of graph neighbours per node.
+            ef_construction: Candidate list size while inserting.
+            ef_search: Candidate list size while querying.
+
+        Raises:
+            ImportError: If ``hnswlib`` is not installed.
+        """
+        try:
+            import hnswlib
+        except ImportError as exc:
+            raise ImportError(
+                "HNSWBackend requires hnswlib; install it with "
+                "`pip install conversational-rag[ann]`"
+            ) from exc
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard the graph."""
+        self._index = None
+        self._deleted = 0
+
+    def add(self, embeddings: np.ndarray, start: int) -> None:
+        """Insert the new rows into the graph, growing its capacity as needed."""
+        total = len(embeddings)
+        if total == start:
+            return
+        if self._index is None:
+            self._index = self._hnswlib.Index(space="ip", dim=embeddings.shape[1])
+            self._index.init_index(
+                max_elements=total, ef_construction=self.ef_construction, M=self.m
+            )
+        elif total > self._index.get_max_elements():
+            self._index.resize_index(max(total, 2 * self._index.get_max_elements()))
+        vectors = np.asarray(embeddings[start:], dtype=np.float32)
+        self._index.add_items(vectors, np.arange(start, total))
+
+    def remove(self, rows: np.ndarray) -> None:
+        """Mark tombstoned rows as deleted in the graph."""
+        if self._index is None:
+            return
+        for row in rows:
+            self._index.mark_deleted(int(row))
+        self._deleted += len(rows)
+
+    def search(
+        self, embeddings: np.ndarray, queries: np.ndarray, k: int, alive: np.ndarray | None
+    ) -> list[SearchResult]:
+        """Query the graph; hnswlib returns inner-product distances, i.e. ``1 - score``."""
+        if self._index is None:
+            return [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)) for _ in queries]
+        k = min(k, self._index.get_current_count() - self._deleted)
+        if k <= 0:
+            return [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)) for _ in queries]
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(queries, k=k)
+        return [
+            (row_labels.astype(np.intp), (1.0 - row_distances).astype(np.float32))
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+
+
+class _QuantizedBackend(SearchBackend):
+    """Two-stage search: scan compact per-row codes, then exactly rescore a shortlist.
+
+    Only the codes are scanned for every query; the full-precision matrix, which may be
+    memory-mapped, is read for just ``k * rescore_factor`` rows per query. Codes are kept in
+    a growable buffer and recomputed from scratch once the corpus has grown by
+    ``RETRAIN_GROWTH_FACTOR`` since they were last fitted.
+    """
+
+    def __init__(self, rescore_factor: int) -> None:
+        """Create the backend.
+
+        Args:
+            rescore_factor: Shortlist size per query as a multiple of ``k``.
+        """
+        if rescore_factor < 1:
+            raise ValueError(f"rescore_factor must be at least 1, got {rescore_factor}")
+        self.rescore_factor = rescore_factor
+        self.reset()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codes of the indexed rows."""
+        return 0 if self._codes is None else self._codes[: self._size].nbytes
+
+    def reset(self) -> None:
+        """Drop every code."""
+        self._codes: np.ndarray | None = None
+        self._size = 0
+        self._fitted_rows = 0
+
+    def add(self, embeddings: np.ndarray, start: int) -> None:
+        """Quantize the new rows, refitting and re-encoding everything when needed."""
+        total = len(embeddings)
+        if total == 0:
+            return
+        if self._fitted_rows == 0 or total > self._fitted_rows * RETRAIN_GROWTH_FACTOR:
+            self._fit(embeddings)
+            self._fitted_rows = total
+            start = 0
+        for block_start in range(start, total, SCORE_BLOCK_ROWS):
+            block = np.asarray(embeddings[block_start : block_start + SCORE_BLOCK_ROWS])
+            self._store(self._encode(block.astype(np.float32, copy=False)), block_start)
+
+    def search(
+        self, embeddings: np.ndarray, queries: np.ndarray, k: int, alive: np.ndarray | None
+    ) -> list[SearchResult]:
+        """Shortlist rows by their codes and rescore the shortlist at full precision."""
+        if self._size == 0:
+            return [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)) for _ in queries]
+        approximate = self._scan(queries)
+        if alive is not None:
+            approximate[:, ~alive[: self._size]] = -np.inf
+            k = min(k, int(alive[: self._size].sum()))
+        shortlist = k * self.rescore_factor
+        results = []
+        for query, scores in zip(queries, approximate):
+            # Sorted rows keep the rescoring reads sequential on a memory-mapped matrix.
+            candidates = np.sort(select_top_k(scores, shortlist))
+            if alive is not None:
+                candidates = candidates[alive[candidates]]
+            results.append(_top_k_among(embeddings, query, candidates, k))
+        return results
+
+    def _store(self, codes: np.ndarray, start: int) -> None:
+        """Write codes for rows ``start:``, doubling the buffer when it is full."""
+        end = start + len(codes)
+        if self._codes is None or len(self._codes) < end:
+            current = 0 if self._codes is None else len(self._codes)
+            grown = np.empty((max(end, 2 * current), codes.shape[1]), dtype=codes.dtype)
+            if self._codes is not None:
+                grown[:start] = self._codes[:start]
+            self._codes = grown
+        self._codes[start:end] = codes
+        self._size = end
+
+    def _fit(self, embeddings: np.ndarray) -> None:
+        """Calibrate the quantizer on the current rows. Stateless quantizers do nothing."""
+
+    @abstractmethod
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Quantize float32 row vectors into codes."""
+
+    @abstractmethod
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate scores of every stored row, shape (n_queries, n_rows), float32."""
+
+
+class Int8Backend(_QuantizedBackend):
+    """Scalar int8 quantization with exact rescoring; 4x smaller than float32 rows.
+
+    Each dimension is scaled by its maximum absolute value so that it spans ``[-127, 127]``.
+    The scale is folded into the query, and the codes are scanned in tiles of
+    ``INT8_SCAN_TILE_BYTES`` that are widened into one reused, cache-resident float32
+    buffer, so a scan reads a quarter of the bytes of an exact scan and never allocates
+    float32 copies of the codes.
+
+    The codes are kept next to the retriever's float32 matrix, which is only read for
+    rescoring. Memory is therefore saved only when that matrix is not resident, that is
+    for an index opened with ``Retriever.load(path, mmap=True)``.
+    """
+
+    def __init__(self, rescore_factor: int = DEFAULT_INT8_RESCORE_FACTOR) -> None:
+        """Create the backend.
+
+        Args:
+            rescore_factor: Shortlist size per query as a multiple of ``k``.
+        """
+        super().__init__(rescore_factor)
+
+    def _fit(self, embeddings: np.ndarray) -> None:
+        """Compute the per-dimension scale from the largest absolute value."""
+        max_abs = np.zeros(embeddings.shape[1], dtype=np.float32)
+        for start in range(0, len(embeddings), SCORE_BLOCK_ROWS):
+            block = np.asarray(embeddings[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            np.maximum(max_abs, np.abs(block).max(axis=0), out=max_abs)
+        self._scale = np.where(max_abs > 0, max_abs / INT8_MAX, 1.0).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Round scaled values, clipping rows added after calibration."""
+        codes = np.rint(vectors / self._scale)
+        return np.clip(codes, -INT8_MAX, INT8_MAX).astype(np.int8)
+
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        """Score the codes against scale-adjusted queries, one cache-sized tile at a time."""
+        queries = queries * self._scale
+        rows = max(1, INT8_SCAN_TILE_BYTES // (4 * queries.shape[1]))
+        tile = np.empty((min(rows, self._size), queries.shape[1]), dtype=np.float32)
+        # Scores are written row-major per tile and returned as a transposed view.
+        scores = np.empty((self._size, len(queries)), dtype=np.float32)
+        for start in range(0, self._size, rows):
+            codes = self._codes[start : min(start + rows, self._size)]
+            block = tile[: len(codes)]
+            np.copyto(block, codes, casting="unsafe")
+            np.matmul(block, queries.T, out=scores[start : start + len(codes)])
+        return scores.T
+
+
+class BinaryBackend(_QuantizedBackend):
+    """Sign-bit quantization scanned by Hamming distance; 32x smaller than float32 rows.
+
+    Each dimension keeps one bit, packed eight to a byte. Hamming distance between sign
+    patterns is a coarse proxy for angle, so a wider rescoring shortlist is used by default.
+    """
+
+    def __init__(self, rescore_factor: int = DEFAULT_BINARY_RESCORE_FACTOR) -> None:
+        """Create the backend.
+
+        Args:
+            rescore_factor: Shortlist size per query as a multiple of ``k``.
+        """
+        super().__init__(rescore_factor)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Pack the sign bit of every dimension."""
+        return np.packbits(vectors > 0, axis=1)
+
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        """Negated Hamming distance between packed query and row sign bits."""
+        packed = self._encode(queries)
+        scores = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, SCORE_BLOCK_ROWS):
+            block = self._codes[start : min(start + SCORE_BLOCK_ROWS, self._size)]
+            for i, query in enumerate(packed):
+                distance = np.bitwise_count(block ^ query).sum(axis=1, dtype=np.int32)
+                scores[i, start : start + len(block)] = -distance
+        return scores
@@ -0,0 +1,103 @@
+"""Asyncio micro-batching of encode requests."""
+
+import asyncio
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+EncodeFn = Callable[[Sequence[str]], np.ndarray]
+
+
+class MicroBatcher:
+    """Merges encode requests that arrive within a short window into one forward pass.
+
+    Each ``encode`` call enqueues one text. The queue is flushed when it reaches
+    ``max_batch_size`` or ``max_wait_ms`` after its first entry, whichever comes first, and
+    the batch is encoded off the event loop in ``executor``, which must be a thread pool:
+    ``encode_fn`` is typically a bound method of a model-holding object with locks and
+    caches that cannot be shipped to another process.
+    """
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        executor: Executor | None = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ) -> None:
+        """Create the batcher.
+
+        Args:
+            encode_fn: Blocking function mapping a list of texts to a (n, dim) matrix.
+            executor: Thread pool the blocking call runs in. None uses the loop's default
+                executor.
+            max_batch_size: Flush as soon as this many texts are queued.
+            max_wait_ms: Maximum time the first queued text waits for companions.
+
+        Raises:
+            TypeError: If ``executor`` is a process pool.
+            ValueError: If ``max_batch_size`` is not positive.
+        """
+        if isinstance(executor, ProcessPoolExecutor):
+            raise TypeError("MicroBatcher needs a thread pool executor, not a process pool")
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.items = 0
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one text as part of the next batch.
+
+        Args:
+            text: The text to encode.
+
+        Returns:
+            The embedding row for ``text``.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Submit the queued texts to the executor as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.items += len(texts)
+        loop = asyncio.get_running_loop()
+        encoded = loop.run_in_executor(self.executor, self.encode_fn, texts)
+        encoded.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _resolve(batch: list[tuple[str, asyncio.Future]], encoded: asyncio.Future) -> None:
+        """Propagate a finished batch's embeddings, or its error, to each caller."""
+        error = None if encoded.cancelled() else encoded.exception()
+        for row, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if encoded.cancelled():
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(encoded.result()[row])
@@ -0,0 +1,289 @@
+"""Bounded, thread-safe caches used on the query hot path."""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+import numpy as np
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_SIMILARITY_THRESHOLD = 0.97
+DEFAULT_SESSION_SIMILARITY_THRESHOLD = 0.92
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+RESULT_OVERHEAD_BYTES = 64
+
+Results = list[tuple[str, float]]
+
+
+def normalize_query(query: str) -> str:
+    """Canonicalize a query for use as a cache key by stripping and collapsing whitespace.
+
+    Args:
+        query: The raw or reformulated query text.
+
+    Returns:
+        The query with runs of whitespace replaced by a single space.
+    """
+    return " ".join(query.split())
+
+
+class LRUCache:
+    """Least-recently-used cache with an optional time-to-live and hit/miss counters."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = None) -> None:
+        """Create the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept before the least recently used is evicted.
+            ttl: Seconds after which an entry expires, or None to keep entries until evicted.
+        """
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` and mark it as recently used.
+
+        Args:
+            key: The cache key.
+            default: Value returned on a miss or an expired entry.
+
+        Returns:
+            The cached value, or ``default``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full.
+
+        Args:
+            key: The cache key.
+            value: The value to cache.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry. Hit and miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss and size counters.
+
+        Returns:
+            Dict with ``hits``, ``misses`` and ``size`` keys.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class SemanticResultCache:
+    """Reuses the results of a recently answered query whose embedding is close enough.
+
+    Entries are keyed by the normalized query embedding, the result ``scope`` (for
+    example ``top_k`` and the filter) and the session that stored them. A lookup first
+    looks for an entry of the same session at ``session_threshold``, since a follow-up
+    in the same conversation that lands this close is a rephrased repeat, and then for
+    an entry of any session at the stricter ``threshold``. Similarities to all entries
+    are computed with one matrix-vector product over a preallocated matrix, so a lookup
+    costs ``O(max_entries * dim)`` regardless of the corpus size.
+
+    The cache is bounded by entry count and by an estimate of the bytes held by vectors
+    and result texts; the least recently used entries are evicted first. Callers must
+    ``clear`` it whenever the underlying index changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        session_threshold: float | None = DEFAULT_SESSION_SIMILARITY_THRESHOLD,
+        max_entries: int = DEFAULT_CACHE_SIZE,
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+    ) -> None:
+        """Create the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for reusing another session's results.
+            session_threshold: Minimum cosine similarity for reusing results stored by
+                the same session, or None to apply ``threshold`` to every entry.
+            max_entries: Maximum number of cached result lists.
+            max_bytes: Maximum estimated size of the cached vectors and results.
+
+        Raises:
+            ValueError: If ``max_entries`` or ``max_bytes`` is not positive.
+        """
+        if max_entries <= 0:
+            raise ValueError(f"max_entries must be positive, got {max_entries}")
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+        self.threshold = threshold
+        self.session_threshold = threshold if session_threshold is None else session_threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.session_hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._vectors: np.ndarray | None = None
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._scope_codes = np.zeros(max_entries, dtype=np.int64)
+        self._session_codes = np.zeros(max_entries, dtype=np.int64)
+        # slot -> (scope, session_id, results, nbytes), least recently used first.
+        self._entries: OrderedDict[int, tuple[Hashable, Hashable, Results, int]] = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._codes: dict[Hashable, list[int]] = {}  # key -> [code, reference count]
+        self._next_code = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, embedding: np.ndarray, scope: Hashable, session_id: Hashable = None
+    ) -> Results | None:
+        """Return the results of the closest cached query within the similarity thresholds.
+
+        Args:
+            embedding: Normalized query embedding.
+            scope: Everything else the results depend on, e.g. ``(top_k, filter_key)``.
+            session_id: Session asking, whose own entries use ``session_threshold``.
+
+        Returns:
+            A copy of the cached results, or None on a miss.
+        """
+        with self._lock:
+            scope_code = self._codes.get(("scope", scope))
+            if self._vectors is None or scope_code is None:
+                self.misses += 1
+                return None
+            similarities = self._vectors @ np.asarray(embedding, dtype=np.float32)
+            candidates = self._live & (self._scope_codes == scope_code[0])
+            similarities[~candidates] = -np.inf
+
+            session_code = self._codes.get(("session", session_id))
+            slot = -1
+            if session_code is not None:
+                own = np.where(self._session_codes == session_code[0], similarities, -np.inf)
+                best = int(np.argmax(own))
+                if own[best] >= self.session_threshold:
+                    slot = best
+                    self.session_hits += 1
+            if slot < 0:
+                best = int(np.argmax(similarities))
+                if similarities[best] < self.threshold:
+                    self.misses += 1
+                    return None
+                slot = best
+            self.hits += 1
+            self._entries.move_to_end(slot)
+            return list(self._entries[slot][2])
+
+    def put(
+        self,
+        embedding: np.ndarray,
+        scope: Hashable,
+        results: Results,
+        session_id: Hashable = None,
+    ) -> None:
+        """Cache the results of a query, evicting least recently used entries if needed.
+
+        Args:
+            embedding: Normalized query embedding.
+            scope: Everything else the results depend on, as for ``get``.
+            results: The (document_text, score) list to reuse.
+            session_id: Session that asked the query.
+        """
+        embedding = np.asarray(embedding, dtype=np.float32)
+        results = list(results)
+        nbytes = embedding.nbytes + sum(
+            sys.getsizeof(text) + RESULT_OVERHEAD_BYTES for text, _ in results
+        )
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+            while self._entries and (not self._free or self.nbytes + nbytes > self.max_bytes):
+                self._evict(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._vectors[slot] = embedding
+            self._live[slot] = True
+            self._scope_codes[slot] = self._acquire(("scope", scope))
+            self._session_codes[slot] = self._acquire(("session", session_id))
+            self._entries[slot] = (scope, session_id, results, nbytes)
+            self.nbytes += nbytes
+
+    def clear(self) -> None:
+        """Remove every entry. Hit and miss counters are kept."""
+        with self._lock:
+            self._live[:] = False
+            self._entries.clear()
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            self._codes.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss and size counters.
+
+        Returns:
+            Dict with ``hits``, ``session_hits``, ``misses``, ``size`` and ``nbytes``
+            keys; ``session_hits`` counts the hits served by the asking session's entries.
+        """
+        return {
+            "hits": self.hits,
+            "session_hits": self.session_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "nbytes": self.nbytes,
+        }
+
+    def _evict(self, slot: int) -> None:
+        """Drop one entry and release its slot and interned codes."""
+        scope, session_id, _, nbytes = self._entries.pop(slot)
+        self._live[slot] = False
+        self._free.append(slot)
+        self._release(("scope", scope))
+        self._release(("session", session_id))
+        self.nbytes -= nbytes
+
+    def _acquire(self, key: Hashable) -> int:
+        """Return the integer code of a scope or session, counting one more reference."""
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = [self._next_code, 0]
+            self._next_code += 1
+        code[1] += 1
+        return code[0]
+
+    def _release(self, key: Hashable) -> None:
+        """Drop one reference to a code, forgetting the key once it is unused."""
+        code = self._codes[key]
+        code[1] -= 1
+        if code[1] == 0:
+            del self._codes[key]
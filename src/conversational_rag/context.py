@@ -0,0 +1,98 @@
+"""Token-budgeted assembly of conversation history and retrieved sources."""
+
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from conversational_rag.lexical import estimate_tokens
+from conversational_rag.memory import DEFAULT_SUMMARY_TOKENS, ConversationMemory
+from conversational_rag.models import Message
+
+DEFAULT_MAX_CONTEXT_TOKENS = 1024
+DEFAULT_HISTORY_SHARE = 0.4
+SOURCE_TOKEN_CACHE_SIZE = 4096
+SOURCES_HEADER = "Sources:"
+
+
+@lru_cache(maxsize=SOURCE_TOKEN_CACHE_SIZE)
+def _source_tokens(text: str) -> int:
+    """Token estimate of a retrieved source; popular documents recur across turns."""
+    return estimate_tokens(text)
+
+
+@dataclass(slots=True)
+class Context:
+    """History and sources selected for one turn, within a token budget."""
+
+    summary: str = ""  # compact summary of turns older than ``history``
+    history: list[Message] = field(default_factory=list)
+    sources: list[str] = field(default_factory=list)
+    tokens: int = 0  # estimated tokens of summary, history and sources
+
+    def render(self) -> str:
+        """Render the context as plain text: summary, "Role: content" lines, then sources."""
+        lines = [self.summary] if self.summary else []
+        lines.extend(f"{message.role.capitalize()}: {message.content}" for message in self.history)
+        if self.sources:
+            lines.append(SOURCES_HEADER)
+            lines.extend(f"- {source}" for source in self.sources)
+        return "\n".join(lines)
+
+
+class ContextBuilder:
+    """Fits conversation history and retrieved sources into a fixed token budget.
+
+    History gets up to ``history_share`` of the budget: the newest messages verbatim and,
+    once older ones no longer fit, the session's incrementally maintained summary of them
+    (see ``ConversationMemory.budgeted_context``). Sources fill the rest in rank order;
+    a source too long for the remaining budget is skipped in favour of shorter,
+    lower-ranked ones. Token counts are local estimates cached per message and per
+    source text, so the cost of a turn stays constant as the conversation grows.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_CONTEXT_TOKENS,
+        history_share: float = DEFAULT_HISTORY_SHARE,
+        summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+    ) -> None:
+        """Create the builder.
+
+        Args:
+            max_tokens: Total estimated tokens of history and sources per turn.
+            history_share: Fraction of ``max_tokens`` available to history and summary;
+                whatever history leaves unused goes to sources.
+            summary_tokens: Upper bound on the summary's share of the history budget.
+
+        Raises:
+            ValueError: If ``max_tokens`` is not positive or ``history_share`` is outside
+                ``[0, 1]``.
+        """
+        if max_tokens <= 0:
+            raise ValueError(f"max_tokens must be positive, got {max_tokens}")
+        if not 0.0 <= history_share <= 1.0:
+            raise ValueError(f"history_share must be in [0, 1], got {history_share}")
+        self.max_tokens = max_tokens
+        self.history_share = history_share
+        self.summary_tokens = summary_tokens
+
+    def build(self, memory: ConversationMemory, sources: Sequence[str]) -> Context:
+        """Select the history and sources of one turn.
+
+        Args:
+            memory: The session's memory; its history summary is updated as needed.
+            sources: Retrieved document texts, best first.
+
+        Returns:
+            The selected Context, whose ``tokens`` never exceed ``max_tokens``.
+        """
+        history_budget = int(self.max_tokens * self.history_share)
+        summary, history, tokens = memory.budgeted_context(history_budget, self.summary_tokens)
+        remaining = self.max_tokens - tokens
+        selected = []
+        for source in sources:
+            source_tokens = _source_tokens(source)
+            if source_tokens <= remaining:
+                selected.append(source)
+                remaining -= source_tokens
+        return Context(summary, history, selected, self.max_tokens - remaining)
@@ -0,0 +1,368 @@
+"""Persistent, content-addressed cache of document embeddings shared across index builds."""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+DEFAULT_FLUSH_EVERY = 4096
+EVICTION_SLACK = 0.1
+INITIAL_CACHE_CAPACITY = 1024
+KEY_BYTES = 16
+CACHE_FORMAT_VERSION = 1
+CACHE_MANIFEST_FILE = "manifest.json"
+CACHE_KEYS_FILE = "keys.npy"
+CACHE_VECTORS_FILE = "vectors.npy"
+
+KEY_DTYPE = np.dtype([("key", f"V{KEY_BYTES}"), ("stamp", "<i8")])
+
+
+def content_key(text: str) -> bytes:
+    """Return the 16-byte BLAKE2b digest identifying a text.
+
+    Args:
+        text: The document text.
+
+    Returns:
+        The digest of the UTF-8 encoded text.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class _ModelStore:
+    """Vectors of one model: a key file plus a memory-mapped vector matrix in one directory.
+
+    ``keys.npy`` holds one ``(key, stamp)`` record per row; a zero stamp marks a free row
+    and larger stamps are more recently used. ``vectors.npy`` holds row ``i``'s vector and
+    is written through a memory map, so only touched pages are ever read or written.
+    """
+
+    def __init__(self, path: Path, model_name: str, dtype: np.dtype) -> None:
+        self.path = path
+        self.model_name = model_name
+        self.dtype = dtype
+        self.dim: int | None = None
+        self.clock = 0
+        self.dirty = 0
+        self._rows: dict[bytes, int] = {}
+        self._keys = np.zeros(0, dtype=KEY_DTYPE)
+        self._vectors: np.ndarray | None = None
+        self._free: list[int] = []
+        if (path / CACHE_MANIFEST_FILE).exists():
+            self._open()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the key records and vectors of occupied rows."""
+        width = 0 if self.dim is None else self.dim * self.dtype.itemsize
+        return len(self._rows) * (KEY_DTYPE.itemsize + width)
+
+    def lookup(self, keys: Sequence[bytes]) -> tuple[np.ndarray, np.ndarray]:
+        """Return the positions of ``keys`` that are cached and their vectors."""
+        found = [(i, self._rows[key]) for i, key in enumerate(keys) if key in self._rows]
+        if not found:
+            return np.empty(0, dtype=np.intp), np.empty((0, self.dim or 0), dtype=np.float32)
+        positions, rows = (np.array(column, dtype=np.intp) for column in zip(*found))
+        self.clock += 1
+        self._keys["stamp"][rows] = self.clock
+        # Sorted reads keep access to the memory-mapped matrix sequential.
+        order = np.argsort(rows)
+        vectors = np.empty((len(rows), self.dim), dtype=np.float32)
+        vectors[order] = self._vectors[rows[order]]
+        return positions, vectors
+
+    def insert(self, keys: Sequence[bytes], vectors: np.ndarray, max_entries: int) -> int:
+        """Store vectors for keys not yet cached, evicting old rows if needed.
+
+        Returns:
+            The number of evicted entries.
+        """
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Cached vectors of {self.model_name!r} have dim {self.dim}, got {vectors.shape[1]}"
+            )
+        positions = {key: i for i, key in enumerate(keys) if key not in self._rows}
+        if not positions:
+            return 0
+        new_keys = list(positions)[-max_entries:]
+        vectors = vectors[list(positions.values())[-max_entries:]]
+
+        evicted = self._evict(len(self._rows) + len(new_keys) - max_entries, max_entries)
+        rows = self._allocate(len(new_keys))
+        self.clock += 1
+        self._vectors[rows] = vectors
+        self._keys["key"][rows] = [np.void(key) for key in new_keys]
+        self._keys["stamp"][rows] = self.clock
+        self._rows.update(zip(new_keys, rows.tolist()))
+        self.dirty += len(new_keys)
+        return evicted
+
+    def flush(self) -> None:
+        """Persist vectors, then the key records and manifest that make them visible."""
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        _atomic_save(self.path / CACHE_KEYS_FILE, self._keys)
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "model_name": self.model_name,
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "clock": self.clock,
+        }
+        tmp = self.path / f"{CACHE_MANIFEST_FILE}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path / CACHE_MANIFEST_FILE)
+        self.dirty = 0
+
+    def _open(self) -> None:
+        """Load the key records and memory-map the vectors of an existing store."""
+        manifest = json.loads((self.path / CACHE_MANIFEST_FILE).read_text(encoding="utf-8"))
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported embedding cache format version {manifest.get('format_version')!r}, "
+                f"expected {CACHE_FORMAT_VERSION}"
+            )
+        self.dim = manifest["dim"]
+        self.dtype = np.dtype(manifest["dtype"])
+        self.clock = manifest["clock"]
+        self._keys = np.load(self.path / CACHE_KEYS_FILE)
+        self._vectors = np.lib.format.open_memmap(self.path / CACHE_VECTORS_FILE, mode="r+")
+        # Rows beyond the key file were allocated after the last flush and are unreferenced.
+        self._keys = _resized(self._keys, len(self._vectors))
+        occupied = np.flatnonzero(self._keys["stamp"] > 0)
+        self._rows = {self._keys["key"][row].tobytes(): int(row) for row in occupied}
+        self._free = np.flatnonzero(self._keys["stamp"] == 0)[::-1].tolist()
+
+    def _allocate(self, count: int) -> np.ndarray:
+        """Return ``count`` free rows, growing both files when needed."""
+        if len(self._free) < count:
+            self._grow(len(self._rows) + count)
+        rows = [self._free.pop() for _ in range(count)]
+        return np.array(rows, dtype=np.intp)
+
+    def _grow(self, needed: int) -> None:
+        """Reallocate the vector file with at least ``needed`` rows, doubling capacity."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        current = len(self._keys)
+        capacity = max(needed, 2 * current, INITIAL_CACHE_CAPACITY)
+        tmp = self.path / f"{CACHE_VECTORS_FILE}.tmp"
+        vectors = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=self.dtype, shape=(capacity, self.dim)
+        )
+        if self._vectors is not None:
+            vectors[:current] = self._vectors
+            self._vectors.flush()
+        vectors.flush()
+        del vectors
+        self._vectors = None
+        os.replace(tmp, self.path / CACHE_VECTORS_FILE)
+        self._vectors = np.lib.format.open_memmap(self.path / CACHE_VECTORS_FILE, mode="r+")
+        self._keys = _resized(self._keys, capacity)
+        self._free = [*range(capacity - 1, current - 1, -1), *self._free]
+
+    def _evict(self, overflow: int, max_entries: int) -> int:
+        """Free the least recently used rows, plus some slack, so ``overflow`` more fit."""
+        if overflow <= 0:
+            return 0
+        count = min(len(self._rows), overflow + int(max_entries * EVICTION_SLACK))
+        occupied = np.flatnonzero(self._keys["stamp"] > 0)
+        victims = occupied[np.argpartition(self._keys["stamp"][occupied], count - 1)[:count]]
+        for row in victims.tolist():
+            del self._rows[self._keys["key"][row].tobytes()]
+        self._keys["stamp"][victims] = 0
+        self._free.extend(victims.tolist())
+        # Evicted rows are about to be overwritten, so the key file must stop pointing at
+        # them before any new vector lands there.
+        self.flush()
+        return len(victims)
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache keyed by ``(model_name, BLAKE2b(text))``.
+
+    Each model gets its own directory holding a compact key file (24 bytes per entry) and
+    a memory-mapped vector matrix, so reopening a large cache loads only the keys, and
+    lookups read only the rows they return. Unchanged texts across rebuilds are served
+    from the cache; only new text needs encoding.
+
+    Each model's store holds at most ``max_entries`` vectors; when it is full the least
+    recently used entries, plus ``EVICTION_SLACK`` of the capacity, are evicted at once.
+    New entries become durable on ``flush`` (also called every ``flush_every`` inserts
+    and on ``close``); entries lost to a crash are simply encoded again.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        dtype: str = "float32",
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+    ) -> None:
+        """Open or create a cache directory.
+
+        Args:
+            path: Directory holding the cache, created on first write.
+            max_entries: Maximum number of vectors kept per model.
+            dtype: Storage dtype for new stores, ``"float32"`` or ``"float16"``.
+            flush_every: Number of inserts after which keys are persisted automatically.
+        """
+        if max_entries <= 0:
+            raise ValueError(f"max_entries must be positive, got {max_entries}")
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stores: dict[str, _ModelStore] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self._stores.values())
+
+    def get(self, model_name: str, texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Look up the cached vectors of ``texts``.
+
+        Args:
+            model_name: The model the vectors were computed with.
+            texts: Texts to look up.
+
+        Returns:
+            (positions, vectors): the indices into ``texts`` that were cached and their
+            float32 vectors, one row per position.
+        """
+        keys = [content_key(text) for text in texts]
+        with self._lock:
+            positions, vectors = self._store(model_name).lookup(keys)
+            self.hits += len(positions)
+            self.misses += len(texts) - len(positions)
+        return positions, vectors
+
+    def put(self, model_name: str, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store the vectors of ``texts``; texts already cached are left untouched.
+
+        Args:
+            model_name: The model the vectors were computed with.
+            texts: The texts.
+            vectors: Matrix with one row per text.
+
+        Raises:
+            ValueError: If the vector count or dimension does not match.
+        """
+        if len(vectors) != len(texts):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(texts)} texts")
+        if not texts:
+            return
+        keys = [content_key(text) for text in texts]
+        with self._lock:
+            store = self._store(model_name)
+            self.evictions += store.insert(keys, np.asarray(vectors), self.max_entries)
+            if store.dirty >= self.flush_every:
+                store.flush()
+
+    def encode(
+        self,
+        model_name: str,
+        texts: Sequence[str],
+        encode: Callable[[list[str]], np.ndarray],
+    ) -> np.ndarray:
+        """Return embeddings for ``texts``, calling ``encode`` only on uncached texts.
+
+        Args:
+            model_name: The model the vectors are computed with.
+            texts: Texts to embed.
+            encode: Callable embedding a list of texts into a matrix.
+
+        Returns:
+            Float32 matrix with one row per text, in input order.
+        """
+        texts = list(texts)
+        positions, cached = self.get(model_name, texts)
+        if len(positions) == len(texts):
+            return cached
+        missing = np.setdiff1d(np.arange(len(texts)), positions)
+        missing_texts = [texts[i] for i in missing]
+        encoded = np.asarray(encode(missing_texts), dtype=np.float32)
+        self.put(model_name, missing_texts, encoded)
+        vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        if len(positions):
+            vectors[positions] = cached
+        vectors[missing] = encoded
+        return vectors
+
+    def flush(self) -> None:
+        """Persist every pending entry."""
+        with self._lock:
+            for store in self._stores.values():
+                if store.dirty:
+                    store.flush()
+
+    def clear(self) -> None:
+        """Delete every entry of every model. Counters are kept."""
+        with self._lock:
+            self._stores.clear()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def close(self) -> None:
+        """Flush pending entries."""
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss, eviction and size counters.
+
+        Returns:
+            Dict with ``hits``, ``misses``, ``evictions``, ``size`` (entries across loaded
+            models) and ``nbytes`` (their key and vector bytes) keys.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+            "nbytes": sum(store.nbytes for store in self._stores.values()),
+        }
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _store(self, model_name: str) -> _ModelStore:
+        """Return the store of ``model_name``, opening it from disk on first use."""
+        store = self._stores.get(model_name)
+        if store is None:
+            digest = hashlib.blake2b(model_name.encode("utf-8"), digest_size=8).hexdigest()
+            store = _ModelStore(self.path / digest, model_name, self.dtype)
+            self._stores[model_name] = store
+        return store
+
+
+def _resized(keys: np.ndarray, capacity: int) -> np.ndarray:
+    """Return key records padded with free rows, or truncated, to ``capacity`` rows."""
+    resized = np.zeros(capacity, dtype=KEY_DTYPE)
+    count = min(len(keys), capacity)
+    resized[:count] = keys[:count]
+    return resized
+
+
+def _atomic_save(path: Path, array: np.ndarray) -> None:
+    """Write an ``.npy`` file via a temporary file so readers never see a partial one."""
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as handle:
+        np.save(handle, array)
+    os.replace(tmp, path)
@@ -0,0 +1,318 @@
+"""Embedding encoders and the process-wide registry that shares them by model name."""
+
+import hashlib
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+WARM_UP_TEXT = "warm up"
+DEFAULT_HASHING_DIM = 384
+DEFAULT_ONNX_MAX_LENGTH = 256
+DEFAULT_ONNX_BATCH_SIZE = 64
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+HASHING_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class Encoder(ABC):
+    """Turns texts into embedding vectors; the Retriever only depends on this interface."""
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch of texts.
+
+        Args:
+            texts: The texts to embed.
+
+        Returns:
+            Matrix of shape (len(texts), dim). Rows need not be normalized.
+        """
+
+
+EncoderLoader = Callable[[str], Encoder]
+
+
+def load_sentence_transformer(model_name: str) -> Any:
+    """Import sentence-transformers on first use and load ``model_name``.
+
+    Importing sentence-transformers pulls in torch, which takes seconds, so it is deferred
+    until a model is actually needed.
+
+    Args:
+        model_name: Hugging Face model name or local path.
+
+    Returns:
+        The loaded SentenceTransformer.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+class SentenceTransformerEncoder(Encoder):
+    """Default encoder running a sentence-transformers model on PyTorch."""
+
+    def __init__(self, model_name: str) -> None:
+        """Load the model.
+
+        Args:
+            model_name: Hugging Face model name or local path.
+        """
+        self.model_name = model_name
+        self.model = load_sentence_transformer(model_name)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts with the sentence-transformers model."""
+        return self.model.encode(list(texts), show_progress_bar=False)
+
+    def __reduce__(self) -> tuple[type, tuple[str]]:
+        # Pickle by name so worker processes reload the weights instead of receiving them.
+        return SentenceTransformerEncoder, (self.model_name,)
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_vector(token: str, dim: int, seed: int) -> np.ndarray:
+    """Return the fixed pseudo-random vector of a token, seeded by its hash."""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8, salt=seed.to_bytes(16, "little"))
+    rng = np.random.default_rng(int.from_bytes(digest.digest(), "little"))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    vector.flags.writeable = False
+    return vector
+
+
+class HashingEncoder(Encoder):
+    """Deterministic, model-free encoder summing hash-seeded random token vectors.
+
+    Each lowercase word maps to a fixed dense Gaussian vector derived from its hash, and a
+    text embeds as the sum of its word vectors, so texts sharing words get similar
+    vectors. It needs no download and gives identical output across processes and runs,
+    which makes it suitable for tests and benchmarks.
+    """
+
+    def __init__(self, dim: int = DEFAULT_HASHING_DIM, seed: int = 0) -> None:
+        """Create the encoder.
+
+        Args:
+            dim: Embedding dimension.
+            seed: Hash salt; different seeds give independent embeddings.
+        """
+        self.dim = dim
+        self.seed = seed
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts as sums of their word vectors."""
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in HASHING_TOKEN_PATTERN.findall(text.lower()):
+                embeddings[row] += _token_vector(token, self.dim, self.seed)
+        return embeddings
+
+
+class OnnxEncoder(Encoder):
+    """Runs a locally exported ONNX transformer with ONNX Runtime, without PyTorch.
+
+    ``model_dir`` must contain ``model.onnx`` and the Hugging Face ``tokenizer.json``, e.g.
+    as produced by ``optimum-cli export onnx --model <name> <model_dir>``. Token embeddings
+    are mean-pooled over the attention mask, matching sentence-transformers' default
+    pooling. With ``quantize=True`` the weights are dynamically quantized to int8 once and
+    cached next to the original as ``model_int8.onnx``.
+
+    Install the optional runtime with ``pip install conversational-rag[onnx]``.
+    """
+
+    def __init__(
+        self,
+        model_dir: str | Path,
+        quantize: bool = False,
+        max_length: int = DEFAULT_ONNX_MAX_LENGTH,
+        batch_size: int = DEFAULT_ONNX_BATCH_SIZE,
+        num_threads: int | None = None,
+    ) -> None:
+        """Open the ONNX session and tokenizer.
+
+        Args:
+            model_dir: Directory holding ``model.onnx`` and ``tokenizer.json``.
+            quantize: Whether to run an int8 dynamically quantized copy of the model.
+            max_length: Maximum tokens per text; longer texts are truncated.
+            batch_size: Texts per inference call.
+            num_threads: Optional intra-op thread count for the session.
+
+        Raises:
+            ImportError: If ``onnxruntime`` or ``tokenizers`` is not installed.
+        """
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as exc:
+            raise ImportError(
+                "OnnxEncoder requires onnxruntime and tokenizers; install them with "
+                "`pip install conversational-rag[onnx]`"
+            ) from exc
+        self.model_dir = Path(model_dir)
+        self.quantize = quantize
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+
+        model_path = self.model_dir / ONNX_MODEL_FILE
+        if quantize:
+            model_path = quantize_onnx(model_path, self.model_dir / ONNX_QUANTIZED_MODEL_FILE)
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self._session = onnxruntime.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {graph_input.name for graph_input in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Tokenize, run the session batch by batch and mean-pool token embeddings."""
+        texts = list(texts)
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start : start + self.batch_size])
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": mask,
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            feed = {name: value for name, value in feed.items() if name in self._input_names}
+            token_embeddings = self._session.run(None, feed)[0]
+            weights = mask[:, :, None].astype(np.float32)
+            summed = (token_embeddings * weights).sum(axis=1)
+            batches.append(summed / np.maximum(weights.sum(axis=1), 1e-9))
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32, copy=False)
+
+    def __reduce__(self) -> tuple[type, tuple[Any, ...]]:
+        # Sessions are not picklable; worker processes reopen the model from disk.
+        return OnnxEncoder, (
+            self.model_dir,
+            self.quantize,
+            self.max_length,
+            self.batch_size,
+            self.num_threads,
+        )
+
+
+def quantize_onnx(model_path: str | Path, output_path: str | Path) -> Path:
+    """Write an int8 dynamically quantized copy of an ONNX model, unless it already exists.
+
+    Args:
+        model_path: The float32 ONNX model.
+        output_path: Where to write the quantized model.
+
+    Returns:
+        ``output_path``.
+    """
+    output_path = Path(output_path)
+    if not output_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(model_path), str(output_path), weight_type=QuantType.QInt8)
+    return output_path
+
+
+def set_num_threads(num_threads: int) -> None:
+    """Pin the number of intra-op threads torch uses for inference in this process.
+
+    Args:
+        num_threads: Thread count, typically the cores reserved for this worker.
+    """
+    import torch
+
+    torch.set_num_threads(num_threads)
+
+
+class EncoderRegistry:
+    """Process-wide cache of loaded encoders keyed by model name.
+
+    Every Retriever and pipeline asking for the same ``model_name`` receives the same
+    instance, so weights are loaded and held in memory once. Loading is thread-safe and
+    happens at most once per name; different names load concurrently.
+    """
+
+    def __init__(self, loader: EncoderLoader | None = None) -> None:
+        """Create an empty registry.
+
+        Args:
+            loader: Callable building an encoder from a model name. Defaults to
+                ``SentenceTransformerEncoder``.
+        """
+        self._loader = loader
+        self._models: dict[str, Encoder] = {}
+        self._loading: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def get(self, model_name: str) -> Encoder:
+        """Return the shared encoder for ``model_name``, loading it on first request.
+
+        Args:
+            model_name: The model to load.
+
+        Returns:
+            The loaded encoder.
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+        with self._lock:
+            name_lock = self._loading.setdefault(model_name, threading.Lock())
+        with name_lock:
+            model = self._models.get(model_name)
+            if model is None:
+                loader = self._loader or SentenceTransformerEncoder
+                model = self._models[model_name] = loader(model_name)
+        return model
+
+    def warm_up(self, model_names: Iterable[str], num_threads: int | None = None) -> None:
+        """Load models and run one encode each so the first real request pays no setup cost.
+
+        Args:
+            model_names: Models to load.
+            num_threads: Optional torch thread count to pin before loading.
+        """
+        if num_threads is not None:
+            set_num_threads(num_threads)
+        for model_name in model_names:
+            self.get(model_name).encode([WARM_UP_TEXT])
+
+    def release(self, model_name: str) -> bool:
+        """Drop the registry's reference to a model so it can be garbage-collected.
+
+        Args:
+            model_name: The model to release.
+
+        Returns:
+            True if the model was loaded.
+        """
+        with self._lock:
+            self._loading.pop(model_name, None)
+            return self._models.pop(model_name, None) is not None
+
+    def clear(self) -> None:
+        """Release every model."""
+        with self._lock:
+            self._models.clear()
+            self._loading.clear()
+
+
+default_registry = EncoderRegistry()
@@ -0,0 +1,170 @@
+"""Metadata filters evaluated against per-field posting-list indexes."""
+
+import operator
+from collections.abc import Callable, Hashable, Mapping, Sequence
+from typing import Any
+
+import numpy as np
+
+Metadata = Mapping[str, Any]
+Filter = Mapping[str, Any]
+
+RANGE_OPERATORS: dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+FILTER_OPERATORS = ("$eq", "$in", *RANGE_OPERATORS)
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+class MetadataIndex:
+    """Inverted index from each metadata ``(field, value)`` to the sorted rows holding it.
+
+    Equality and ``$in`` conditions read only the postings of the requested values, and
+    range conditions scan only the rows that have a numeric value for the field, so a
+    filter costs time proportional to the postings it touches rather than to the corpus.
+    List-valued fields are indexed under each of their items. Rows are appended in
+    increasing order, so postings stay sorted without re-sorting.
+
+    A filter maps field names to conditions, all of which must hold:
+
+    - a scalar matches rows whose value (or one of whose list items) equals it;
+    - a list, tuple or set matches any of its items, like ``{"$in": [...]}``;
+    - a dict of operators (``$eq``, ``$in``, ``$gt``, ``$gte``, ``$lt``, ``$lte``) must
+      satisfy every operator, e.g. ``{"year": {"$gte": 2020, "$lt": 2024}}``.
+    """
+
+    def __init__(self) -> None:
+        self.num_rows = 0
+        self._postings: dict[str, dict[Hashable, list[int]]] = {}
+        self._numeric: dict[str, tuple[list[int], list[float]]] = {}
+        self._arrays: dict[tuple[str, Hashable], np.ndarray] = {}
+        self._columns: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    def add(self, metadata: Sequence[Metadata | None]) -> None:
+        """Index the metadata of rows ``num_rows:num_rows + len(metadata)``.
+
+        Args:
+            metadata: One mapping per new row, or None for rows without metadata.
+        """
+        for row, fields in enumerate(metadata, start=self.num_rows):
+            for field, value in (fields or {}).items():
+                values = value if isinstance(value, list | tuple | set) else (value,)
+                postings = self._postings.setdefault(field, {})
+                # Repeated list items are indexed once, so every posting stays unique.
+                for item in dict.fromkeys(values):
+                    postings.setdefault(item, []).append(row)
+                    self._arrays.pop((field, item), None)
+                    if isinstance(item, int | float) and not isinstance(item, bool):
+                        rows, numbers = self._numeric.setdefault(field, ([], []))
+                        rows.append(row)
+                        numbers.append(float(item))
+                        self._columns.pop(field, None)
+        self.num_rows += len(metadata)
+
+    def rows(self, filter: Filter) -> np.ndarray:
+        """Return the sorted rows matching every condition of ``filter``.
+
+        Args:
+            filter: Field conditions, as described in the class docstring.
+
+        Returns:
+            Sorted, unique row numbers.
+
+        Raises:
+            ValueError: If a condition uses an unsupported operator or is an empty
+                operator mapping.
+        """
+        matches = [self._field_rows(field, condition) for field, condition in filter.items()]
+        if not matches:
+            return np.arange(self.num_rows)
+        matches.sort(key=len)
+        result = matches[0]
+        for rows in matches[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def _field_rows(self, field: str, condition: Any) -> np.ndarray:
+        """Rows of one field satisfying one condition."""
+        if isinstance(condition, list | tuple | set):
+            condition = {"$in": condition}
+        elif not isinstance(condition, Mapping):
+            condition = {"$eq": condition}
+        if not condition:
+            raise ValueError(f"Empty condition for field {field!r}; use one of {FILTER_OPERATORS}")
+        unknown = [op for op in condition if op not in FILTER_OPERATORS]
+        if unknown:
+            raise ValueError(f"Unsupported filter operators {unknown}; use {FILTER_OPERATORS}")
+
+        matches = []
+        if "$eq" in condition:
+            matches.append(self._posting(field, condition["$eq"]))
+        if "$in" in condition:
+            postings = [self._posting(field, value) for value in condition["$in"]]
+            union = np.concatenate(postings) if postings else _NO_ROWS
+            matches.append(np.unique(union))
+        bounds = [(op, bound) for op, bound in condition.items() if op in RANGE_OPERATORS]
+        if bounds:
+            rows, numbers = self._column(field)
+            keep = np.ones(len(rows), dtype=bool)
+            for op, bound in bounds:
+                keep &= RANGE_OPERATORS[op](numbers, float(bound))
+            # A list-valued field holds one numeric entry per item, so a row can match twice.
+            matches.append(np.unique(rows[keep]))
+
+        result = matches[0]
+        for rows in matches[1:]:
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def _posting(self, field: str, value: Hashable) -> np.ndarray:
+        """Sorted rows holding ``value`` in ``field``, as a cached array."""
+        key = (field, value)
+        array = self._arrays.get(key)
+        if array is None:
+            rows = self._postings.get(field, {}).get(value)
+            if rows is None:
+                return _NO_ROWS
+            array = self._arrays[key] = np.array(rows, dtype=np.intp)
+        return array
+
+    def _column(self, field: str) -> tuple[np.ndarray, np.ndarray]:
+        """Rows with a numeric value in ``field`` and those values, as cached arrays."""
+        column = self._columns.get(field)
+        if column is None:
+            rows, numbers = self._numeric.get(field, ([], []))
+            column = self._columns[field] = (
+                np.array(rows, dtype=np.intp),
+                np.array(numbers, dtype=np.float64),
+            )
+        return column
+
+
+def filter_key(filter: Filter | None) -> Hashable:
+    """Return a hashable, order-independent key for a filter, for use in cache keys.
+
+    Args:
+        filter: A filter, or None.
+
+    Returns:
+        None for no filter, else a nested tuple of sorted items.
+    """
+    if not filter:
+        return None
+    return _freeze(filter)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Recursively turn mappings and collections into sorted tuples."""
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, set | frozenset):
+        return ("$set", tuple(sorted(map(repr, value))))
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -0,0 +1,89 @@
+"""Document chunking and streaming helpers for index builds."""
+
+from collections.abc import Iterable, Iterator
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_CHUNK_OVERLAP = 40
+DEFAULT_INGEST_BATCH_SIZE = 256
+
+Chunk = tuple[str, str, str]
+
+
+def chunk_text(
+    text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_CHUNK_OVERLAP
+) -> list[str]:
+    """Split text into overlapping windows of whitespace-separated words.
+
+    Words approximate model tokens closely enough to keep chunks under the encoder's
+    input limit, which silently truncates longer inputs.
+
+    Args:
+        text: The document text.
+        chunk_size: Maximum number of words per chunk.
+        overlap: Number of words shared by consecutive chunks.
+
+    Returns:
+        The chunks in document order; a single chunk if the text is short enough,
+        and no chunks for blank text.
+
+    Raises:
+        ValueError: If ``overlap`` is not smaller than ``chunk_size``.
+    """
+    if not 0 <= overlap < chunk_size:
+        raise ValueError(f"overlap must be in [0, chunk_size), got {overlap} for {chunk_size}")
+    words = text.split()
+    if len(words) <= chunk_size:
+        return [" ".join(words)] if words else []
+    step = chunk_size - overlap
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start : start + chunk_size]))
+        if start + chunk_size >= len(words):
+            break
+    return chunks
+
+
+def iter_chunks(
+    documents: Iterable[str | tuple[str, str]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_CHUNK_OVERLAP,
+) -> Iterator[Chunk]:
+    """Lazily chunk a stream of documents.
+
+    Args:
+        documents: Iterable of texts or ``(document_id, text)`` pairs. Bare texts get
+            their stream position as ID.
+        chunk_size: Maximum number of words per chunk.
+        overlap: Number of words shared by consecutive chunks.
+
+    Yields:
+        ``(chunk_id, parent_id, chunk_text)`` tuples, where ``chunk_id`` is
+        ``"<parent_id>#<n>"``.
+    """
+    for position, document in enumerate(documents):
+        if isinstance(document, str):
+            parent_id, text = str(position), document
+        else:
+            parent_id, text = str(document[0]), document[1]
+        for n, chunk in enumerate(chunk_text(text, chunk_size, overlap)):
+            yield f"{parent_id}#{n}", parent_id, chunk
+
+
+def iter_batches(chunks: Iterable[Chunk], batch_size: int) -> Iterator[list[Chunk]]:
+    """Group a chunk stream into lists of at most ``batch_size`` chunks.
+
+    Args:
+        chunks: The chunk stream.
+        batch_size: Maximum chunks per batch.
+
+    Yields:
+        Consecutive batches; only the last may be shorter than ``batch_size``.
+    """
+    batch: list[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
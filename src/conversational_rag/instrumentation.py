@@ -0,0 +1,337 @@
+"""Per-stage tracing, Prometheus-style metrics and a sampling profiler."""
+
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter as TallyCounter
+from collections.abc import Callable, Sequence
+from contextlib import nullcontext
+from typing import Self, TypeVar
+
+from conversational_rag.models import ConversationTurn
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+Labels = tuple[tuple[str, str], ...]
+MetricT = TypeVar("MetricT", "Counter", "Histogram")
+
+
+class _Stage:
+    """Context manager adding its elapsed time to one stage of a trace."""
+
+    __slots__ = ("_name", "_start", "_trace")
+
+    def __init__(self, trace: "Trace", name: str) -> None:
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        stages = self._trace.stages
+        stages[self._name] = stages.get(self._name, 0.0) + time.perf_counter() - self._start
+
+
+class Trace:
+    """Wall-clock seconds spent in each named stage of one request."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+
+    def stage(self, name: str) -> _Stage | nullcontext:
+        """Time the enclosed block as ``name``; repeated stages accumulate.
+
+        Args:
+            name: Stage name, e.g. ``"encode"``.
+
+        Returns:
+            A context manager.
+        """
+        return _Stage(self, name)
+
+    @property
+    def total(self) -> float:
+        """Sum of all stage durations in seconds."""
+        return sum(self.stages.values())
+
+
+class _NullTrace(Trace):
+    """Trace that records nothing, used when instrumentation is disabled."""
+
+    __slots__ = ()
+
+    _NULL_STAGE = nullcontext()
+
+    def stage(self, name: str) -> _Stage | nullcontext:
+        """Return a shared no-op context manager."""
+        return self._NULL_STAGE
+
+
+NULL_TRACE = _NullTrace()
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing counter, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the counter.
+
+        Args:
+            amount: Non-negative increment.
+            **labels: Label values identifying the series.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current value of the series with the given labels."""
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def expose(self) -> list[str]:
+        """Prometheus text exposition lines for this counter."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    def __init__(
+        self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation.
+
+        Args:
+            value: The observed value, e.g. a duration in seconds.
+            **labels: Label values identifying the series.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        """Number of observations in the series with the given labels."""
+        return sum(self._counts.get(tuple(sorted(labels.items())), ()))
+
+    def expose(self) -> list[str]:
+        """Prometheus text exposition lines for this histogram."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, float("inf")), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    series_labels = _format_labels(labels, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{series_labels} {cumulative}")
+                lines.append(
+                    f"{self.name}_sum{_format_labels(labels)} {_format_value(self._sums[labels])}"
+                )
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms exportable in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """Return the counter called ``name``, creating it on first use."""
+        return self._get_or_create(name, lambda: Counter(name, documentation), Counter)
+
+    def histogram(
+        self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        """Return the histogram called ``name``, creating it on first use."""
+        return self._get_or_create(name, lambda: Histogram(name, documentation, buckets), Histogram)
+
+    def export(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].expose())
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(
+        self, name: str, factory: Callable[[], MetricT], kind: type[MetricT]
+    ) -> MetricT:
+        """Return the metric called ``name``, refusing to reuse a name across kinds."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics.setdefault(name, factory())
+        if not isinstance(metric, kind):
+            raise TypeError(f"Metric {name!r} is already registered as a {type(metric).__name__}")
+        return metric
+
+
+class MetricsHook(ABC):
+    """Receives every completed turn; implement to forward timings to any metrics system."""
+
+    @abstractmethod
+    def on_turn(self, turn: ConversationTurn) -> None:
+        """Record a completed turn.
+
+        Args:
+            turn: The turn, with per-stage ``timings`` in seconds.
+        """
+
+
+class PrometheusMetrics(MetricsHook):
+    """Records query counts and per-stage latency histograms into a MetricsRegistry."""
+
+    def __init__(self, registry: MetricsRegistry | None = None, prefix: str = "rag") -> None:
+        """Create the hook.
+
+        Args:
+            registry: Registry to record into. A new one is created if None.
+            prefix: Prefix for metric names.
+        """
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self._queries = self.registry.counter(f"{prefix}_queries_total", "Queries processed.")
+        self._empty = self.registry.counter(
+            f"{prefix}_empty_results_total", "Queries that retrieved no documents."
+        )
+        self._latency = self.registry.histogram(
+            f"{prefix}_query_seconds", "End-to-end query latency in seconds."
+        )
+        self._stages = self.registry.histogram(
+            f"{prefix}_stage_seconds", "Query latency per pipeline stage in seconds."
+        )
+
+    def on_turn(self, turn: ConversationTurn) -> None:
+        """Count the query and observe its total and per-stage latency."""
+        self._queries.inc()
+        if not turn.sources:
+            self._empty.inc()
+        self._latency.observe(sum(turn.timings.values()))
+        for stage, seconds in turn.timings.items():
+            self._stages.observe(seconds, stage=stage)
+
+    def export(self) -> str:
+        """Render the registry in the Prometheus text exposition format."""
+        return self.registry.export()
+
+
+class SamplingProfiler:
+    """Statistical profiler that periodically samples one thread's Python stack.
+
+    A daemon thread wakes every ``interval`` seconds and tallies the target thread's
+    current call stack, so the profiled code runs at full speed between samples. Results
+    are returned in the collapsed-stack format understood by flame graph tools.
+    """
+
+    def __init__(
+        self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_id: int | None = None
+    ) -> None:
+        """Create the profiler.
+
+        Args:
+            interval: Seconds between samples.
+            thread_id: Thread to sample. Defaults to the thread calling ``start``.
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples: TallyCounter[str] = TallyCounter()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the profiler is currently sampling."""
+        return self._sampler is not None
+
+    def start(self) -> None:
+        """Begin sampling; a no-op if already running."""
+        if self._sampler is not None:
+            return
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop sampling and keep the collected samples."""
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+
+    def collapsed(self) -> str:
+        """Samples as ``frame;frame;frame count`` lines, root frame first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _sample_loop(self) -> None:
+        """Sampler thread body."""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{code.co_name}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
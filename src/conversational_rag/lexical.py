@@ -0,0 +1,277 @@
+"""BM25 lexical index and rank-fusion helpers for hybrid retrieval."""
+
+import re
+from collections import Counter
+from collections.abc import Sequence
+
+import numpy as np
+
+from conversational_rag.backends import select_top_k
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-_.:/]\w+)*")
+SUBWORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+CHARS_PER_SUBWORD = 5
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+RRF_K = 60
+DELTA_MERGE_FRACTION = 0.1
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens that keep codes like ``ERR-404`` or ``v2.1`` intact.
+
+    Args:
+        text: The text to tokenize.
+
+    Returns:
+        Tokens in order of appearance.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many subword tokens a model tokenizer would produce, without one.
+
+    Every punctuation mark counts as one token and every word as one token per
+    ``CHARS_PER_SUBWORD`` characters, which tracks BPE/WordPiece lengths of English
+    text closely enough for budgeting.
+
+    Args:
+        text: The text to measure.
+
+    Returns:
+        The estimated token count.
+    """
+    return sum(1 + (len(piece) - 1) // CHARS_PER_SUBWORD for piece in SUBWORD_PATTERN.findall(text))
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index stored as compact CSR arrays.
+
+    Postings for term ``t`` are ``doc_ids[offsets[t]:offsets[t + 1]]`` with matching term
+    frequencies in ``tfs``. Querying touches only the postings of the query's terms, so it
+    needs no model forward pass.
+
+    Documents added after ``build`` go to a small delta segment of per-term posting lists,
+    which is merged into the CSR arrays once it exceeds ``DELTA_MERGE_FRACTION`` of the
+    index, so appending costs time proportional to the new documents only. Inverse
+    document frequencies are computed per query term from both segments.
+    """
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> None:
+        """Create an empty index.
+
+        Args:
+            k1: Term-frequency saturation parameter.
+            b: Document-length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+        self.num_docs = 0
+        self._vocabulary: dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._doc_lengths = np.empty(0, dtype=np.float32)
+        self._total_length = 0.0
+        self._delta: dict[str, tuple[list[int], list[int]]] = {}
+        self._delta_docs = 0
+
+    def build(self, texts: Sequence[str]) -> None:
+        """Tokenize ``texts`` and build the postings, replacing any indexed document.
+
+        Row ``i`` is ``texts[i]``.
+
+        Args:
+            texts: Document texts in row order.
+        """
+        self.num_docs = 0
+        self._vocabulary = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._total_length = 0.0
+        self._delta = {}
+        self._delta_docs = 0
+        self.add(texts)
+        self._merge()
+
+    def add(self, texts: Sequence[str]) -> None:
+        """Append documents as the next rows, tokenizing only the new texts.
+
+        Args:
+            texts: Document texts in row order, numbered from ``num_docs``.
+        """
+        if not texts:
+            return
+        self._reserve(self.num_docs + len(texts))
+        for doc, text in enumerate(texts, start=self.num_docs):
+            tokens = tokenize(text)
+            self._doc_lengths[doc] = len(tokens)
+            self._total_length += len(tokens)
+            for term, tf in Counter(tokens).items():
+                docs, tfs = self._delta.setdefault(term, ([], []))
+                docs.append(doc)
+                tfs.append(tf)
+        self.num_docs += len(texts)
+        self._delta_docs += len(texts)
+        if self._delta_docs > DELTA_MERGE_FRACTION * (self.num_docs - self._delta_docs):
+            self._merge()
+
+    def compact(self, keep: np.ndarray) -> None:
+        """Drop every row not in ``keep`` and renumber the rest, without re-tokenizing.
+
+        Args:
+            keep: Sorted row numbers to retain; row ``keep[i]`` becomes row ``i``.
+        """
+        self._merge()
+        renumber = np.full(self.num_docs, -1, dtype=np.int64)
+        renumber[keep] = np.arange(len(keep))
+        terms = np.repeat(np.arange(len(self._vocabulary)), np.diff(self._offsets))
+        kept = renumber[self._doc_ids] >= 0
+        document_frequency = np.bincount(terms[kept], minlength=len(self._vocabulary))
+        self._offsets = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+        self._doc_ids = renumber[self._doc_ids[kept]].astype(np.int32)
+        self._tfs = self._tfs[kept]
+        self._doc_lengths = np.ascontiguousarray(self._doc_lengths[keep])
+        self.num_docs = len(keep)
+        self._total_length = float(self._doc_lengths.sum())
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query``.
+
+        Args:
+            query: The query text.
+
+        Returns:
+            Float32 array with one score per document; zero where no query term occurs.
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        if self.num_docs == 0:
+            return scores
+        lengths = self._doc_lengths[: self.num_docs]
+        average_length = max(self._total_length / self.num_docs, 1.0)
+        for term in set(tokenize(query)):
+            docs, tf = self._postings(term)
+            if len(docs) == 0:
+                continue
+            idf = np.log1p((self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / average_length)
+            scores[docs] += np.float32(idf) * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(
+        self, query: str, k: int, alive: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the ``k`` best-matching rows that share at least one term with the query.
+
+        Args:
+            query: The query text.
+            k: Maximum number of rows.
+            alive: Optional boolean mask of rows that may be returned.
+
+        Returns:
+            (rows, scores) sorted by descending score.
+        """
+        scores = self.scores(query)
+        if alive is not None:
+            scores[~alive[: self.num_docs]] = 0.0
+        matching = np.flatnonzero(scores > 0)
+        top = select_top_k(scores[matching], k)
+        return matching[top], scores[matching[top]]
+
+    def _postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Rows containing ``term`` and their term frequencies, from both segments."""
+        term_id = self._vocabulary.get(term)
+        if term_id is None:
+            docs, tfs = self._doc_ids[:0], self._tfs[:0]
+        else:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            docs, tfs = self._doc_ids[start:end], self._tfs[start:end]
+        if term in self._delta:
+            delta_docs, delta_tfs = self._delta[term]
+            docs = np.concatenate([docs, np.asarray(delta_docs, dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(delta_tfs, dtype=np.float32)])
+        return docs, tfs
+
+    def _merge(self) -> None:
+        """Fold the delta segment into the CSR arrays, keeping postings in row order."""
+        if not self._delta:
+            self._delta_docs = 0
+            return
+        terms = [np.repeat(np.arange(len(self._vocabulary)), np.diff(self._offsets))]
+        doc_ids, tfs = [self._doc_ids], [self._tfs]
+        for term, (docs, counts) in self._delta.items():
+            term_id = self._vocabulary.setdefault(term, len(self._vocabulary))
+            terms.append(np.full(len(docs), term_id))
+            doc_ids.append(np.asarray(docs, dtype=np.int32))
+            tfs.append(np.asarray(counts, dtype=np.float32))
+        term_array = np.concatenate(terms)
+        order = np.argsort(term_array, kind="stable")
+        document_frequency = np.bincount(term_array, minlength=len(self._vocabulary))
+        self._offsets = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+        self._doc_ids = np.concatenate(doc_ids)[order]
+        self._tfs = np.concatenate(tfs)[order]
+        self._delta = {}
+        self._delta_docs = 0
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow the document-length buffer geometrically to hold ``capacity`` rows."""
+        if len(self._doc_lengths) >= capacity:
+            return
+        lengths = np.empty(max(capacity, 2 * len(self._doc_lengths)), dtype=np.float32)
+        lengths[: self.num_docs] = self._doc_lengths[: self.num_docs]
+        self._doc_lengths = lengths
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray], k: int, rrf_k: int = RRF_K
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked row lists by summing ``1 / (rrf_k + rank)``.
+
+    Args:
+        rankings: Row arrays, each sorted best first.
+        k: Number of fused rows to keep.
+        rrf_k: Rank offset damping the influence of top positions.
+
+    Returns:
+        (rows, fused_scores) sorted by descending fused score.
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking.tolist(), start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (rrf_k + rank)
+    return _top_of(fused, k)
+
+
+def weighted_fusion(
+    results: Sequence[tuple[np.ndarray, np.ndarray]], weights: Sequence[float], k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse scored row lists by a weighted sum of min-max normalized scores.
+
+    Args:
+        results: (rows, scores) pairs from each retriever.
+        weights: One weight per result list.
+        k: Number of fused rows to keep.
+
+    Returns:
+        (rows, fused_scores) sorted by descending fused score.
+    """
+    fused: dict[int, float] = {}
+    for (rows, scores), weight in zip(results, weights):
+        if len(rows) == 0:
+            continue
+        low, high = float(scores.min()), float(scores.max())
+        spread = high - low
+        normalized = (scores - low) / spread if spread > 0 else np.ones_like(scores)
+        for row, score in zip(rows.tolist(), normalized.tolist()):
+            fused[row] = fused.get(row, 0.0) + weight * score
+    return _top_of(fused, k)
+
+
+def _top_of(fused: dict[int, float], k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Turn a row -> score mapping into top-k arrays."""
+    rows = np.fromiter(fused.keys(), dtype=np.intp, count=len(fused))
+    scores = np.fromiter(fused.values(), dtype=np.float32, count=len(fused))
+    top = select_top_k(scores, k)
+    return rows[top], scores[top]
@@ -1,26 +1,125 @@
-from conversational_rag.models import Message
+from collections import deque
+from collections.abc import Iterator, Sequence
+from itertools import islice
+
+from conversational_rag.lexical import estimate_tokens
+from conversational_rag.models import HistorySummary, Message, TopicState
+from conversational_rag.reformulator import extract_key_phrases
+from conversational_rag.storage import MessageStore
 
 DEFAULT_MAX_HISTORY = 50
 DEFAULT_CONTEXT_WINDOW = 10
+DEFAULT_SUMMARY_TOKENS = 64
+MAX_SUMMARY_PHRASES = 24
+SUMMARY_PREFIX = "Earlier topics: "
+
+
+class MessageWindow(Sequence[Message]):
+    """Read-only view of the last messages of a ConversationMemory, without copying them.
+
+    The view is bound to the memory's state at creation time and raises RuntimeError if
+    used after the memory has been modified.
+    """
+
+    __slots__ = ("_length", "_memory", "_start", "_version")
+
+    def __init__(self, memory: "ConversationMemory", n: int) -> None:
+        self._memory = memory
+        self._length = max(0, min(n, len(memory._messages)))
+        self._start = len(memory._messages) - self._length
+        self._version = memory._version
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int | slice) -> Message | list[Message]:
+        self._check_version()
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("message window index out of range")
+        return self._memory._messages[self._start + index]
+
+    def __iter__(self) -> Iterator[Message]:
+        # Index from the tail end of the deque, which is O(1) per message for recent windows.
+        self._check_version()
+        messages = self._memory._messages
+        return (messages[i] for i in range(self._start, self._start + self._length))
+
+    def __reversed__(self) -> Iterator[Message]:
+        self._check_version()
+        return islice(reversed(self._memory._messages), self._length)
+
+    def _check_version(self) -> None:
+        if self._memory._version != self._version:
+            raise RuntimeError("ConversationMemory changed after the window was created")
 
 
 class ConversationMemory:
-    """Stores and manages conversation message history with a configurable size limit."""
+    """Stores and manages conversation message history with a configurable size limit.
+
+    Messages live in a bounded deque, so appending and evicting the oldest message are
+    O(1). The plain-text summary is joined only when requested and cached until the next
+    change, and the per-message token estimates used by ``budgeted_context`` are computed
+    by that method for the messages added since its last call, so memories that are never
+    budgeted pay for neither.
+    ``topic`` holds the running TopicState used by semantic reformulation and
+    ``history_summary`` the compact summary of turns that fell out of the context budget;
+    both live in RAM only and are reset by ``clear``.
+
+    With a ``store``, every message is also persisted under ``session_id`` and history from
+    earlier processes is loaded lazily: a context window reads only its last ``n`` messages,
+    and the full history is loaded only when it is requested. Before resident history is
+    used, the store's message count for the session is compared with the count it
+    reflects; if another worker has written to the session since, the resident history
+    is dropped and reloaded, so sessions need not stick to one worker.
+    """
+
+    def __init__(
+        self,
+        max_history: int = DEFAULT_MAX_HISTORY,
+        store: MessageStore | None = None,
+        session_id: str = "default",
+    ) -> None:
+        self._messages: deque[Message] = deque(maxlen=max_history)
+        self._tokens: deque[int] = deque(maxlen=max_history)  # estimates of the newest messages
+        self._counted = 0  # value of _appended when _tokens was last extended
+        self._summary: str | None = None  # joined lazily by summarize_history
+        self._appended = 0  # position of the next message, counted since the last reload
+        self._version = 0
+        self.topic = TopicState()
+        self.history_summary = HistorySummary()
+        self.store = store
+        self.session_id = session_id
+        self._complete = store is None
+        self._stored = 0  # store messages the resident history reflects
+
+    def __len__(self) -> int:
+        """Number of messages resident in memory."""
+        return len(self._messages)
 
-    def __init__(self, max_history: int = DEFAULT_MAX_HISTORY) -> None:
-        self.max_history = max_history
-        self._messages: list[Message] = []
+    @property
+    def max_history(self) -> int:
+        """Maximum number of messages retained."""
+        return self._messages.maxlen
 
     def add_message(self, role: str, content: str) -> None:
-        """Append a message and trim history if it exceeds the maximum.
+        """Append a message, evicting the oldest one if history is at its maximum.
 
         Args:
             role: The message role, either "user" or "assistant".
             content: The text content of the message.
         """
-        self._messages.append(Message(role=role, content=content))
-        if len(self._messages) > self.max_history:
-            self._messages = self._messages[-self.max_history :]
+        message = Message(role=role, content=content)
+        self._messages.append(message)
+        self._summary = None
+        self._appended += 1
+        self._version += 1
+        if self.store is not None:
+            self.store.append(self.session_id, [message])
+            self._stored += 1
 
     def get_history(self, max_messages: int | None = None) -> list[Message]:
         """Return conversation history, optionally limited to the last N messages.
@@ -32,8 +131,9 @@ class ConversationMemory:
             List of messages in chronological order.
         """
         if max_messages is None:
+            self._load_all()
             return list(self._messages)
-        return list(self._messages[-max_messages:])
+        return list(self.window(max_messages))
 
     def get_context_window(self, n: int = DEFAULT_CONTEXT_WINDOW) -> list[Message]:
         """Return the last N messages as context for query reformulation.
@@ -44,11 +144,28 @@ class ConversationMemory:
         Returns:
             List of the most recent messages.
         """
-        return list(self._messages[-n:])
+        return list(self.window(n))
+
+    def window(self, n: int = DEFAULT_CONTEXT_WINDOW) -> MessageWindow:
+        """Return a zero-copy view of the last N messages.
+
+        Args:
+            n: Number of recent messages to include.
+
+        Returns:
+            A MessageWindow that is valid until the memory is next modified.
+        """
+        self._load_tail(n)
+        return MessageWindow(self, n)
 
     def clear(self) -> None:
-        """Remove all messages from history."""
-        self._messages.clear()
+        """Remove all messages from history, including persisted ones."""
+        self._replace([])
+        self._complete = True
+        self._stored = 0
+        self.topic = TopicState()
+        if self.store is not None:
+            self.store.delete(self.session_id)
 
     def summarize_history(self) -> str:
         """Produce a plain-text summary of the conversation history.
@@ -56,10 +173,127 @@ class ConversationMemory:
         Returns:
             Newline-separated string of "Role: content" lines, or empty string if no history.
         """
-        if not self._messages:
-            return ""
-        lines = []
-        for msg in self._messages:
-            role_label = msg.role.capitalize()
-            lines.append(f"{role_label}: {msg.content}")
-        return "\n".join(lines)
+        self._load_all()
+        if self._summary is None:
+            self._summary = "\n".join(map(_line, self._messages))
+        return self._summary
+
+    def budgeted_context(
+        self, max_tokens: int, summary_tokens: int = DEFAULT_SUMMARY_TOKENS
+    ) -> tuple[str, list[Message], int]:
+        """Select the newest messages that fit a token budget and summarize the older ones.
+
+        Each message's token estimate is computed once, by the first call after it was
+        added, and each message is rolled into ``history_summary`` once, the first time it
+        falls outside the budget. The work per call is therefore proportional to the messages returned
+        rather than to the length of the conversation. Only user messages contribute key
+        phrases to the summary; assistant messages echo retrieved sources.
+
+        Args:
+            max_tokens: Budget for the summary and the verbatim messages together.
+            summary_tokens: Upper bound on the summary's size, further capped at half of
+                ``max_tokens`` so the newest messages always keep room. Only the tokens the
+                rendered summary actually needs are taken from the verbatim messages.
+
+        Returns:
+            (summary, messages, tokens): the summary line, empty while the whole history
+            fits; the most recent messages in chronological order; and the estimated
+            token count of both.
+        """
+        self._load_all()
+        counts = self._token_counts()
+        summary_limit = min(summary_tokens, max_tokens // 2)
+        count = tokens = 0
+        for message_tokens in reversed(counts):
+            if tokens + message_tokens > max_tokens:
+                break
+            tokens += message_tokens
+            count += 1
+        self._fold(len(self._messages) - count)
+        summary = self._render_summary(summary_limit)
+        summary_size = estimate_tokens(summary)
+        while count and tokens + summary_size > max_tokens:
+            count -= 1
+            tokens -= counts[len(counts) - count - 1]
+            self._fold(len(self._messages) - count)
+            summary = self._render_summary(summary_limit)
+            summary_size = estimate_tokens(summary)
+        return summary, list(MessageWindow(self, count)), tokens + summary_size
+
+    def _token_counts(self) -> deque[int]:
+        """Token estimates aligned with the resident messages, estimating only new ones."""
+        new = min(self._appended - self._counted, len(self._messages))
+        for index in range(len(self._messages) - new, len(self._messages)):
+            self._tokens.append(estimate_tokens(_line(self._messages[index])))
+        self._counted = self._appended
+        return self._tokens
+
+    def _fold(self, stop: int) -> None:
+        """Roll resident messages before index ``stop`` into the summary, each only once."""
+        offset = self._appended - len(self._messages)
+        state = self.history_summary
+        start = max(state.folded - offset, 0)
+        if start >= stop:
+            return
+        phrases = state.key_phrases
+        for index in range(start, stop):
+            message = self._messages[index]
+            if message.role == "user":
+                phrases = [*extract_key_phrases(message.content), *phrases]
+        state.key_phrases = list(dict.fromkeys(phrases))[:MAX_SUMMARY_PHRASES]
+        state.folded = offset + stop
+
+    def _render_summary(self, max_tokens: int) -> str:
+        """Render the most recent summary phrases that fit ``max_tokens``."""
+        tokens = estimate_tokens(SUMMARY_PREFIX)
+        kept = []
+        for phrase in self.history_summary.key_phrases:
+            tokens += estimate_tokens(phrase) + 1  # the "; " separator
+            if tokens > max_tokens:
+                break
+            kept.append(phrase)
+        return SUMMARY_PREFIX + "; ".join(kept) if kept else ""
+
+    def _load_tail(self, n: int) -> None:
+        """Ensure at least the last ``n`` messages are resident, reading only those."""
+        self._revalidate()
+        if self._complete or len(self._messages) >= n:
+            return
+        messages = self.store.load_recent(self.session_id, min(n, self.max_history))
+        self._replace(messages)
+        self._complete = len(messages) < n
+
+    def _load_all(self) -> None:
+        """Ensure the full (``max_history``-bounded) history is resident."""
+        self._revalidate()
+        if self._complete:
+            return
+        self._replace(self.store.load_recent(self.session_id, self.max_history))
+        self._complete = True
+
+    def _revalidate(self) -> None:
+        """Drop resident history that no longer matches the store's copy of the session."""
+        if self.store is None:
+            return
+        stored = self.store.count(self.session_id)
+        if stored != self._stored:
+            self._replace([])
+            self._complete = False
+            self._stored = stored
+
+    def _replace(self, messages: list[Message]) -> None:
+        """Reset resident messages, dropping cached token counts and summary."""
+        self._messages.clear()
+        self._messages.extend(messages)
+        self._tokens.clear()
+        self._counted = 0
+        self._summary = None
+        # Positions restart with the reloaded history, so the summary is rebuilt from it.
+        self._appended = len(self._messages)
+        self.history_summary = HistorySummary()
+        self._version += 1
+
+
+def _line(message: Message) -> str:
+    """Render a message as one ``"Role: content"`` summary line."""
+    return f"{message.role.capitalize()}: {message.content}"
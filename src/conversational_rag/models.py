@@ -1,17 +1,19 @@
+import time
 from dataclasses import dataclass, field
-from datetime import datetime
 
+import numpy as np
 
-@dataclass
+
+@dataclass(slots=True)
 class Message:
     """A single message in a conversation with role, content, and timestamp."""
 
     role: str  # "user" or "assistant"
     content: str
-    timestamp: float = field(default_factory=lambda: datetime.now().timestamp())
+    timestamp: float = field(default_factory=time.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationTurn:
     """Result of a single RAG query including the original, reformulated query, response, and sources."""
 
@@ -19,3 +21,21 @@ class ConversationTurn:
     reformulated_query: str
     response: str
     sources: list[str] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)  # stage -> seconds, when traced
+    context: str = ""  # token-budgeted history and sources, when a ContextBuilder is set
+
+
+@dataclass(slots=True)
+class TopicState:
+    """Running topic of one conversation, used for semantic query reformulation."""
+
+    embedding: np.ndarray | None = None  # normalized running mean of on-topic queries
+    key_phrases: list[str] = field(default_factory=list)  # most recent first
+
+
+@dataclass(slots=True)
+class HistorySummary:
+    """Compact summary of the turns that no longer fit a conversation's context budget."""
+
+    key_phrases: list[str] = field(default_factory=list)  # most recent first
+    folded: int = 0  # messages rolled in so far, counted in ConversationMemory positions
@@ -0,0 +1,150 @@
+"""Multi-process corpus embedding with resumable, checkpointed shards."""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from conversational_rag.encoders import SentenceTransformerEncoder, set_num_threads
+
+DEFAULT_SHARD_SIZE = 4096
+CHECKPOINT_MANIFEST = "checkpoint.json"
+
+ModelFactory = Callable[[], Any]
+
+_worker_model: Any = None
+
+
+def _init_worker(model_factory: ModelFactory, threads_per_worker: int | None) -> None:
+    """Load the model once per worker process and optionally pin its thread count."""
+    global _worker_model
+    if threads_per_worker is not None:
+        set_num_threads(threads_per_worker)
+    _worker_model = model_factory()
+
+
+def _encode_shard(
+    shard: int, texts: list[str], checkpoint_dir: str | None
+) -> tuple[int, np.ndarray | None]:
+    """Encode one shard in a worker, writing it to the checkpoint directory if given."""
+    embeddings = np.asarray(_worker_model.encode(texts))
+    if checkpoint_dir is None:
+        return shard, embeddings
+    path = _shard_path(checkpoint_dir, shard)
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, path)
+    return shard, None
+
+
+def _shard_path(checkpoint_dir: str | Path, shard: int) -> Path:
+    return Path(checkpoint_dir) / f"shard-{shard:06d}.npy"
+
+
+def _corpus_fingerprint(texts: Sequence[str], model_id: str, shard_size: int) -> str:
+    """Hash the corpus and sharding so stale checkpoints are never reused."""
+    digest = hashlib.sha256(f"{model_id}\0{shard_size}\0{len(texts)}".encode())
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def encode_parallel(
+    texts: Sequence[str],
+    model_name: str,
+    workers: int | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    checkpoint_dir: str | Path | None = None,
+    model_factory: ModelFactory | None = None,
+    threads_per_worker: int | None = None,
+) -> np.ndarray:
+    """Encode a corpus across a pool of processes, each loading the model once.
+
+    The corpus is split into contiguous shards that are encoded in parallel and merged in
+    original order. With ``checkpoint_dir``, every finished shard is written to disk and an
+    interrupted build resumes by encoding only the missing shards.
+
+    Args:
+        texts: The texts to encode.
+        model_name: Embedding model name, recorded in checkpoints.
+        workers: Number of worker processes. Defaults to the CPU count.
+        shard_size: Number of texts per shard.
+        checkpoint_dir: Optional directory for resumable shard checkpoints.
+        model_factory: Picklable zero-argument callable that builds an Encoder in a worker.
+            Defaults to ``SentenceTransformerEncoder(model_name)``.
+        threads_per_worker: Optional torch thread count per worker, to avoid
+            oversubscribing cores.
+
+    Returns:
+        The embedding matrix with one row per text, in input order.
+
+    Raises:
+        ValueError: If ``checkpoint_dir`` holds checkpoints of a different corpus or model.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    if model_factory is None:
+        model_factory = partial(SentenceTransformerEncoder, model_name)
+    workers = workers or os.cpu_count() or 1
+    shards = [texts[start : start + shard_size] for start in range(0, len(texts), shard_size)]
+
+    todo = list(range(len(shards)))
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        _check_manifest(checkpoint_dir, _corpus_fingerprint(texts, model_name, shard_size))
+        todo = [shard for shard in todo if not _shard_path(checkpoint_dir, shard).exists()]
+
+    results: dict[int, np.ndarray] = {}
+    if todo:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(todo)),
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_factory, threads_per_worker),
+        ) as pool:
+            target = None if checkpoint_dir is None else str(checkpoint_dir)
+            futures = [pool.submit(_encode_shard, shard, shards[shard], target) for shard in todo]
+            for future in as_completed(futures):
+                shard, embeddings = future.result()
+                if embeddings is not None:
+                    results[shard] = embeddings
+
+    # Merge shard by shard into one preallocated matrix so checkpointed builds never
+    # hold every shard and the merged copy at once.
+    merged: np.ndarray | None = None
+    offset = 0
+    for shard in range(len(shards)):
+        if shard in results:
+            embeddings = results.pop(shard)
+        else:
+            embeddings = np.load(_shard_path(checkpoint_dir, shard))
+        if merged is None:
+            merged = np.empty((len(texts), embeddings.shape[1]), dtype=embeddings.dtype)
+        merged[offset : offset + len(embeddings)] = embeddings
+        offset += len(embeddings)
+    return merged
+
+
+def _check_manifest(checkpoint_dir: Path, fingerprint: str) -> None:
+    """Create the checkpoint manifest, or verify it matches the current build."""
+    manifest_path = checkpoint_dir / CHECKPOINT_MANIFEST
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("fingerprint") != fingerprint:
+            raise ValueError(
+                f"{checkpoint_dir} holds checkpoints of a different corpus or model; "
+                "use an empty directory"
+            )
+        return
+    manifest_path.write_text(json.dumps({"fingerprint": fingerprint}), encoding="utf-8")
@@ -1,67 +1,512 @@
 """Conversational RAG pipeline tying memory, reformulation, and retrieval together."""
 
+import asyncio
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+
+from conversational_rag.batching import DEFAULT_MAX_WAIT_MS, MicroBatcher
+from conversational_rag.cache import SemanticResultCache
+from conversational_rag.context import ContextBuilder
+from conversational_rag.filters import Filter, Metadata, filter_key
+from conversational_rag.instrumentation import NULL_TRACE, MetricsHook, Trace
 from conversational_rag.memory import ConversationMemory
 from conversational_rag.models import ConversationTurn, Message
 from conversational_rag.reformulator import QueryReformulator
+from conversational_rag.rerank import Reranker
 from conversational_rag.retriever import Retriever
+from conversational_rag.sessions import SessionStore
 
 DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
 DEFAULT_TOP_K = 3
 CONTEXT_WINDOW_SIZE = 10
 MAX_RESPONSE_SOURCES = 2
 NO_RESULTS_MESSAGE = "No relevant information found."
+DEFAULT_SESSION_ID = "default"
+REFORMULATION_MODES = ("pronoun", "semantic")
 
 
 class ConversationalRAG:
-    """End-to-end conversational RAG pipeline combining memory, query reformulation, and retrieval."""
+    """End-to-end conversational RAG pipeline combining memory, query reformulation, and retrieval.
+
+    One pipeline serves many conversations: each ``session_id`` gets its own memory from
+    the session store, while the retriever and its model are shared.
+
+    With ``collect_timings`` or a ``metrics`` hook, every turn carries the seconds spent in
+    each stage (``context``, ``reformulate``, ``encode``, ``cache``, ``search``,
+    ``rerank``, ``assemble``, ``record``); otherwise stage timers are shared no-ops.
+
+    With ``reformulation="semantic"`` the raw query is encoded first and the reformulator
+    tracks each session's topic from that embedding; follow-ups are then searched with the
+    query blended with the topic, so every turn still costs a single encode.
 
-    def __init__(self, model_name: str = DEFAULT_MODEL_NAME) -> None:
-        self.memory = ConversationMemory()
+    With a ``reranker`` the retriever returns a dense shortlist of
+    ``reranker.shortlist_size`` candidates with their embeddings, which the reranker
+    reorders (timed as ``rerank``) before the top-k are used for the response.
+
+    With a ``result_cache`` every query is encoded first and looked up (timed as
+    ``cache``) before searching: a query whose embedding is close enough to one recently
+    answered in the same session, or, at a stricter threshold, in any session, reuses
+    its results without scanning the index. The cache is cleared whenever the index
+    changes.
+
+    With a ``context_builder`` every turn also carries, in ``context``, the session's
+    history and the retrieved sources fitted to a token budget, with older turns rolled
+    into an incrementally updated summary, so downstream prompt size stays constant as
+    conversations grow.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        retriever: Retriever | None = None,
+        executor: Executor | None = None,
+        max_batch_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        sessions: SessionStore | None = None,
+        collect_timings: bool = False,
+        metrics: MetricsHook | None = None,
+        reformulation: str = "pronoun",
+        reranker: Reranker | None = None,
+        result_cache: SemanticResultCache | None = None,
+        context_builder: ContextBuilder | None = None,
+    ) -> None:
+        """Create the pipeline.
+
+        Args:
+            model_name: Embedding model used when no retriever is supplied.
+            retriever: Optional pre-built retriever, e.g. one returned by ``Retriever.load``.
+            executor: Thread pool used by the async API for encoding, scoring and
+                indexing. None uses the event loop's default thread pool. Process pools
+                are rejected: that work reads and updates this process's index and caches.
+            max_batch_wait_ms: How long ``aquery`` waits to merge concurrent encode requests.
+            sessions: Session store holding per-conversation memory. Defaults to a
+                SessionStore with default limits.
+            collect_timings: Whether to record per-stage timings on every turn.
+            metrics: Optional hook receiving every completed turn; implies timings.
+            reformulation: ``"pronoun"`` to prepend the last user message to queries with
+                pronouns, or ``"semantic"`` for embedding-based topic tracking.
+            reranker: Optional second stage reordering a retrieval shortlist, e.g. for
+                MMR diversification or cross-encoder scoring.
+            result_cache: Optional semantic cache reusing the results of near-identical
+                recent queries.
+            context_builder: Optional builder assembling each turn's token-budgeted
+                context from history and sources.
+
+        Raises:
+            TypeError: If ``executor`` is a process pool.
+            ValueError: If ``reformulation`` is not a supported mode.
+        """
+        if isinstance(executor, ProcessPoolExecutor):
+            raise TypeError(
+                "executor must be a thread pool; use Retriever.index_parallel or "
+                "ShardedRetriever to spread work across processes"
+            )
+        if reformulation not in REFORMULATION_MODES:
+            raise ValueError(
+                f"reformulation must be one of {REFORMULATION_MODES}, got {reformulation!r}"
+            )
+        if retriever is not None:
+            model_name = retriever.model_name
+        self.sessions = sessions if sessions is not None else SessionStore()
         self.reformulator = QueryReformulator(model_name=model_name)
-        self.retriever = Retriever(model_name=model_name)
+        self.retriever = retriever if retriever is not None else Retriever(model_name=model_name)
+        self.executor = executor
+        self.reformulation = reformulation
+        self.reranker = reranker
+        self.result_cache = result_cache
+        self.context_builder = context_builder
+        self._result_cache_version = self.retriever.version
+        self.metrics = metrics
+        self.collect_timings = collect_timings or metrics is not None
+        self.batcher = MicroBatcher(
+            self.retriever.encode_queries, executor=executor, max_wait_ms=max_batch_wait_ms
+        )
+
+    @property
+    def memory(self) -> ConversationMemory:
+        """Memory of the default session, used when no ``session_id`` is given."""
+        return self.sessions.get(DEFAULT_SESSION_ID)
+
+    def warm_up(self, num_threads: int | None = None) -> None:
+        """Load the shared embedding model and run one encode before serving traffic.
+
+        A configured reranker's cross-encoder is loaded too.
+
+        Args:
+            num_threads: Optional torch thread count to pin for this process first.
+        """
+        self.retriever.warm_up(num_threads=num_threads)
+        if self.reranker is not None:
+            self.reranker.warm_up()
 
-    def index(self, documents: list[str]) -> None:
+    def index(
+        self,
+        documents: list[str],
+        ids: list[str] | None = None,
+        metadata: list[Metadata | None] | None = None,
+    ) -> None:
         """Index a collection of documents for retrieval.
 
         Args:
             documents: List of document texts to embed and index.
+            ids: Optional stable document IDs for later incremental updates.
+            metadata: Optional metadata mapping of each document, for filtered queries.
         """
-        self.retriever.index(documents)
+        self.retriever.index(documents, ids=ids, metadata=metadata)
 
-    def query(self, user_query: str, top_k: int = DEFAULT_TOP_K) -> ConversationTurn:
+    def ingest(self, documents: Iterable[str | tuple[str, str]], **kwargs) -> int:
+        """Stream, chunk and index documents; see ``Retriever.ingest``.
+
+        Args:
+            documents: Iterable of texts or ``(document_id, text)`` pairs.
+            **kwargs: ``chunk_size``, ``overlap`` and ``batch_size`` overrides.
+
+        Returns:
+            The number of chunks indexed.
+        """
+        return self.retriever.ingest(documents, **kwargs)
+
+    def save_index(self, path: str) -> None:
+        """Persist the retriever index so later processes can start via ``Retriever.load``.
+
+        Args:
+            path: Target directory.
+        """
+        self.retriever.save(path)
+
+    def query(
+        self,
+        user_query: str,
+        top_k: int = DEFAULT_TOP_K,
+        session_id: str = DEFAULT_SESSION_ID,
+        filter: Filter | None = None,
+    ) -> ConversationTurn:
         """Process a user query through reformulation, retrieval, and response generation.
 
         Args:
             user_query: The raw user question.
             top_k: Number of top documents to retrieve.
+            session_id: Conversation whose memory provides context and records the turn.
+            filter: Optional metadata filter restricting the retrieved documents, e.g.
+                ``{"tenant": "acme"}``; see ``Retriever.search``.
+
+        Returns:
+            A ConversationTurn with the query, reformulated query, response, and sources.
+        """
+        trace = self._new_trace()
+        if self.reformulation == "semantic":
+            with trace.stage("encode"):
+                embeddings = self.retriever.encode_queries([user_query])
+            [reformulated], search_embeddings = self._track_topics(
+                [user_query], [session_id], embeddings, trace
+            )
+            [results] = self._retrieve(
+                [reformulated], [session_id], search_embeddings, top_k, filter, trace
+            )
+            return self._record_turn(session_id, user_query, reformulated, results, trace)
+
+        with trace.stage("context"):
+            history = self.sessions.get(session_id).get_context_window(n=CONTEXT_WINDOW_SIZE)
+        with trace.stage("reformulate"):
+            reformulated = self.reformulator.reformulate(user_query, history)
+        if self.reranker is None and self.result_cache is None:
+            results = self.retriever.search(reformulated, top_k=top_k, trace=trace, filter=filter)
+        else:
+            with trace.stage("encode"):
+                embeddings = self.retriever.encode_queries([reformulated])
+            [results] = self._retrieve(
+                [reformulated], [session_id], embeddings, top_k, filter, trace
+            )
+        return self._record_turn(session_id, user_query, reformulated, results, trace)
+
+    def query_batch(
+        self,
+        user_queries: list[str],
+        top_k: int = DEFAULT_TOP_K,
+        session_ids: list[str] | None = None,
+        filter: Filter | None = None,
+    ) -> list[ConversationTurn]:
+        """Process many independent queries with a single batched retrieval.
+
+        Every query is reformulated against its session's context as it stood before the
+        batch, then all reformulated queries are encoded in one forward pass and scored
+        together. Turns are recorded in input order, and each carries the timings of the
+        whole batch. In semantic mode topics are tracked in input order, so a session
+        appearing twice sees its first query as the topic of the second.
+
+        Args:
+            user_queries: The raw user questions.
+            top_k: Number of top documents to retrieve per query.
+            session_ids: Session of each query. Defaults to the default session for all.
+            filter: Optional metadata filter applied to every query.
+
+        Returns:
+            One ConversationTurn per query, in input order.
+        """
+        if session_ids is None:
+            session_ids = [DEFAULT_SESSION_ID] * len(user_queries)
+        if len(session_ids) != len(user_queries):
+            raise ValueError(f"Got {len(session_ids)} session ids for {len(user_queries)} queries")
+
+        trace = self._new_trace()
+        if self.reformulation == "semantic":
+            with trace.stage("encode"):
+                embeddings = self.retriever.encode_queries(user_queries)
+            reformulated, search_embeddings = self._track_topics(
+                user_queries, session_ids, embeddings, trace
+            )
+            batch_results = self._retrieve(
+                reformulated, session_ids, search_embeddings, top_k, filter, trace
+            )
+        else:
+            batch_results, reformulated = self._pronoun_search_batch(
+                user_queries, session_ids, top_k, trace, filter
+            )
+        return [
+            self._record_turn(session_id, user_query, rewritten, results, trace)
+            for session_id, user_query, rewritten, results in zip(
+                session_ids, user_queries, reformulated, batch_results
+            )
+        ]
+
+    def _pronoun_search_batch(
+        self,
+        user_queries: list[str],
+        session_ids: list[str],
+        top_k: int,
+        trace: Trace,
+        filter: Filter | None,
+    ) -> tuple[list[list[tuple[str, float]]], list[str]]:
+        """Reformulate queries against their sessions' history and search them in one batch."""
+        with trace.stage("context"):
+            histories = {
+                session_id: self.sessions.get(session_id).get_context_window(n=CONTEXT_WINDOW_SIZE)
+                for session_id in dict.fromkeys(session_ids)
+            }
+        with trace.stage("reformulate"):
+            reformulated = [
+                self.reformulator.reformulate(query, histories[session_id])
+                for query, session_id in zip(user_queries, session_ids)
+            ]
+        if self.reranker is None and self.result_cache is None:
+            batch_results = self.retriever.search_batch(
+                reformulated, top_k=top_k, trace=trace, filter=filter
+            )
+        else:
+            with trace.stage("encode"):
+                embeddings = self.retriever.encode_queries(reformulated)
+            batch_results = self._retrieve(
+                reformulated, session_ids, embeddings, top_k, filter, trace
+            )
+        return batch_results, reformulated
+
+    async def aindex(
+        self,
+        documents: list[str],
+        ids: list[str] | None = None,
+        metadata: list[Metadata | None] | None = None,
+    ) -> None:
+        """Index documents without blocking the event loop.
+
+        Concurrent ``aquery`` calls keep being answered from the previous documents while
+        the new corpus is encoded; see ``Retriever.index``.
+
+        Args:
+            documents: List of document texts to embed and index.
+            ids: Optional stable document IDs.
+            metadata: Optional metadata mapping of each document.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, lambda: self.index(documents, ids=ids, metadata=metadata)
+        )
+
+    async def aquery(
+        self,
+        user_query: str,
+        top_k: int = DEFAULT_TOP_K,
+        session_id: str = DEFAULT_SESSION_ID,
+        filter: Filter | None = None,
+    ) -> ConversationTurn:
+        """Async variant of ``query`` that keeps encoding and scoring off the event loop.
+
+        The reformulated query is encoded through the pipeline's micro-batcher, so
+        concurrent calls, typically from different sessions, share a single model
+        forward pass.
+
+        Args:
+            user_query: The raw user question.
+            top_k: Number of top documents to retrieve.
+            session_id: Conversation whose memory provides context and records the turn.
+            filter: Optional metadata filter restricting the retrieved documents, e.g.
+                ``{"tenant": "acme"}``; see ``Retriever.search``.
 
         Returns:
             A ConversationTurn with the query, reformulated query, response, and sources.
         """
-        history = self.memory.get_context_window(n=CONTEXT_WINDOW_SIZE)
-        reformulated = self.reformulator.reformulate(user_query, history)
-        results = self.retriever.search(reformulated, top_k=top_k)
+        trace = self._new_trace()
+        if self.reformulation == "semantic":
+            with trace.stage("encode"):
+                embedding = await self.batcher.encode(user_query)
+            [reformulated], embeddings = self._track_topics(
+                [user_query], [session_id], embedding[None], trace
+            )
+        else:
+            with trace.stage("context"):
+                history = self.sessions.get(session_id).get_context_window(n=CONTEXT_WINDOW_SIZE)
+            with trace.stage("reformulate"):
+                reformulated = self.reformulator.reformulate(user_query, history)
+            with trace.stage("encode"):
+                embeddings = (await self.batcher.encode(reformulated))[None]
+        loop = asyncio.get_running_loop()
+        [results] = await loop.run_in_executor(
+            self.executor,
+            self._retrieve,
+            [reformulated],
+            [session_id],
+            embeddings,
+            top_k,
+            filter,
+            trace,
+        )
+        return self._record_turn(session_id, user_query, reformulated, results, trace)
+
+    def get_history(self, session_id: str = DEFAULT_SESSION_ID) -> list[Message]:
+        """Return the full conversation history of a session.
+
+        A session that is not resident, because it was evicted or written by another
+        worker, is read from the session store's persistent message store if it has one,
+        without making the session resident.
+
+        Args:
+            session_id: The conversation identifier.
+
+        Returns:
+            List of all messages in chronological order.
+        """
+        if session_id in self.sessions:
+            return self.sessions.get(session_id).get_history()
+        if self.sessions.store is not None:
+            return self.sessions.store.load_recent(session_id, self.sessions.max_history)
+        return []
+
+    def reset(self, session_id: str = DEFAULT_SESSION_ID) -> None:
+        """Clear a session's conversation history.
+
+        Args:
+            session_id: The conversation identifier.
+        """
+        self.sessions.drop(session_id)
+
+    def _record_turn(
+        self,
+        session_id: str,
+        user_query: str,
+        reformulated: str,
+        results: list[tuple[str, float]],
+        trace: Trace = NULL_TRACE,
+    ) -> ConversationTurn:
+        """Build the response for retrieved results and store the exchange in the session."""
         sources = [text for text, _ in results]
-        response = " ".join(sources[:MAX_RESPONSE_SOURCES]) if sources else NO_RESULTS_MESSAGE
+        memory = self.sessions.get(session_id)
+        context = ""
+        if self.context_builder is not None:
+            with trace.stage("assemble"):
+                context = self.context_builder.build(memory, sources).render()
 
-        self.memory.add_message("user", user_query)
-        self.memory.add_message("assistant", response)
+        with trace.stage("record"):
+            response = " ".join(sources[:MAX_RESPONSE_SOURCES]) if sources else NO_RESULTS_MESSAGE
+            memory.add_message("user", user_query)
+            memory.add_message("assistant", response)
+            self.sessions.touch(session_id)
 
-        return ConversationTurn(
+        turn = ConversationTurn(
             user_query=user_query,
             reformulated_query=reformulated,
             response=response,
             sources=sources,
+            timings=dict(trace.stages),
+            context=context,
         )
+        if self.metrics is not None:
+            self.metrics.on_turn(turn)
+        return turn
 
-    def get_history(self) -> list[Message]:
-        """Return the full conversation history.
+    def _retrieve(
+        self,
+        queries: list[str],
+        session_ids: list[str],
+        embeddings: np.ndarray,
+        top_k: int,
+        filter: Filter | None,
+        trace: Trace = NULL_TRACE,
+    ) -> list[list[tuple[str, float]]]:
+        """Serve encoded queries from the result cache, searching only the misses."""
+        if self.result_cache is None:
+            return self._search(queries, embeddings, top_k, filter, trace)
+
+        if self._result_cache_version != self.retriever.version:
+            self.result_cache.clear()
+            self._result_cache_version = self.retriever.version
+        scope = (top_k, filter_key(filter))
+        with trace.stage("cache"):
+            results = [
+                self.result_cache.get(embedding, scope, session_id)
+                for embedding, session_id in zip(embeddings, session_ids)
+            ]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            found_lists = self._search(
+                [queries[i] for i in missing], embeddings[missing], top_k, filter, trace
+            )
+            for i, found in zip(missing, found_lists):
+                self.result_cache.put(embeddings[i], scope, found, session_ids[i])
+                results[i] = found
+        return results
+
+    def _search(
+        self,
+        queries: list[str],
+        embeddings: np.ndarray,
+        top_k: int,
+        filter: Filter | None,
+        trace: Trace = NULL_TRACE,
+    ) -> list[list[tuple[str, float]]]:
+        """Search encoded queries, reranking a wider shortlist when a reranker is set."""
+        if self.reranker is None:
+            with trace.stage("search"):
+                return self.retriever.search_embeddings(embeddings, top_k, filter)
+        size = max(top_k, self.reranker.shortlist_size)
+        with trace.stage("search"):
+            shortlists = self.retriever.shortlist(embeddings, size, filter)
+        with trace.stage("rerank"):
+            return [
+                self.reranker.rerank(query, candidates, top_k)
+                for query, candidates in zip(queries, shortlists)
+            ]
+
+    def _track_topics(
+        self,
+        user_queries: list[str],
+        session_ids: list[str],
+        embeddings: np.ndarray,
+        trace: Trace = NULL_TRACE,
+    ) -> tuple[list[str], np.ndarray]:
+        """Reformulate encoded queries against their sessions' running topics.
 
         Returns:
-            List of all messages in chronological order.
+            (reformulated_queries, search_embeddings), one entry or row per query.
         """
-        return self.memory.get_history()
+        reformulated = []
+        search_embeddings = np.empty_like(embeddings)
+        with trace.stage("reformulate"):
+            for i, (query, session_id) in enumerate(zip(user_queries, session_ids)):
+                topic = self.sessions.get(session_id).topic
+                text, search_embeddings[i] = self.reformulator.track(query, embeddings[i], topic)
+                reformulated.append(text)
+        return reformulated, search_embeddings
 
-    def reset(self) -> None:
-        """Clear conversation history and reset the pipeline state."""
-        self.memory.clear()
+    def _new_trace(self) -> Trace:
+        """Return a fresh trace when timings are collected, else the shared no-op trace."""
+        return Trace() if self.collect_timings else NULL_TRACE
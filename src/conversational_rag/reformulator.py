@@ -1,20 +1,94 @@
 import re
 
-from conversational_rag.models import Message
+import numpy as np
+
+from conversational_rag.lexical import tokenize
+from conversational_rag.models import Message, TopicState
 
 PRONOUN_PATTERN = re.compile(
     r"\b(it|they|this|that|these|those|its|their|them|he|she)\b",
     re.IGNORECASE,
 )
+ELLIPSIS_PATTERN = re.compile(r"^\W*(and|or|but|also|what about|how about)\b", re.IGNORECASE)
 
 MAX_TOPIC_LENGTH = 100
+DEFAULT_FOLLOWUP_THRESHOLD = 0.3
+DEFAULT_TOPIC_DECAY = 0.5
+DEFAULT_TOPIC_WEIGHT = 0.5
+MAX_KEY_PHRASES = 3
+MAX_PHRASE_WORDS = 4
+
+STOPWORDS = frozenset(
+    """
+    a about above after again all also am an and any are as at be been before being below
+    between both but by can could did do does doing down during each few for from further
+    had has have having he her here hers him his how i if in into is it its itself just me
+    more most my no nor not now of off on once only or other our out over own please same
+    she should so some such tell than that the their them then there these they this those
+    through to too under until up very was we were what when where which while who whom why
+    will with would you your show give explain describe know
+    """.split()  # noqa: SIM905
+)
+
+
+def extract_key_phrases(text: str, max_phrases: int = MAX_KEY_PHRASES) -> list[str]:
+    """Extract compact key phrases as runs of consecutive non-stopword tokens.
+
+    Args:
+        text: The text to extract from, typically a user query.
+        max_phrases: Maximum number of phrases to return.
+
+    Returns:
+        Lowercase phrases of at most ``MAX_PHRASE_WORDS`` words, longest first, ties
+        broken by position.
+    """
+    phrases: list[str] = []
+    run: list[str] = []
+    for token in [*tokenize(text), ""]:
+        if token and token not in STOPWORDS:
+            run.append(token)
+            continue
+        if run:
+            phrases.append(" ".join(run[-MAX_PHRASE_WORDS:]))
+            run = []
+    unique = list(dict.fromkeys(phrases))
+    unique.sort(key=lambda phrase: -phrase.count(" "))
+    return unique[:max_phrases]
 
 
 class QueryReformulator:
-    """Rewrites user queries by resolving pronouns using conversation history."""
+    """Rewrites user queries by resolving pronouns using conversation history.
+
+    ``reformulate`` works on message text alone. ``track`` is the semantic alternative: it
+    keeps a running topic embedding per conversation, built from query embeddings the
+    retriever computes anyway, decides by similarity whether a query continues the topic
+    and, if so, prefixes a few key phrases instead of the whole previous message. It never
+    calls the model itself.
+    """
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2") -> None:
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        followup_threshold: float = DEFAULT_FOLLOWUP_THRESHOLD,
+        topic_decay: float = DEFAULT_TOPIC_DECAY,
+        topic_weight: float = DEFAULT_TOPIC_WEIGHT,
+        max_key_phrases: int = MAX_KEY_PHRASES,
+    ) -> None:
+        """Create the reformulator.
+
+        Args:
+            model_name: Embedding model whose query embeddings are passed to ``track``.
+            followup_threshold: Minimum cosine similarity between a query and the running
+                topic for the query to count as a follow-up.
+            topic_decay: Weight of the previous topic when a follow-up updates it.
+            topic_weight: Weight of the topic blended into a follow-up's search embedding.
+            max_key_phrases: Maximum key phrases kept per conversation topic.
+        """
         self.model_name = model_name
+        self.followup_threshold = followup_threshold
+        self.topic_decay = topic_decay
+        self.topic_weight = topic_weight
+        self.max_key_phrases = max_key_phrases
 
     def reformulate(self, query: str, history: list[Message]) -> str:
         """Reformulate a query by prepending context when pronouns are detected.
@@ -38,6 +112,56 @@ class QueryReformulator:
 
         return f"Regarding {last_user_topic}: {query}"
 
+    def is_followup(self, query: str, embedding: np.ndarray, topic: TopicState) -> bool:
+        """Decide whether a query continues the conversation's current topic.
+
+        Args:
+            query: The raw user query.
+            embedding: The query's normalized embedding.
+            topic: The conversation's running topic.
+
+        Returns:
+            True if a topic exists and the query is similar to it, refers back with a
+            pronoun, or opens elliptically (e.g. "and the price?").
+        """
+        if topic.embedding is None:
+            return False
+        if PRONOUN_PATTERN.search(query) or ELLIPSIS_PATTERN.match(query):
+            return True
+        return float(embedding @ topic.embedding) >= self.followup_threshold
+
+    def track(self, query: str, embedding: np.ndarray, topic: TopicState) -> tuple[str, np.ndarray]:
+        """Reformulate a query against the running topic and fold the query into it.
+
+        Args:
+            query: The raw user query.
+            embedding: The query's normalized embedding, as computed by the retriever.
+            topic: The conversation's running topic; updated in place.
+
+        Returns:
+            (reformulated_query, search_embedding). For a follow-up, the text is prefixed
+            with the topic's key phrases not already in the query, and the embedding is
+            the query blended with the topic and renormalized; otherwise both are returned
+            unchanged and the topic restarts from this query.
+        """
+        phrases = extract_key_phrases(query, self.max_key_phrases)
+        if not self.is_followup(query, embedding, topic):
+            topic.embedding = np.array(embedding, dtype=np.float32)
+            topic.key_phrases = phrases
+            return query, embedding
+
+        lowered = query.lower()
+        context = [phrase for phrase in topic.key_phrases if phrase not in lowered]
+        reformulated = f"Regarding {', '.join(context)}: {query}" if context else query
+        search_embedding = _unit(embedding + self.topic_weight * topic.embedding)
+
+        topic.embedding = _unit(
+            self.topic_decay * topic.embedding + (1.0 - self.topic_decay) * embedding
+        )
+        merged = dict.fromkeys([*phrases, *topic.key_phrases])
+        topic.key_phrases = list(merged)[: self.max_key_phrases]
+        return reformulated, search_embedding
+
     def _get_last_user_topic(self, history: list[Message]) -> str | None:
         """Extract the most recent user message content as the topic.
 
@@ -51,3 +175,9 @@ class QueryReformulator:
             if msg.role == "user":
                 return msg.content[:MAX_TOPIC_LENGTH]
         return None
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    """Return ``vector`` scaled to unit length as float32."""
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm > 0 else vector).astype(np.float32, copy=False)
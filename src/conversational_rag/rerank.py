@@ -0,0 +1,223 @@
+"""Second-stage reranking of a retrieval shortlist: MMR diversification and cross-encoders."""
+
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+DEFAULT_SHORTLIST_SIZE = 20
+DEFAULT_MMR_LAMBDA = 0.7
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+LATENCY_SMOOTHING = 0.2
+
+
+@dataclass(slots=True)
+class Candidates:
+    """First-stage results of one query, best first, with their document embeddings."""
+
+    texts: list[str]
+    scores: np.ndarray  # first-stage similarity per text
+    embeddings: np.ndarray  # normalized float32, one row per text
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray, embeddings: np.ndarray, k: int, mmr_lambda: float = DEFAULT_MMR_LAMBDA
+) -> np.ndarray:
+    """Greedily pick ``k`` items trading relevance against similarity to items already picked.
+
+    Each step maximizes ``mmr_lambda * relevance - (1 - mmr_lambda) * max_sim_to_selected``.
+    The pairwise similarities of the ``n`` candidates are computed in one matrix product and
+    the running maximum is updated with one vector operation per pick, so the cost is
+    ``O(n^2 * dim + k * n)``.
+
+    Args:
+        relevance: Relevance of each candidate, higher is better.
+        embeddings: Normalized candidate embeddings, one row per candidate.
+        k: Number of candidates to select.
+        mmr_lambda: 1.0 ranks purely by relevance; lower values favour diversity.
+
+    Returns:
+        Indices of the selected candidates in selection order.
+    """
+    k = min(k, len(relevance))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    similarity = embeddings @ embeddings.T
+    weighted = mmr_lambda * np.asarray(relevance, dtype=np.float32)
+    max_similarity = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    selected = np.empty(k, dtype=np.intp)
+    for step in range(k):
+        marginal = weighted - (1.0 - mmr_lambda) * max_similarity
+        marginal[~available] = -np.inf
+        best = int(np.argmax(marginal))
+        selected[step] = best
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
+
+
+class CrossEncoder(ABC):
+    """Scores (query, document) pairs jointly; more accurate but slower than bi-encoders."""
+
+    def load(self) -> None:
+        """Load any model weights ahead of the first ``score`` call. Must be idempotent."""
+
+    @abstractmethod
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Score one query against several documents in a single batch.
+
+        Args:
+            query: The query text.
+            texts: Candidate document texts.
+
+        Returns:
+            One relevance score per text, higher is better.
+        """
+
+
+class SentenceTransformerCrossEncoder(CrossEncoder):
+    """Cross-encoder backed by ``sentence_transformers.CrossEncoder``, loaded on first use."""
+
+    def __init__(self, model_name: str = DEFAULT_CROSS_ENCODER) -> None:
+        """Create the scorer without loading the model.
+
+        Args:
+            model_name: Hugging Face cross-encoder name or local path.
+        """
+        self.model_name = model_name
+        self._model: Any = None
+
+    def load(self) -> None:
+        """Import sentence-transformers and load the model, once."""
+        if self._model is None:
+            from sentence_transformers import CrossEncoder as Model
+
+            self._model = Model(self.model_name)
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Predict relevance for every (query, text) pair in one batch."""
+        self.load()
+        pairs = [(query, text) for text in texts]
+        return np.asarray(self._model.predict(pairs, show_progress_bar=False), dtype=np.float32)
+
+
+class Reranker:
+    """Reorders a retrieval shortlist before the response is assembled.
+
+    At most ``shortlist_size`` first-stage results, or ``top_k`` if larger, are considered.
+    An optional cross-encoder rescores them in one batch; with a ``latency_budget_ms`` it
+    scores only as many leading candidates as its measured per-pair cost allows, but
+    always at least one so that the estimate keeps being refreshed, and the rest keep
+    their first-stage order below them. Model loading is excluded from the measurement. Maximal marginal relevance then diversifies the
+    final top-k using the candidates' existing embeddings, so near-duplicate chunks do not
+    crowd out other sources. Nothing outside the shortlist is ever scored.
+    """
+
+    def __init__(
+        self,
+        shortlist_size: int = DEFAULT_SHORTLIST_SIZE,
+        mmr_lambda: float | None = DEFAULT_MMR_LAMBDA,
+        cross_encoder: CrossEncoder | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> None:
+        """Create the reranker.
+
+        Args:
+            shortlist_size: Maximum number of first-stage results reranked per query.
+            mmr_lambda: Relevance/diversity trade-off for MMR, or None to skip MMR.
+            cross_encoder: Optional cross-encoder rescoring the shortlist.
+            latency_budget_ms: Optional per-query time budget for reranking.
+
+        Raises:
+            ValueError: If ``shortlist_size`` is not positive or ``mmr_lambda`` is
+                outside ``[0, 1]``.
+        """
+        if shortlist_size <= 0:
+            raise ValueError(f"shortlist_size must be positive, got {shortlist_size}")
+        if mmr_lambda is not None and not 0.0 <= mmr_lambda <= 1.0:
+            raise ValueError(f"mmr_lambda must be in [0, 1], got {mmr_lambda}")
+        self.shortlist_size = shortlist_size
+        self.mmr_lambda = mmr_lambda
+        self.cross_encoder = cross_encoder
+        self.latency_budget_ms = latency_budget_ms
+        self.seconds_per_pair: float | None = None
+
+    def warm_up(self) -> None:
+        """Load the cross-encoder, if any, so the first query does not pay for it."""
+        if self.cross_encoder is not None:
+            self.cross_encoder.load()
+
+    def rerank(self, query: str, candidates: Candidates, top_k: int) -> list[tuple[str, float]]:
+        """Rerank one query's shortlist.
+
+        Args:
+            query: The (reformulated) query text, used by the cross-encoder.
+            candidates: First-stage results, best first.
+            top_k: Number of results to return.
+
+        Returns:
+            Up to ``top_k`` (document_text, score) tuples in reranked order. Scores are
+            cross-encoder scores where computed, else first-stage scores.
+        """
+        start = time.perf_counter()
+        count = min(len(candidates.texts), max(self.shortlist_size, top_k))
+        texts = candidates.texts[:count]
+        scores = np.array(candidates.scores[:count], dtype=np.float32)
+        embeddings = candidates.embeddings[:count]
+        # First-stage scores are cosine similarities, on the same scale MMR compares with.
+        relevance = scores.copy()
+
+        scored = self._pairs_within_budget(count, start)
+        if scored:
+            cross_scores = self._cross_score(query, texts[:scored])
+            order = np.concatenate(
+                [np.argsort(-cross_scores, kind="stable"), np.arange(scored, count)]
+            )
+            scores[:scored] = cross_scores
+            # Cross-encoder scores are unbounded, so they are rescaled to [1, 2]: on the
+            # similarity scale, yet above every candidate the budget left unscored.
+            relevance[:scored] = _min_max(cross_scores) + 1.0
+            texts = [texts[i] for i in order]
+            scores, embeddings, relevance = scores[order], embeddings[order], relevance[order]
+
+        if self.mmr_lambda is None:
+            picked = np.arange(min(top_k, count))
+        else:
+            picked = maximal_marginal_relevance(relevance, embeddings, top_k, self.mmr_lambda)
+        return [(texts[i], float(scores[i])) for i in picked]
+
+    def _pairs_within_budget(self, count: int, start: float) -> int:
+        """Number of leading candidates the cross-encoder may score without overrunning."""
+        if self.cross_encoder is None or count == 0:
+            return 0
+        if self.latency_budget_ms is None or self.seconds_per_pair is None:
+            return count
+        remaining = self.latency_budget_ms / 1000.0 - (time.perf_counter() - start)
+        return max(1, min(count, int(remaining / self.seconds_per_pair)))
+
+    def _cross_score(self, query: str, texts: list[str]) -> np.ndarray:
+        """Score texts in one batch and update the per-pair latency estimate."""
+        self.cross_encoder.load()
+        started = time.perf_counter()
+        scores = np.asarray(self.cross_encoder.score(query, texts), dtype=np.float32)
+        per_pair = (time.perf_counter() - started) / len(texts)
+        if self.seconds_per_pair is None:
+            self.seconds_per_pair = per_pair
+        else:
+            self.seconds_per_pair += LATENCY_SMOOTHING * (per_pair - self.seconds_per_pair)
+        return scores
+
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    """Scale values to [0, 1]; constant inputs map to 1."""
+    values = np.asarray(values, dtype=np.float32)
+    if len(values) == 0:
+        return values.copy()
+    low, high = float(values.min()), float(values.max())
+    if high == low:
+        return np.ones_like(values)
+    return (values - low) / (high - low)
@@ -1,61 +1,942 @@
 """Simple vector retriever using sentence-transformers."""
 
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from functools import partial
+from pathlib import Path
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from conversational_rag.backends import ExactBackend, SearchBackend, score_subset
+from conversational_rag.cache import DEFAULT_CACHE_SIZE, LRUCache, normalize_query
+from conversational_rag.embedding_cache import EmbeddingCache
+from conversational_rag.encoders import (
+    WARM_UP_TEXT,
+    Encoder,
+    EncoderRegistry,
+    default_registry,
+    set_num_threads,
+)
+from conversational_rag.filters import Filter, Metadata, MetadataIndex, filter_key
+from conversational_rag.ingest import (
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_INGEST_BATCH_SIZE,
+    iter_batches,
+    iter_chunks,
+)
+from conversational_rag.instrumentation import NULL_TRACE, Trace
+from conversational_rag.lexical import BM25Index, reciprocal_rank_fusion, weighted_fusion
+from conversational_rag.parallel import DEFAULT_SHARD_SIZE, encode_parallel
+from conversational_rag.rerank import Candidates
 
 DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
 DEFAULT_TOP_K = 5
+INITIAL_CAPACITY = 64
+GROWTH_FACTOR = 2
+COMPACTION_THRESHOLD = 0.25
+SUPPORTED_DTYPES = ("float32", "float16")
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+FUSION_METHODS = ("rrf", "weighted")
+DEFAULT_DENSE_WEIGHT = 0.5
+HYBRID_CANDIDATE_FACTOR = 4
+MIN_HYBRID_CANDIDATES = 20
+
+INDEX_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DOCUMENTS_FILE = "documents.json"
+EMBEDDINGS_FILE = "embeddings.npy"
 
 
 class Retriever:
-    """Embeds documents with sentence-transformers and retrieves the most similar ones via cosine similarity."""
+    """Embeds documents with an Encoder and retrieves the most similar ones via cosine similarity.
+
+    Unless an ``encoder`` is given, a sentence-transformers model is loaded lazily on the
+    first encode and shared with every other Retriever using the same ``model_name``
+    through an EncoderRegistry, so constructing a Retriever is cheap and lexical-only or
+    loaded-index workflows never import torch.
+
+    Documents are keyed by stable string IDs. Embeddings live in a growable buffer so that
+    adding documents only encodes the new texts; removed documents are tombstoned and the
+    buffer is compacted once the fraction of dead rows exceeds ``compaction_threshold``.
+
+    Embeddings are L2-normalized once at index time and stored as a C-contiguous ``dtype``
+    matrix. Nearest-neighbour search is delegated to a ``SearchBackend``; the default
+    ``ExactBackend`` scores a query with a single matrix-vector product. Quantized backends
+    keep compact codes in addition to this matrix, so they reduce memory only for an index
+    reopened with ``load(path, mmap=True)``, whose matrix stays on disk and in page cache.
+
+    A BM25 inverted index over the same rows enables ``mode="lexical"`` searches that need
+    no model call and ``mode="hybrid"`` searches that fuse dense and lexical rankings. It
+    is built by the first such search, so dense-only workloads never pay for it, and from
+    then on added documents are appended to it and compaction renumbers its postings.
+
+    Documents may carry a metadata mapping. A ``filter`` passed to ``search`` is resolved
+    against per-field posting lists to the matching rows first, and only those rows are
+    scored, so filtered searches never lose results to post-filtering.
+
+    With an ``embedding_cache``, document embeddings are looked up by ``model_name`` and
+    content hash before encoding, so rebuilding an index only encodes new or changed text.
+    Give custom encoders a distinct ``model_name`` so their vectors are cached separately.
 
-    def __init__(self, model_name: str = DEFAULT_MODEL_NAME) -> None:
-        self._model = SentenceTransformer(model_name)
+    Query embeddings are memoized in an LRU cache keyed by the whitespace-normalized query,
+    and full top-k result lists can optionally be cached too; result entries are dropped
+    whenever the index changes.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        compaction_threshold: float = COMPACTION_THRESHOLD,
+        dtype: str = "float32",
+        query_cache_size: int = DEFAULT_CACHE_SIZE,
+        result_cache_size: int = 0,
+        cache_ttl: float | None = None,
+        backend: SearchBackend | None = None,
+        fusion: str = "rrf",
+        dense_weight: float = DEFAULT_DENSE_WEIGHT,
+        registry: EncoderRegistry | None = None,
+        encoder: Encoder | None = None,
+        embedding_cache: EmbeddingCache | None = None,
+    ) -> None:
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype!r}")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"fusion must be one of {FUSION_METHODS}, got {fusion!r}")
+        self.model_name = model_name
+        self._registry = registry if registry is not None else default_registry
+        self._encoder = encoder
+        self._custom_encoder = encoder is not None
+        self.embedding_cache = embedding_cache
+        self.compaction_threshold = compaction_threshold
+        self._dtype = np.dtype(dtype)
+        self._backend = backend if backend is not None else ExactBackend()
+        self.fusion = fusion
+        self.dense_weight = dense_weight
+        self._lexical: BM25Index | None = None
+        self._metadata_index: MetadataIndex | None = None
         self._documents: list[str] = []
-        self._embeddings: np.ndarray | None = None
+        self._metadata: list[Metadata | None] = []
+        self._ids: list[str] = []
+        self._id_to_row: dict[str, int] = {}
+        self._parents: dict[str, str] = {}
+        self._children: dict[str, list[str]] = {}
+        self._buffer: np.ndarray | None = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._num_deleted = 0
+        self._next_auto_id = 0
+        self._version = 0
+        self.query_cache = LRUCache(query_cache_size, cache_ttl) if query_cache_size else None
+        self.result_cache = LRUCache(result_cache_size, cache_ttl) if result_cache_size else None
+        self._result_cache_version = self._version
+
+    def __len__(self) -> int:
+        return self._size - self._num_deleted
+
+    @property
+    def version(self) -> int:
+        """Counter incremented by every change to the indexed documents."""
+        return self._version
+
+    @property
+    def encoder(self) -> Encoder:
+        """The embedding encoder; registry-managed encoders are fetched on first access."""
+        if self._encoder is None:
+            self._encoder = self._registry.get(self.model_name)
+        return self._encoder
+
+    def warm_up(self, num_threads: int | None = None) -> None:
+        """Load the encoder and run a throwaway encode so the first query pays no setup cost.
+
+        Args:
+            num_threads: Optional torch thread count to pin for this process first.
+        """
+        if num_threads is not None:
+            set_num_threads(num_threads)
+        self.encoder.encode([WARM_UP_TEXT])
+
+    @property
+    def _embeddings(self) -> np.ndarray | None:
+        """View of the occupied rows of the embedding buffer, or None before indexing."""
+        if self._buffer is None:
+            return None
+        return self._buffer[: self._size]
 
-    def index(self, documents: list[str]) -> None:
-        """Encode and store document embeddings for later retrieval.
+    def index(
+        self,
+        documents: list[str],
+        ids: Sequence[str] | None = None,
+        metadata: Sequence[Metadata | None] | None = None,
+    ) -> None:
+        """Encode and store document embeddings for later retrieval, replacing any existing index.
+
+        The new corpus is encoded before the current index is dropped, so searches running
+        concurrently keep being served from the previous documents until it is swapped in.
 
         Args:
             documents: List of document texts to index.
+            ids: Optional stable document IDs. Defaults to the string position of each document.
+            metadata: Optional metadata mapping of each document, for filtered searches.
+
+        Raises:
+            ValueError: If the number of IDs or metadata entries does not match the
+                documents, or an ID is duplicated.
+        """
+        documents, ids = self._check_corpus(documents, ids, metadata)
+        embeddings = self._encode_documents(documents) if documents else None
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+        self._reset()
+        self._append(documents, ids, embeddings=embeddings, metadata=metadata)
+        self._next_auto_id = len(documents)
+
+    def index_parallel(
+        self,
+        documents: Sequence[str],
+        ids: Sequence[str] | None = None,
+        workers: int | None = None,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        checkpoint_dir: str | Path | None = None,
+        metadata: Sequence[Metadata | None] | None = None,
+        **kwargs,
+    ) -> None:
+        """Rebuild the index, encoding the corpus across a pool of worker processes.
+
+        Each worker loads the model once; shards are merged in original order. With
+        ``checkpoint_dir`` an interrupted build can be re-run and only encodes missing shards.
+
+        Args:
+            documents: Document texts to index.
+            ids: Optional stable document IDs. Defaults to the string position of each document.
+            workers: Number of worker processes. Defaults to the CPU count.
+            shard_size: Number of documents per shard.
+            checkpoint_dir: Optional directory for resumable shard checkpoints.
+            metadata: Optional metadata mapping of each document.
+            **kwargs: Extra ``encode_parallel`` options such as ``model_factory`` or
+                ``threads_per_worker``. A custom ``encoder`` is pickled to the workers
+                unless a ``model_factory`` is given.
+        """
+        documents, ids = self._check_corpus(documents, ids, metadata)
+        if self._custom_encoder:
+            kwargs.setdefault("model_factory", partial(_return, self._encoder))
+        encode = partial(
+            encode_parallel,
+            model_name=self.model_name,
+            workers=workers,
+            shard_size=shard_size,
+            checkpoint_dir=checkpoint_dir,
+            **kwargs,
+        )
+        if self.embedding_cache is None:
+            embeddings = encode(documents)
+        else:
+            embeddings = self.embedding_cache.encode(self.model_name, documents, encode)
+            self.embedding_cache.flush()
+        self._reset()
+        self._append(documents, ids, embeddings=embeddings, metadata=metadata)
+        self._next_auto_id = len(documents)
+
+    def add_documents(
+        self,
+        documents: Sequence[str],
+        ids: Sequence[str] | None = None,
+        parent_ids: Sequence[str] | None = None,
+        metadata: Sequence[Metadata | None] | None = None,
+    ) -> list[str]:
+        """Encode only the given documents and append them to the index.
+
+        Args:
+            documents: Document texts to add.
+            ids: Optional IDs for the new documents. Generated automatically if None.
+            parent_ids: Optional source-document ID of each text, for chunked documents.
+            metadata: Optional metadata mapping of each document, for filtered searches.
+
+        Returns:
+            The IDs assigned to the added documents.
+
+        Raises:
+            ValueError: If the number of IDs or metadata entries does not match the
+                documents, or an ID is duplicated or already indexed.
+        """
+        documents = list(documents)
+        ids = self._generate_ids(len(documents)) if ids is None else [str(i) for i in ids]
+        if len(ids) != len(documents):
+            raise ValueError(f"Got {len(ids)} ids for {len(documents)} documents")
+        if parent_ids is not None and len(parent_ids) != len(documents):
+            raise ValueError(f"Got {len(parent_ids)} parent ids for {len(documents)} documents")
+        if metadata is not None and len(metadata) != len(documents):
+            raise ValueError(f"Got {len(metadata)} metadata entries for {len(documents)} documents")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Document ids must be unique")
+        existing = [doc_id for doc_id in ids if doc_id in self._id_to_row]
+        if existing:
+            raise ValueError(f"Document ids already indexed: {existing}; use upsert() instead")
+
+        self._append(documents, ids, metadata=metadata)
+        if parent_ids is not None:
+            self._link_parents(ids, [str(parent_id) for parent_id in parent_ids])
+        return ids
+
+    def ingest(
+        self,
+        documents: Iterable[str | tuple[str, str]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        overlap: int = DEFAULT_CHUNK_OVERLAP,
+        batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+    ) -> int:
+        """Stream documents into the index, chunking long texts and encoding in fixed batches.
+
+        Documents are consumed lazily, so any iterable or generator works and memory stays
+        bounded by one batch of chunks plus the index itself. Each chunk is indexed as
+        ``"<document_id>#<n>"`` and linked to its source document; re-ingesting a document
+        replaces its previous chunks. Bare texts get fresh auto-generated document IDs, so
+        ingesting a stream in several calls never replaces earlier documents.
+
+        Args:
+            documents: Iterable of texts or ``(document_id, text)`` pairs.
+            chunk_size: Maximum number of words per chunk.
+            overlap: Number of words shared by consecutive chunks.
+            batch_size: Number of chunks encoded per model call.
+
+        Returns:
+            The number of chunks indexed.
+        """
+        seen_parents: set[str] = set()
+        total = 0
+        documents = self._with_parent_ids(documents)
+        for batch in iter_batches(iter_chunks(documents, chunk_size, overlap), batch_size):
+            chunk_ids, parent_ids, texts = (list(column) for column in zip(*batch))
+            stale = [p for p in dict.fromkeys(parent_ids) if p not in seen_parents]
+            seen_parents.update(stale)
+            self.remove_parents(stale)
+            self.add_documents(texts, ids=chunk_ids, parent_ids=parent_ids)
+            total += len(batch)
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+        return total
+
+    def parent_of(self, doc_id: str) -> str | None:
+        """Return the source-document ID of an indexed chunk.
+
+        Args:
+            doc_id: ID of an indexed text.
+
+        Returns:
+            The parent document ID, or None if the text has no parent.
+        """
+        return self._parents.get(doc_id)
+
+    def metadata_of(self, doc_id: str) -> dict:
+        """Return the metadata of an indexed document.
+
+        Args:
+            doc_id: ID of an indexed text.
+
+        Returns:
+            A copy of the document's metadata; empty if it has none.
+
+        Raises:
+            KeyError: If ``doc_id`` is not indexed.
+        """
+        return dict(self._metadata[self._id_to_row[doc_id]] or {})
+
+    def remove_parents(self, parent_ids: Iterable[str]) -> int:
+        """Remove every chunk of the given source documents.
+
+        Args:
+            parent_ids: Source-document IDs.
+
+        Returns:
+            The number of chunks removed.
+        """
+        chunk_ids = [
+            chunk_id for parent_id in parent_ids for chunk_id in self._children.get(parent_id, [])
+        ]
+        return self.remove_documents(chunk_ids)
+
+    def remove_documents(self, ids: Sequence[str]) -> int:
+        """Tombstone the documents with the given IDs. Unknown IDs are ignored.
+
+        Args:
+            ids: IDs of the documents to remove.
+
+        Returns:
+            The number of documents removed.
+        """
+        rows = []
+        for doc_id in ids:
+            row = self._id_to_row.pop(str(doc_id), None)
+            if row is None:
+                continue
+            self._alive[row] = False
+            rows.append(row)
+            self._unlink_parent(str(doc_id))
+
+        removed = len(rows)
+        if removed:
+            self._backend.remove(np.array(rows, dtype=np.intp))
+            self._num_deleted += removed
+            self._version += 1
+            if self._num_deleted > self.compaction_threshold * self._size:
+                self.compact()
+        return removed
+
+    def upsert(
+        self,
+        documents: Sequence[str],
+        ids: Sequence[str],
+        metadata: Sequence[Metadata | None] | None = None,
+    ) -> list[str]:
+        """Insert new documents and replace changed ones, encoding only new or changed text.
+
+        Documents whose text is unchanged but whose metadata differs are re-indexed with
+        their existing embedding.
+
+        Args:
+            documents: Document texts.
+            ids: Stable IDs, one per document.
+            metadata: Optional new metadata of each document. If None, replaced documents
+                keep their current metadata.
+
+        Returns:
+            The IDs whose text was (re-)encoded.
+
+        Raises:
+            ValueError: If the number of IDs or metadata entries does not match the documents.
+        """
+        documents = list(documents)
+        ids = [str(i) for i in ids]
+        if len(ids) != len(documents):
+            raise ValueError(f"Got {len(ids)} ids for {len(documents)} documents")
+        if metadata is not None and len(metadata) != len(documents):
+            raise ValueError(f"Got {len(metadata)} metadata entries for {len(documents)} documents")
+
+        # Texts to encode and texts whose embedding is reused, each with its metadata.
+        pending: dict[str, tuple[str, Metadata | None]] = {}
+        retagged: dict[str, tuple[str, Metadata | None]] = {}
+        for i, (doc_id, text) in enumerate(zip(ids, documents)):
+            row = self._id_to_row.get(doc_id)
+            if metadata is not None:
+                fields = metadata[i]
+            else:
+                fields = None if row is None else self._metadata[row]
+            pending.pop(doc_id, None)
+            retagged.pop(doc_id, None)
+            if row is not None and self._documents[row] == text:
+                if (fields or {}) != (self._metadata[row] or {}):
+                    retagged[doc_id] = (text, fields)
+                continue
+            pending[doc_id] = (text, fields)
+
+        if not pending and not retagged:
+            return []
+        changed = [*pending, *retagged]
+        reused = (
+            self._embeddings[[self._id_to_row[doc_id] for doc_id in retagged]] if retagged else None
+        )
+        parents = {doc_id: self._parents[doc_id] for doc_id in changed if doc_id in self._parents}
+        self.remove_documents([doc_id for doc_id in changed if doc_id in self._id_to_row])
+        for group, embeddings in ((pending, None), (retagged, reused)):
+            if group:
+                texts, fields = zip(*group.values())
+                self._append(list(texts), list(group), embeddings=embeddings, metadata=fields)
+        self._link_parents(list(parents), list(parents.values()))
+        return list(pending)
+
+    def compact(self) -> None:
+        """Drop tombstoned rows from the embedding buffer and document lists."""
+        if self._num_deleted == 0 or self._buffer is None:
+            return
+        keep = np.flatnonzero(self._alive[: self._size])
+        lexical_current = self._lexical is not None and self._lexical.num_docs == self._size
+        self._buffer = np.ascontiguousarray(self._buffer[keep])
+        self._documents = [self._documents[i] for i in keep]
+        self._metadata = [self._metadata[i] for i in keep]
+        self._ids = [self._ids[i] for i in keep]
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._size = len(keep)
+        self._alive = np.ones(self._size, dtype=bool)
+        self._num_deleted = 0
+        self._version += 1
+        if lexical_current:
+            self._lexical.compact(keep)
+        else:
+            self._lexical = None
+        self._metadata_index = None
+        self._backend.reset()
+        self._backend.add(self._buffer, 0)
+
+    def save(self, path: str | Path) -> None:
+        """Persist documents, IDs and embeddings to a directory.
+
+        Tombstoned documents are not written. The directory contains a versioned
+        ``manifest.json``, the texts, IDs and metadata in ``documents.json`` and the normalized
+        embedding matrix in ``embeddings.npy``.
+
+        Args:
+            path: Target directory, created if it does not exist.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        live_rows = np.flatnonzero(self._alive[: self._size])
+        embeddings = self._embeddings
+        if embeddings is None:
+            embeddings = np.empty((0, 0), dtype=self._dtype)
+        elif self._num_deleted:
+            embeddings = embeddings[live_rows]
+
+        np.save(path / EMBEDDINGS_FILE, np.ascontiguousarray(embeddings))
+        documents = {
+            "ids": [self._ids[i] for i in live_rows],
+            "documents": [self._documents[i] for i in live_rows],
+            "metadata": [self._metadata[i] for i in live_rows],
+            "parents": self._parents,
+        }
+        (path / DOCUMENTS_FILE).write_text(json.dumps(documents), encoding="utf-8")
+        manifest = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "model_name": self.model_name,
+            "dtype": self._dtype.name,
+            "count": len(live_rows),
+            "dim": int(embeddings.shape[1]),
+        }
+        # The manifest is written last so a partially written index is never loadable.
+        (path / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True, **kwargs) -> "Retriever":
+        """Load an index written by ``save``.
+
+        With ``mmap=True`` the embedding matrix is opened read-only via ``np.load(mmap_mode="r")``,
+        so worker processes on one host share the same page-cache copy. Adding documents
+        afterwards copies the matrix into private memory.
+
+        Args:
+            path: Directory written by ``save``.
+            mmap: Whether to memory-map the embeddings instead of reading them into RAM.
+            **kwargs: Extra constructor arguments such as ``compaction_threshold``.
+
+        Returns:
+            A Retriever using the saved model name and dtype.
+
+        Raises:
+            ValueError: If the index was written with an unsupported format version.
         """
-        self._documents = list(documents)
-        self._embeddings = self._model.encode(documents, show_progress_bar=False)
+        path = Path(path)
+        manifest = json.loads((path / MANIFEST_FILE).read_text(encoding="utf-8"))
+        if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index format version {manifest.get('format_version')!r}, "
+                f"expected {INDEX_FORMAT_VERSION}"
+            )
+        documents = json.loads((path / DOCUMENTS_FILE).read_text(encoding="utf-8"))
+
+        retriever = cls(model_name=manifest["model_name"], dtype=manifest["dtype"], **kwargs)
+        if manifest["count"]:
+            embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+            retriever._buffer = embeddings
+            retriever._documents = documents["documents"]
+            retriever._metadata = documents.get("metadata") or [None] * manifest["count"]
+            retriever._ids = documents["ids"]
+            retriever._id_to_row = {doc_id: row for row, doc_id in enumerate(retriever._ids)}
+            retriever._size = manifest["count"]
+            retriever._alive = np.ones(retriever._size, dtype=bool)
+            retriever._next_auto_id = retriever._size
+            parents = documents.get("parents", {})
+            retriever._link_parents(list(parents), list(parents.values()))
+            retriever._version += 1
+            retriever._backend.add(embeddings, 0)
+        return retriever
 
-    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> list[tuple[str, float]]:
+    def search(
+        self,
+        query: str,
+        top_k: int = DEFAULT_TOP_K,
+        mode: str = "dense",
+        trace: Trace = NULL_TRACE,
+        filter: Filter | None = None,
+    ) -> list[tuple[str, float]]:
         """Find the top-k most similar documents to the query.
 
         Args:
             query: The search query text.
             top_k: Maximum number of results to return.
+            mode: ``"dense"`` for cosine similarity, ``"lexical"`` for BM25 without encoding
+                the query, or ``"hybrid"`` to fuse both rankings.
+            trace: Optional trace receiving ``filter``, ``encode``, ``search``, ``lexical``
+                and ``fuse`` stage timings.
+            filter: Optional metadata conditions every result must satisfy, e.g.
+                ``{"tenant": "acme", "year": {"$gte": 2023}}``; see ``MetadataIndex``.
+
+        Returns:
+            List of (document_text, score) tuples sorted by descending score. Scores are
+            cosine similarities, BM25 scores or fused scores depending on ``mode``.
+        """
+        return self.search_batch([query], top_k=top_k, mode=mode, trace=trace, filter=filter)[0]
+
+    def search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = DEFAULT_TOP_K,
+        mode: str = "dense",
+        trace: Trace = NULL_TRACE,
+        filter: Filter | None = None,
+    ) -> list[list[tuple[str, float]]]:
+        """Find the top-k documents for many queries with one encode call and one matrix product.
+
+        Args:
+            queries: The search query texts.
+            top_k: Maximum number of results to return per query.
+            mode: Search mode, as for ``search``.
+            trace: Optional trace, as for ``search``.
+            filter: Optional metadata filter applied to every query, as for ``search``.
 
         Returns:
-            List of (document_text, similarity_score) tuples sorted by descending similarity.
+            One result list per query, each as returned by ``search``.
+
+        Raises:
+            ValueError: If ``mode`` is not a supported search mode, or ``filter`` uses an
+                unsupported operator.
         """
-        if not self._documents or self._embeddings is None:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SEARCH_MODES}, got {mode!r}")
+        queries = list(queries)
+        if len(self) == 0 or self._embeddings is None:
+            return [[] for _ in queries]
+        if not queries:
             return []
+        if self.result_cache is None:
+            return self._search_uncached(queries, top_k, mode, trace, filter)
+
+        if self._result_cache_version != self._version:
+            self.result_cache.clear()
+            self._result_cache_version = self._version
+        filtered = filter_key(filter)
+        keys = [(normalize_query(query), top_k, mode, filtered) for query in queries]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            found_lists = self._search_uncached(
+                [queries[i] for i in missing], top_k, mode, trace, filter
+            )
+            for i, found in zip(missing, found_lists):
+                self.result_cache.put(keys[i], found)
+                results[i] = found
+        return [list(found) for found in results]
+
+    def encode_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Encode query texts in a single forward pass.
 
-        query_embedding = self._model.encode([query], show_progress_bar=False)
-        similarities = self._cosine_similarity(query_embedding, self._embeddings)[0]
+        Args:
+            queries: The query texts.
+
+        Returns:
+            Normalized float32 matrix of shape (len(queries), dim).
+        """
+        if self.query_cache is None:
+            return self._normalize(self.encoder.encode(list(queries)))
 
-        top_k = min(top_k, len(self._documents))
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        keys = [normalize_query(query) for query in queries]
+        vectors = [self.query_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, vec in zip(keys, vectors) if vec is None))
+        if missing:
+            encoded = self._normalize(self.encoder.encode(missing))
+            fresh = dict(zip(missing, encoded))
+            for key, vector in fresh.items():
+                vector.flags.writeable = False
+                self.query_cache.put(key, vector)
+            vectors = [fresh[key] if vec is None else vec for key, vec in zip(keys, vectors)]
+        return np.stack(vectors) if vectors else self._normalize(np.empty((0, 0)))
 
-        return [(self._documents[i], float(similarities[i])) for i in top_indices]
+    def search_embeddings(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = DEFAULT_TOP_K,
+        filter: Filter | None = None,
+    ) -> list[list[tuple[str, float]]]:
+        """Find the top-k documents for already-encoded queries.
+
+        Args:
+            query_embeddings: Matrix of query vectors, one row per query.
+            top_k: Maximum number of results to return per query.
+            filter: Optional metadata filter, as for ``search``.
+
+        Returns:
+            One list of (document_text, similarity_score) tuples per query row.
+        """
+        queries = self._normalize(query_embeddings)
+        if len(self) == 0 or self._embeddings is None:
+            return [[] for _ in range(len(queries))]
+        rows = self._filter_rows(filter)
+        return [self._to_results(*match) for match in self._dense_search(queries, top_k, rows)]
+
+    def shortlist(
+        self,
+        query_embeddings: np.ndarray,
+        size: int,
+        filter: Filter | None = None,
+    ) -> list[Candidates]:
+        """Retrieve the top ``size`` candidates per query together with their embeddings.
+
+        The embeddings are gathered for the shortlisted rows only, so a second-stage
+        reranker can compare candidates without re-encoding them.
+
+        Args:
+            query_embeddings: Matrix of query vectors, one row per query.
+            size: Maximum number of candidates per query.
+            filter: Optional metadata filter, as for ``search``.
+
+        Returns:
+            One Candidates per query row, best first.
+        """
+        queries = self._normalize(query_embeddings)
+        if len(self) == 0 or self._embeddings is None:
+            empty = np.empty((0, queries.shape[1]), dtype=np.float32)
+            return [Candidates([], np.empty(0, dtype=np.float32), empty) for _ in queries]
+        rows_filter = self._filter_rows(filter)
+        return [
+            Candidates(
+                texts=[self._documents[row] for row in rows],
+                scores=scores,
+                embeddings=np.asarray(self._embeddings[rows], dtype=np.float32),
+            )
+            for rows, scores in self._dense_search(queries, size, rows_filter)
+        ]
+
+    def _dense_search(
+        self, queries: np.ndarray, top_k: int, rows: np.ndarray | None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Search the backend, or exactly score only ``rows`` when a filter selected them."""
+        if rows is not None:
+            return score_subset(self._embeddings, queries, rows, top_k)
+        alive = self._alive[: self._size] if self._num_deleted else None
+        return self._backend.search(self._embeddings, queries, min(top_k, len(self)), alive)
+
+    def _filter_rows(self, filter: Filter | None, trace: Trace = NULL_TRACE) -> np.ndarray | None:
+        """Resolve a filter to the sorted live rows it matches, or None for no filter."""
+        if not filter:
+            return None
+        with trace.stage("filter"):
+            if self._metadata_index is None or self._metadata_index.num_rows != self._size:
+                self._metadata_index = MetadataIndex()
+                self._metadata_index.add(self._metadata)
+            rows = self._metadata_index.rows(filter)
+            return rows[self._alive[rows]] if self._num_deleted else rows
+
+    def _search_uncached(
+        self, queries: list[str], top_k: int, mode: str, trace: Trace, filter: Filter | None
+    ) -> list[list[tuple[str, float]]]:
+        """Run a search in the given mode without consulting the result cache."""
+        rows = self._filter_rows(filter, trace)
+        if mode == "dense":
+            with trace.stage("encode"):
+                embeddings = self.encode_queries(queries)
+            with trace.stage("search"):
+                return [self._to_results(*m) for m in self._dense_search(embeddings, top_k, rows)]
+
+        alive = self._alive[: self._size] if self._num_deleted else None
+        k = min(top_k, len(self))
+        if rows is not None:
+            alive = np.zeros(self._size, dtype=bool)
+            alive[rows] = True
+            k = min(top_k, len(rows))
+        if mode == "lexical":
+            with trace.stage("lexical"):
+                lexical = self._lexical_index()
+                return [self._to_results(*lexical.search(query, k, alive)) for query in queries]
+
+        # Each ranking contributes a wider candidate pool than top_k, so documents ranked
+        # moderately well by both sides can still win after fusion.
+        pool = max(k * HYBRID_CANDIDATE_FACTOR, MIN_HYBRID_CANDIDATES)
+        with trace.stage("encode"):
+            embeddings = self.encode_queries(queries)
+        with trace.stage("search"):
+            dense_matches = self._dense_search(embeddings, pool, rows)
+        with trace.stage("lexical"):
+            lexical = self._lexical_index()
+            lexical_matches = [lexical.search(query, pool, alive) for query in queries]
+        results = []
+        with trace.stage("fuse"):
+            for dense_match, lexical_match in zip(dense_matches, lexical_matches):
+                if self.fusion == "rrf":
+                    fused = reciprocal_rank_fusion([dense_match[0], lexical_match[0]], k)
+                else:
+                    weights = [self.dense_weight, 1.0 - self.dense_weight]
+                    fused = weighted_fusion([dense_match, lexical_match], weights, k)
+                results.append(self._to_results(*fused))
+        return results
+
+    def _to_results(self, rows: np.ndarray, scores: np.ndarray) -> list[tuple[str, float]]:
+        """Map row numbers and scores to (document_text, score) tuples."""
+        return [(self._documents[row], float(score)) for row, score in zip(rows, scores)]
+
+    def _lexical_index(self) -> BM25Index:
+        """Return the BM25 index, building it on first use.
+
+        ``_append`` and ``compact`` keep a built index in step with the rows, and removals
+        only tombstone rows, which the alive mask handles at query time. A full build
+        happens again only if the index fell out of step, such as after ``load``.
+        """
+        if self._lexical is None or self._lexical.num_docs != self._size:
+            self._lexical = BM25Index()
+            self._lexical.build(self._documents)
+        return self._lexical
+
+    def _reset(self) -> None:
+        """Drop every indexed document and embedding."""
+        self._documents = []
+        self._metadata = []
+        self._ids = []
+        self._id_to_row = {}
+        self._parents = {}
+        self._children = {}
+        self._buffer = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._num_deleted = 0
+        self._next_auto_id = 0
+        self._version += 1
+        self._lexical = None
+        self._metadata_index = None
+        self._backend.reset()
 
     @staticmethod
-    def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
-        """Compute cosine similarity between two sets of vectors.
+    def _check_corpus(
+        documents: Sequence[str],
+        ids: Sequence[str] | None,
+        metadata: Sequence[Metadata | None] | None,
+    ) -> tuple[list[str], list[str]]:
+        """Validate a replacement corpus, defaulting IDs to the position of each document."""
+        documents = list(documents)
+        ids = [str(i) for i in range(len(documents))] if ids is None else [str(i) for i in ids]
+        if len(ids) != len(documents):
+            raise ValueError(f"Got {len(ids)} ids for {len(documents)} documents")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Document ids must be unique")
+        if metadata is not None and len(metadata) != len(documents):
+            raise ValueError(f"Got {len(metadata)} metadata entries for {len(documents)} documents")
+        return documents, ids
+
+    def _with_parent_ids(
+        self, documents: Iterable[str | tuple[str, str]]
+    ) -> Iterator[tuple[str, str]]:
+        """Pair bare texts with auto-generated IDs unused by any document or parent."""
+        for document in documents:
+            if not isinstance(document, str):
+                yield document
+                continue
+            while (parent_id := str(self._next_auto_id)) in self._children or (
+                parent_id in self._id_to_row
+            ):
+                self._next_auto_id += 1
+            self._next_auto_id += 1
+            yield parent_id, document
+
+    def _generate_ids(self, count: int) -> list[str]:
+        """Generate ``count`` unused sequential document IDs."""
+        ids = []
+        while len(ids) < count:
+            candidate = str(self._next_auto_id)
+            self._next_auto_id += 1
+            if candidate not in self._id_to_row:
+                ids.append(candidate)
+        return ids
+
+    def _link_parents(self, ids: list[str], parent_ids: list[str]) -> None:
+        """Record the source document of each text."""
+        for doc_id, parent_id in zip(ids, parent_ids):
+            self._parents[doc_id] = parent_id
+            self._children.setdefault(parent_id, []).append(doc_id)
+
+    def _unlink_parent(self, doc_id: str) -> None:
+        """Forget the source document of a removed text."""
+        parent_id = self._parents.pop(doc_id, None)
+        if parent_id is None:
+            return
+        siblings = self._children[parent_id]
+        siblings.remove(doc_id)
+        if not siblings:
+            del self._children[parent_id]
+
+    def _append(
+        self,
+        documents: list[str],
+        ids: list[str],
+        embeddings: np.ndarray | None = None,
+        metadata: Sequence[Metadata | None] | None = None,
+    ) -> None:
+        """Encode documents, unless embeddings are given, and append them to the buffer."""
+        if not documents:
+            return
+        if embeddings is None:
+            embeddings = self._encode_documents(documents)
+        embeddings = self._normalize(embeddings)
+        self._reserve(self._size + len(documents), embeddings.shape[1])
+
+        start = self._size
+        end = start + len(documents)
+        self._buffer[start:end] = embeddings
+        self._alive[start:end] = True
+        self._documents.extend(documents)
+        metadata = [None] * len(documents) if metadata is None else list(metadata)
+        self._metadata.extend(metadata)
+        if self._metadata_index is not None and self._metadata_index.num_rows == start:
+            self._metadata_index.add(metadata)
+        if self._lexical is not None and self._lexical.num_docs == start:
+            self._lexical.add(documents)
+        self._ids.extend(ids)
+        for offset, doc_id in enumerate(ids):
+            self._id_to_row[doc_id] = start + offset
+        self._size = end
+        self._version += 1
+        self._backend.add(self._embeddings, start)
+
+    def _encode_documents(self, documents: list[str]) -> np.ndarray:
+        """Encode document texts, serving unchanged ones from the embedding cache."""
+        if self.embedding_cache is None:
+            return self.encoder.encode(documents)
+        # The encoder is resolved only on a miss, so fully cached builds never load the model.
+        return self.embedding_cache.encode(
+            self.model_name, documents, lambda texts: self.encoder.encode(texts)
+        )
+
+    def _reserve(self, capacity: int, dim: int) -> None:
+        """Ensure the embedding buffer can hold at least ``capacity`` rows."""
+        if (
+            self._buffer is not None
+            and len(self._buffer) >= capacity
+            and self._buffer.flags.writeable
+        ):
+            return
+        current = 0 if self._buffer is None else len(self._buffer)
+        new_capacity = max(capacity, current * GROWTH_FACTOR, INITIAL_CAPACITY)
+
+        buffer = np.empty((new_capacity, dim), dtype=self._dtype)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._buffer is not None:
+            buffer[: self._size] = self._buffer[: self._size]
+            alive[: self._size] = self._alive[: self._size]
+        self._buffer = buffer
+        self._alive = alive
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize row vectors into a C-contiguous float32 matrix.
 
         Args:
-            a: First matrix of row vectors.
-            b: Second matrix of row vectors.
+            vectors: Matrix of row vectors.
 
         Returns:
-            Similarity matrix of shape (len(a), len(b)).
+            Row-normalized float32 copy; zero vectors are left as zeros.
         """
-        a_norm = a / np.linalg.norm(a, axis=1, keepdims=True)
-        b_norm = b / np.linalg.norm(b, axis=1, keepdims=True)
-        return a_norm @ b_norm.T
+        vectors = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+def _return(value: Encoder) -> Encoder:
+    """Picklable factory handing a custom encoder to parallel index workers."""
+    return value
@@ -0,0 +1,146 @@
+"""Per-session conversation memory with LRU, idle-TTL and global-size eviction."""
+
+import threading
+import time
+from collections import OrderedDict
+
+from conversational_rag.memory import DEFAULT_MAX_HISTORY, ConversationMemory
+from conversational_rag.storage import MessageStore
+
+DEFAULT_MAX_SESSIONS = 10_000
+
+
+class SessionStore:
+    """Maps session IDs to their own ConversationMemory.
+
+    Sessions are created on first access and kept in least-recently-used order. A session
+    is evicted when it has been idle longer than ``idle_ttl`` seconds, when more than
+    ``max_sessions`` are resident, or when the total number of stored messages across all
+    sessions exceeds ``max_total_messages``.
+
+    With a persistent ``store``, eviction only frees RAM: a returning session's memory
+    reloads its history lazily from the store, on this worker or any other.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_ttl: float | None = None,
+        max_total_messages: int | None = None,
+        max_history: int = DEFAULT_MAX_HISTORY,
+        store: MessageStore | None = None,
+    ) -> None:
+        """Create the store.
+
+        Args:
+            max_sessions: Maximum number of resident sessions.
+            idle_ttl: Seconds of inactivity after which a session is evicted, or None.
+            max_total_messages: Cap on messages held across all sessions, or None.
+            max_history: ``max_history`` for each new session's memory.
+            store: Optional message store that persists every session's history.
+        """
+        if max_sessions <= 0:
+            raise ValueError(f"max_sessions must be positive, got {max_sessions}")
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_total_messages = max_total_messages
+        self.max_history = max_history
+        self.store = store
+        self.evictions = 0
+        self._sessions: OrderedDict[str, tuple[float, ConversationMemory]] = OrderedDict()
+        self._message_counts: dict[str, int] = {}
+        self._total_messages = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    @property
+    def total_messages(self) -> int:
+        """Number of messages held across all resident sessions."""
+        return self._total_messages
+
+    def get(self, session_id: str) -> ConversationMemory:
+        """Return the memory for ``session_id``, creating it if needed, and mark it as used.
+
+        Args:
+            session_id: The conversation identifier.
+
+        Returns:
+            The session's ConversationMemory.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                memory = ConversationMemory(
+                    max_history=self.max_history, store=self.store, session_id=session_id
+                )
+                self._message_counts[session_id] = 0
+            else:
+                memory = entry[1]
+            self._sessions[session_id] = (now, memory)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._evict_oldest()
+            return memory
+
+    def touch(self, session_id: str) -> None:
+        """Re-count a session's messages after it was written to and enforce the global cap.
+
+        The session just touched is never evicted by the message cap.
+
+        Args:
+            session_id: The conversation identifier.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return
+            count = len(entry[1])
+            self._total_messages += count - self._message_counts[session_id]
+            self._message_counts[session_id] = count
+            if self.max_total_messages is None:
+                return
+            while self._total_messages > self.max_total_messages and len(self._sessions) > 1:
+                if next(iter(self._sessions)) == session_id:
+                    break
+                self._evict_oldest()
+
+    def drop(self, session_id: str) -> bool:
+        """Remove a session and its memory, including any persisted history.
+
+        Args:
+            session_id: The conversation identifier.
+
+        Returns:
+            True if the session was resident.
+        """
+        with self._lock:
+            if self.store is not None:
+                self.store.delete(session_id)
+            if session_id not in self._sessions:
+                return False
+            del self._sessions[session_id]
+            self._total_messages -= self._message_counts.pop(session_id)
+            return True
+
+    def _evict_idle(self, now: float) -> None:
+        """Evict sessions, oldest first, that have been idle longer than ``idle_ttl``."""
+        if self.idle_ttl is None:
+            return
+        while self._sessions:
+            last_used, _ = next(iter(self._sessions.values()))
+            if now - last_used <= self.idle_ttl:
+                return
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        """Evict the least recently used session."""
+        session_id, _ = self._sessions.popitem(last=False)
+        self._total_messages -= self._message_counts.pop(session_id)
+        self.evictions += 1
@@ -0,0 +1,336 @@
+"""Scatter/gather search over index shards owned by separate worker processes."""
+
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+from conversational_rag.encoders import Encoder, EncoderRegistry
+from conversational_rag.filters import Filter, Metadata
+from conversational_rag.instrumentation import NULL_TRACE, Trace
+from conversational_rag.retriever import DEFAULT_MODEL_NAME, DEFAULT_TOP_K, Retriever
+
+SHARDS_MANIFEST = "shards.json"
+SHARDS_FORMAT_VERSION = 1
+SHARDED_SEARCH_MODES = ("dense",)
+
+_worker_shard: Retriever | None = None
+
+
+def _open_shard(path: str) -> None:
+    """Memory-map one saved shard into this worker process."""
+    global _worker_shard
+    _worker_shard = Retriever.load(path, mmap=True, query_cache_size=0)
+
+
+def _search_shard(
+    queries: np.ndarray, top_k: int, filter: Filter | None
+) -> list[list[tuple[str, float]]]:
+    """Search the worker's shard for already-encoded queries."""
+    return _worker_shard.search_embeddings(queries, top_k, filter)
+
+
+def merge_top_k(
+    result_lists: Sequence[Sequence[tuple[str, float]]], k: int
+) -> list[tuple[str, float]]:
+    """Merge per-shard result lists, each sorted by descending score, into the global top-k.
+
+    A heap merge consumes only as many entries as it returns, so the cost is
+    ``O(k log n_shards)`` regardless of how many results each shard sent.
+
+    Args:
+        result_lists: One (document_text, score) list per shard, best first.
+        k: Number of results to keep.
+
+    Returns:
+        The ``k`` best (document_text, score) tuples across all shards, best first.
+    """
+    merged = heapq.merge(*result_lists, key=lambda result: -result[1])
+    return list(itertools.islice(merged, k))
+
+
+class ShardedRetriever:
+    """Partitions an index across worker processes and fans every search out to all of them.
+
+    ``index`` splits the corpus into ``num_shards`` contiguous shards and writes each as a
+    regular ``Retriever.save`` directory, encoding one shard at a time so the parent never
+    holds the whole embedding matrix. Every shard is then owned by its own single-process
+    pool that memory-maps it with ``Retriever.load``, so corpus size is bounded by disk and
+    page cache rather than one process's heap, and shards are scanned in parallel outside
+    the parent's GIL.
+
+    Queries are encoded once in the parent, scattered to every shard, and the per-shard
+    top-k lists are gathered and heap-merged. Metadata filters are evaluated by each shard
+    against its own posting lists. Only dense search is supported: BM25 statistics are
+    per-shard and would not merge into one comparable ranking.
+
+    Call ``close`` (or use the instance as a context manager) to stop the workers.
+    """
+
+    def __init__(
+        self,
+        num_shards: int | None = None,
+        directory: str | Path | None = None,
+        model_name: str = DEFAULT_MODEL_NAME,
+        dtype: str = "float32",
+        registry: EncoderRegistry | None = None,
+        encoder: Encoder | None = None,
+        **kwargs,
+    ) -> None:
+        """Create the sharded retriever without starting any worker.
+
+        Args:
+            num_shards: Number of shards and worker processes. Defaults to the CPU count.
+            directory: Where shards are written. Defaults to a temporary directory that
+                is removed by ``close``.
+            model_name: Embedding model used to encode documents and queries.
+            dtype: Storage dtype of every shard's embeddings.
+            registry: Optional encoder registry, as for ``Retriever``.
+            encoder: Optional custom encoder, as for ``Retriever``.
+            **kwargs: Extra ``Retriever`` options used for encoding, such as
+                ``embedding_cache`` or ``query_cache_size``.
+
+        Raises:
+            ValueError: If ``num_shards`` is not positive.
+        """
+        num_shards = num_shards or os.cpu_count() or 1
+        if num_shards <= 0:
+            raise ValueError(f"num_shards must be positive, got {num_shards}")
+        self.num_shards = num_shards
+        self._owns_directory = directory is None
+        self.directory = Path(
+            tempfile.mkdtemp(prefix="conversational-rag-shards-")
+            if directory is None
+            else directory
+        )
+        self._dtype = dtype
+        self._registry = registry
+        self._encoder = encoder
+        self._encoding = Retriever(
+            model_name=model_name, dtype=dtype, registry=registry, encoder=encoder, **kwargs
+        )
+        self._pools: list[ProcessPoolExecutor] = []
+        self._size = 0
+
+    @property
+    def model_name(self) -> str:
+        """Name of the embedding model the shards were built with."""
+        return self._encoding.model_name
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def index(
+        self,
+        documents: Sequence[str],
+        ids: Sequence[str] | None = None,
+        metadata: Sequence[Metadata | None] | None = None,
+    ) -> None:
+        """Encode documents into shards, replacing any existing index, and start the workers.
+
+        Args:
+            documents: Document texts to index.
+            ids: Optional stable document IDs. Defaults to the string position of each
+                document in the whole corpus.
+            metadata: Optional metadata mapping of each document, for filtered searches.
+
+        Raises:
+            ValueError: If ``ids`` or ``metadata`` do not match ``documents`` in length.
+        """
+        documents = list(documents)
+        ids = [str(i) for i in range(len(documents))] if ids is None else list(ids)
+        metadata = [None] * len(documents) if metadata is None else list(metadata)
+        if len(ids) != len(documents) or len(metadata) != len(documents):
+            raise ValueError(
+                f"Got {len(ids)} ids and {len(metadata)} metadata for {len(documents)} documents"
+            )
+
+        self._stop_workers()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        num_shards = max(1, min(self.num_shards, len(documents)))
+        bounds = np.linspace(0, len(documents), num_shards + 1).astype(int)
+        names = []
+        for shard, (start, stop) in enumerate(itertools.pairwise(bounds)):
+            shard_retriever = Retriever(
+                model_name=self.model_name,
+                dtype=self._dtype,
+                registry=self._registry,
+                encoder=self._encoder,
+                embedding_cache=self._encoding.embedding_cache,
+                query_cache_size=0,
+            )
+            shard_retriever.index(
+                documents[start:stop], ids=ids[start:stop], metadata=metadata[start:stop]
+            )
+            names.append(f"shard-{shard:04d}")
+            shard_retriever.save(self.directory / names[-1])
+
+        manifest = {
+            "format_version": SHARDS_FORMAT_VERSION,
+            "model_name": self.model_name,
+            "count": len(documents),
+            "shards": names,
+        }
+        (self.directory / SHARDS_MANIFEST).write_text(
+            json.dumps(manifest, indent=2), encoding="utf-8"
+        )
+        self._start_workers(names, len(documents))
+
+    @classmethod
+    def load(cls, directory: str | Path, **kwargs) -> "ShardedRetriever":
+        """Serve shards written by an earlier ``index`` call without re-encoding them.
+
+        The directory is left in place by ``close``.
+
+        Args:
+            directory: Directory passed to the ``ShardedRetriever`` that built the shards.
+            **kwargs: Extra constructor arguments such as ``encoder``.
+
+        Returns:
+            A ShardedRetriever with one worker per saved shard.
+
+        Raises:
+            ValueError: If the shards were written with an unsupported format version.
+        """
+        directory = Path(directory)
+        manifest = json.loads((directory / SHARDS_MANIFEST).read_text(encoding="utf-8"))
+        if manifest.get("format_version") != SHARDS_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported shards format version {manifest.get('format_version')!r}, "
+                f"expected {SHARDS_FORMAT_VERSION}"
+            )
+        kwargs.setdefault("model_name", manifest["model_name"])
+        retriever = cls(num_shards=len(manifest["shards"]), directory=directory, **kwargs)
+        retriever._start_workers(manifest["shards"], manifest["count"])
+        return retriever
+
+    def search(
+        self,
+        query: str,
+        top_k: int = DEFAULT_TOP_K,
+        mode: str = "dense",
+        trace: Trace = NULL_TRACE,
+        filter: Filter | None = None,
+    ) -> list[tuple[str, float]]:
+        """Find the top-k most similar documents across all shards.
+
+        Args:
+            query: The search query text.
+            top_k: Maximum number of results to return.
+            mode: Must be ``"dense"``; accepted for signature compatibility with
+                ``Retriever.search``.
+            trace: Optional trace receiving ``encode`` and ``search`` stage timings.
+            filter: Optional metadata conditions every result must satisfy.
+
+        Returns:
+            List of (document_text, cosine_similarity) tuples sorted by descending score.
+
+        Raises:
+            ValueError: If ``mode`` is not ``"dense"``.
+        """
+        return self.search_batch([query], top_k=top_k, mode=mode, trace=trace, filter=filter)[0]
+
+    def search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = DEFAULT_TOP_K,
+        mode: str = "dense",
+        trace: Trace = NULL_TRACE,
+        filter: Filter | None = None,
+    ) -> list[list[tuple[str, float]]]:
+        """Encode many queries in one forward pass and search them across all shards.
+
+        Args:
+            queries: The search query texts.
+            top_k: Maximum number of results to return per query.
+            mode: Search mode, as for ``search``.
+            trace: Optional trace, as for ``search``.
+            filter: Optional metadata filter applied to every query.
+
+        Returns:
+            One result list per query, each as returned by ``search``.
+
+        Raises:
+            ValueError: If ``mode`` is not ``"dense"``.
+        """
+        if mode not in SHARDED_SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SHARDED_SEARCH_MODES}, got {mode!r}")
+        queries = list(queries)
+        if self._size == 0 or not queries:
+            return [[] for _ in queries]
+        with trace.stage("encode"):
+            embeddings = self.encode_queries(queries)
+        with trace.stage("search"):
+            return self.search_embeddings(embeddings, top_k, filter)
+
+    def search_embeddings(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = DEFAULT_TOP_K,
+        filter: Filter | None = None,
+    ) -> list[list[tuple[str, float]]]:
+        """Scatter already-encoded queries to every shard and merge their top-k lists.
+
+        Args:
+            query_embeddings: Matrix of query vectors, one row per query.
+            top_k: Maximum number of results to return per query.
+            filter: Optional metadata filter, as for ``search``.
+
+        Returns:
+            One list of (document_text, similarity_score) tuples per query row.
+        """
+        queries = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        if self._size == 0:
+            return [[] for _ in range(len(queries))]
+        futures = [pool.submit(_search_shard, queries, top_k, filter) for pool in self._pools]
+        per_shard = [future.result() for future in futures]
+        return [
+            merge_top_k([shard_results[i] for shard_results in per_shard], top_k)
+            for i in range(len(queries))
+        ]
+
+    def encode_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Encode query texts in the parent process; see ``Retriever.encode_queries``."""
+        return self._encoding.encode_queries(queries)
+
+    def close(self) -> None:
+        """Stop the shard workers and remove the shard directory if it was temporary."""
+        self._stop_workers()
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _start_workers(self, names: Sequence[str], count: int) -> None:
+        """Start one single-process pool per shard, each memory-mapping its shard."""
+        context = multiprocessing.get_context("spawn")
+        self._pools = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=_open_shard,
+                initargs=(str(self.directory / name),),
+            )
+            for name in names
+        ]
+        self._size = count
+
+    def _stop_workers(self) -> None:
+        """Shut every shard worker down, waiting for in-flight searches."""
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools = []
+        self._size = 0
@@ -0,0 +1,224 @@
+"""Persistent message stores backing ConversationMemory."""
+
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from pathlib import Path
+from typing import Self
+
+from conversational_rag.models import Message
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+
+class MessageStore(ABC):
+    """Interface for persisting conversation messages per session."""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: list[Message]) -> None:
+        """Persist messages at the end of a session's history.
+
+        Args:
+            session_id: The conversation identifier.
+            messages: Messages in chronological order.
+        """
+
+    @abstractmethod
+    def load_recent(self, session_id: str, n: int) -> list[Message]:
+        """Return the last ``n`` messages of a session in chronological order.
+
+        Args:
+            session_id: The conversation identifier.
+            n: Maximum number of messages to return.
+
+        Returns:
+            Up to ``n`` messages, oldest first.
+        """
+
+    @abstractmethod
+    def count(self, session_id: str) -> int:
+        """Return how many messages a session holds, including ones still being written.
+
+        ConversationMemory compares this with the count its resident history reflects to
+        notice messages appended to the session by another worker.
+
+        Args:
+            session_id: The conversation identifier.
+
+        Returns:
+            The number of stored messages.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove every message of a session.
+
+        Args:
+            session_id: The conversation identifier.
+        """
+
+    def flush(self) -> None:
+        """Write any buffered messages through to storage."""
+
+    def close(self) -> None:
+        """Flush and release resources."""
+        self.flush()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class InMemoryStore(MessageStore):
+    """Process-local store, useful to keep history across SessionStore evictions."""
+
+    def __init__(self) -> None:
+        self._sessions: defaultdict[str, list[Message]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, messages: list[Message]) -> None:
+        """Append messages to the session's list."""
+        with self._lock:
+            self._sessions[session_id].extend(messages)
+
+    def load_recent(self, session_id: str, n: int) -> list[Message]:
+        """Return the tail of the session's list."""
+        with self._lock:
+            messages = self._sessions.get(session_id, [])
+            return list(messages[-n:]) if n > 0 else []
+
+    def count(self, session_id: str) -> int:
+        """Return the length of the session's list."""
+        with self._lock:
+            return len(self._sessions.get(session_id, []))
+
+    def delete(self, session_id: str) -> None:
+        """Drop the session's list."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteStore(MessageStore):
+    """SQLite-backed store with batched, write-behind persistence.
+
+    ``append`` only queues rows in memory; a background thread writes them in one
+    transaction every ``flush_interval`` seconds, or sooner once ``batch_size`` rows are
+    pending. Reads flush first, so they always observe earlier appends.
+
+    Several workers may share one database. Their batches are flushed independently, so
+    history is read back in message timestamp order rather than in insertion order.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        """Open or create the database.
+
+        Args:
+            path: Database file path, or ":memory:".
+            batch_size: Pending row count that triggers an early background flush.
+            flush_interval: Maximum seconds a queued row waits before being written.
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        if str(path) != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, timestamp REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_session_time "
+            "ON messages (session_id, timestamp, id)"
+        )
+        self._conn.commit()
+
+        self._pending: list[tuple[str, str, str, float]] = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def append(self, session_id: str, messages: list[Message]) -> None:
+        """Queue messages for the background writer."""
+        rows = [(session_id, m.role, m.content, m.timestamp) for m in messages]
+        with self._pending_lock:
+            self._pending.extend(rows)
+            pending = len(self._pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def load_recent(self, session_id: str, n: int) -> list[Message]:
+        """Flush, then read only the last ``n`` messages of the session by timestamp."""
+        if n <= 0:
+            return []
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT role, content, timestamp FROM messages "
+                "WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (session_id, n),
+            ).fetchall()
+        messages = [Message(role=role, content=content, timestamp=ts) for role, content, ts in rows]
+        messages.reverse()
+        return messages
+
+    def count(self, session_id: str) -> int:
+        """Count the session's written rows plus those still queued, without flushing."""
+        # Holding the database lock keeps a concurrent flush from moving rows in between.
+        with self._db_lock:
+            with self._pending_lock:
+                pending = sum(1 for row in self._pending if row[0] == session_id)
+            (written,) = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return written + pending
+
+    def delete(self, session_id: str) -> None:
+        """Flush, then delete the session's rows."""
+        self.flush()
+        with self._db_lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """Write all queued rows in a single transaction."""
+        with self._db_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Stop the background writer, flush remaining rows and close the connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        self._conn.close()
+
+    def _write_loop(self) -> None:
+        """Background thread body: flush periodically or when woken."""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._closed:
+                self.flush()
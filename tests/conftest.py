@@ -0,0 +1,13 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+from conversational_rag.encoders import default_registry
+
+
+@pytest.fixture(autouse=True)
+def _isolate_encoder_registry():
+    """Keep models loaded through the process-wide registry from leaking between tests."""
+    default_registry.clear()
+    yield
+    default_registry.clear()
@@ -0,0 +1,213 @@
+"""Tests for the nearest-neighbour search backends."""
+
+import numpy as np
+import pytest
+
+from conversational_rag.backends import (
+    BinaryBackend,
+    ExactBackend,
+    HNSWBackend,
+    Int8Backend,
+    IVFBackend,
+    score_rows,
+    score_subset,
+    select_top_k,
+)
+
+
+def _random_unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestSelectTopK:
+    def test_returns_indices_in_descending_score_order(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7])
+        assert select_top_k(scores, 3).tolist() == [1, 3, 2]
+
+    def test_k_larger_than_scores_returns_all(self):
+        assert select_top_k(np.array([0.2, 0.4]), 10).tolist() == [1, 0]
+
+    def test_non_positive_k_returns_empty(self):
+        assert select_top_k(np.array([0.2, 0.4]), 0).size == 0
+
+
+class TestScoreRows:
+    def test_float16_rows_match_float32(self):
+        embeddings = _random_unit_vectors(10)
+        queries = _random_unit_vectors(2, seed=1)
+        np.testing.assert_allclose(
+            score_rows(embeddings.astype(np.float16), queries),
+            score_rows(embeddings, queries),
+            atol=1e-2,
+        )
+
+
+class TestScoreSubset:
+    def test_matches_exact_search_restricted_to_rows(self):
+        embeddings = _random_unit_vectors(50)
+        queries = _random_unit_vectors(3, seed=1)
+        rows = np.arange(0, 50, 3)
+        alive = np.zeros(50, dtype=bool)
+        alive[rows] = True
+
+        subset = score_subset(embeddings, queries, rows, 4)
+        exact = ExactBackend().search(embeddings, queries, 4, alive)
+
+        for (got, got_scores), (want, want_scores) in zip(subset, exact):
+            assert got.tolist() == want.tolist()
+            np.testing.assert_allclose(got_scores, want_scores, rtol=1e-6)
+
+    def test_empty_rows(self):
+        [(rows, scores)] = score_subset(np.eye(2, dtype=np.float32), np.eye(2)[:1], np.array([]), 2)
+        assert rows.size == 0
+        assert scores.size == 0
+
+
+class TestExactBackend:
+    def test_skips_dead_rows(self):
+        embeddings = np.eye(3, dtype=np.float32)
+        alive = np.array([False, True, True])
+        [(rows, _)] = ExactBackend().search(embeddings, embeddings[:1], 3, alive)
+        assert 0 not in rows.tolist()
+        assert len(rows) == 2
+
+
+class TestIVFBackend:
+    def test_probing_every_list_matches_exact_search(self):
+        embeddings = _random_unit_vectors(200)
+        queries = _random_unit_vectors(5, seed=1)
+        backend = IVFBackend(n_lists=8, nprobe=8)
+        backend.add(embeddings, 0)
+
+        exact = ExactBackend().search(embeddings, queries, 5, None)
+        approx = backend.search(embeddings, queries, 5, None)
+
+        for (exact_rows, _), (ivf_rows, _) in zip(exact, approx):
+            assert ivf_rows.tolist() == exact_rows.tolist()
+
+    def test_incremental_add_makes_new_rows_searchable(self):
+        embeddings = _random_unit_vectors(100)
+        backend = IVFBackend(n_lists=4, nprobe=4)
+        backend.add(embeddings[:80], 0)
+        backend.add(embeddings, 80)
+
+        [(rows, _)] = backend.search(embeddings, embeddings[95:96], 1, None)
+        assert rows.tolist() == [95]
+
+    def test_respects_alive_mask(self):
+        embeddings = _random_unit_vectors(50)
+        backend = IVFBackend(n_lists=4, nprobe=4)
+        backend.add(embeddings, 0)
+        alive = np.ones(50, dtype=bool)
+        alive[7] = False
+
+        [(rows, _)] = backend.search(embeddings, embeddings[7:8], 5, alive)
+        assert 7 not in rows.tolist()
+
+
+class TestHNSWBackend:
+    def test_finds_exact_neighbours_on_small_corpus(self):
+        pytest.importorskip("hnswlib")
+        embeddings = _random_unit_vectors(100)
+        backend = HNSWBackend()
+        backend.add(embeddings, 0)
+
+        [(rows, scores)] = backend.search(embeddings, embeddings[10:11], 3, None)
+        assert rows[0] == 10
+        assert scores[0] == pytest.approx(1.0, abs=1e-4)
+
+    def test_removed_rows_are_not_returned(self):
+        pytest.importorskip("hnswlib")
+        embeddings = _random_unit_vectors(20)
+        backend = HNSWBackend()
+        backend.add(embeddings, 0)
+        backend.remove(np.array([10]))
+
+        [(rows, _)] = backend.search(embeddings, embeddings[10:11], 5, None)
+        assert 10 not in rows.tolist()
+
+
+def _recall(approx, exact):
+    hits = sum(len(set(a.tolist()) & set(e.tolist())) for (a, _), (e, _) in zip(approx, exact))
+    return hits / sum(len(e) for e, _ in exact)
+
+
+class TestQuantizedRecall:
+    @pytest.mark.parametrize(
+        ("backend_cls", "min_recall"), [(Int8Backend, 0.95), (BinaryBackend, 0.7)]
+    )
+    def test_recall_against_exact_search(self, backend_cls, min_recall):
+        embeddings = _random_unit_vectors(500, dim=64)
+        noise = _random_unit_vectors(10, dim=64, seed=1)
+        queries = embeddings[:10] + 0.5 * noise
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        backend = backend_cls()
+        backend.add(embeddings, 0)
+
+        exact = ExactBackend().search(embeddings, queries, 5, None)
+        approx = backend.search(embeddings, queries, 5, None)
+
+        assert _recall(approx, exact) >= min_recall
+
+
+@pytest.mark.parametrize("backend_cls", [Int8Backend, BinaryBackend])
+class TestQuantizedBackends:
+    def test_scores_are_exact_after_rescoring(self, backend_cls):
+        embeddings = _random_unit_vectors(50)
+        backend = backend_cls()
+        backend.add(embeddings, 0)
+
+        [(rows, scores)] = backend.search(embeddings, embeddings[:1], 3, None)
+
+        assert rows[0] == 0
+        np.testing.assert_allclose(scores, embeddings[rows] @ embeddings[0], rtol=1e-5)
+
+    def test_incremental_add_and_alive_mask(self, backend_cls):
+        embeddings = _random_unit_vectors(40)
+        backend = backend_cls(rescore_factor=40)
+        backend.add(embeddings[:30], 0)
+        backend.add(embeddings, 30)
+        alive = np.ones(40, dtype=bool)
+        alive[35] = False
+
+        [(rows, _)] = backend.search(embeddings, embeddings[35:36], 40, alive)
+
+        assert 35 not in rows.tolist()
+        assert len(rows) == 39
+
+    def test_rejects_invalid_rescore_factor(self, backend_cls):
+        with pytest.raises(ValueError):
+            backend_cls(rescore_factor=0)
+
+
+class TestQuantizedMemory:
+    def test_codes_are_smaller_than_float32_rows(self):
+        embeddings = _random_unit_vectors(100, dim=64)
+        int8 = Int8Backend()
+        binary = BinaryBackend()
+        int8.add(embeddings, 0)
+        binary.add(embeddings, 0)
+
+        assert int8.nbytes == embeddings.nbytes // 4
+        assert binary.nbytes == embeddings.nbytes // 32
+
+    def test_int8_scan_matches_dequantized_product_across_tiles(self, monkeypatch):
+        # Tiles of 3 rows at dim 16 make the 50 rows span several partial tiles.
+        monkeypatch.setattr("conversational_rag.backends.INT8_SCAN_TILE_BYTES", 3 * 4 * 16)
+        embeddings = _random_unit_vectors(50)
+        queries = _random_unit_vectors(4, seed=1)
+        backend = Int8Backend()
+        backend.add(embeddings, 0)
+
+        scores = backend._scan(queries)
+
+        expected = queries @ (backend._codes[:50] * backend._scale).T
+        np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-6)
+
+    def test_rows_added_after_calibration_are_clipped(self):
+        backend = Int8Backend()
+        backend.add(np.array([[0.5, 0.5]], dtype=np.float32), 0)
+        backend.add(np.array([[0.5, 0.5], [1.0, -1.0]], dtype=np.float32), 1)
+
+        assert backend._codes[1].tolist() == [127, -127]
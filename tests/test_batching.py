@@ -0,0 +1,61 @@
+"""Tests for the asyncio micro-batcher."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from conversational_rag.batching import MicroBatcher
+
+
+def _length_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(text))] for text in texts])
+
+    return encode
+
+
+class TestMicroBatcher:
+    def test_rejects_non_positive_batch_size(self):
+        with pytest.raises(ValueError):
+            MicroBatcher(lambda texts: texts, max_batch_size=0)
+
+    def test_rejects_process_pool_executor(self):
+        with ProcessPoolExecutor(max_workers=1) as executor, pytest.raises(TypeError):
+            MicroBatcher(lambda texts: texts, executor=executor)
+
+    def test_concurrent_requests_share_one_batch(self):
+        calls = []
+        batcher = MicroBatcher(_length_encoder(calls), max_wait_ms=20)
+
+        async def run():
+            return await asyncio.gather(*(batcher.encode(t) for t in ["a", "bb", "ccc"]))
+
+        results = asyncio.run(run())
+
+        assert calls == [["a", "bb", "ccc"]]
+        assert [float(r[0]) for r in results] == [1.0, 2.0, 3.0]
+        assert batcher.batches == 1
+        assert batcher.items == 3
+
+    def test_flushes_when_batch_is_full(self):
+        calls = []
+        batcher = MicroBatcher(_length_encoder(calls), max_batch_size=2, max_wait_ms=1000)
+
+        async def run():
+            return await asyncio.gather(*(batcher.encode(t) for t in ["a", "b", "c", "d"]))
+
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+        assert calls == [["a", "b"], ["c", "d"]]
+
+    def test_propagates_encoder_errors(self):
+        def failing(texts):
+            raise RuntimeError("encoder down")
+
+        batcher = MicroBatcher(failing, max_wait_ms=1)
+
+        with pytest.raises(RuntimeError, match="encoder down"):
+            asyncio.run(batcher.encode("a"))
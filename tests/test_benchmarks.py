@@ -0,0 +1,47 @@
+"""Smoke tests for the offline benchmark harness."""
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+BENCH_PATH = Path(__file__).resolve().parents[1] / "benchmarks" / "bench.py"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestHelpers:
+    def test_synthetic_corpus_is_seeded(self, bench):
+        assert bench.synthetic_corpus(5, 3, seed=1) == bench.synthetic_corpus(5, 3, seed=1)
+
+    def test_latency_summary_percentiles(self, bench):
+        summary = bench.latency_summary([0.001] * 99 + [0.1])
+        assert summary["p50_ms"] == pytest.approx(1.0)
+        assert summary["p99_ms"] > summary["p50_ms"]
+
+    def test_recall_at_k(self, bench):
+        assert bench.recall_at_k([["a", "b"]], [["a", "c"]]) == 0.5
+
+    def test_compare_reports_relative_change(self, bench):
+        baseline = {"results": {"q": {"p50_ms": 2.0}}}
+        current = {"results": {"q": {"p50_ms": 1.0}}}
+        lines = bench.compare(baseline, current)
+        assert lines == ["q.p50_ms: 2 -> 1 (-50.0%)"]
+
+
+class TestRun:
+    def test_writes_json_report(self, bench, tmp_path):
+        output = tmp_path / "report.json"
+        bench.main(["--docs", "50", "--queries", "12", "--output", str(output)])
+
+        report = json.loads(output.read_text())
+        assert set(report["results"]) == {"index", "search", "reformulate", "query"}
+        assert report["results"]["search"]["exact"]["recall_at_k"] == 1.0
+        assert "p99_ms" in report["results"]["query"]
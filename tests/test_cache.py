@@ -0,0 +1,128 @@
+"""Tests for the cache module."""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from conversational_rag.cache import LRUCache, SemanticResultCache, normalize_query
+
+
+class TestNormalizeQuery:
+    def test_collapses_whitespace(self):
+        assert normalize_query("  what is\tthe  refund\npolicy ") == "what is the refund policy"
+
+
+class TestLRUCache:
+    def test_rejects_non_positive_size(self):
+        with pytest.raises(ValueError):
+            LRUCache(maxsize=0)
+
+    def test_get_returns_stored_value_and_counts_hit(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats() == {"hits": 1, "misses": 0, "size": 1}
+
+    def test_get_missing_returns_default_and_counts_miss(self):
+        cache = LRUCache(maxsize=2)
+        assert cache.get("missing", "fallback") == "fallback"
+        assert cache.misses == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_expires_entries_after_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=10.0)
+        with patch("conversational_rag.cache.time.monotonic", side_effect=[0.0, 5.0, 11.0]):
+            cache.put("a", 1)
+            assert cache.get("a") == 1
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_clear_keeps_counters(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 1
+
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestSemanticResultCache:
+    RESULTS = (("doc one", 0.9), ("doc two", 0.8))
+
+    def test_near_identical_query_reuses_results(self):
+        cache = SemanticResultCache(threshold=0.99)
+        cache.put(_unit(1.0, 0.0), 3, list(self.RESULTS), session_id="a")
+
+        assert cache.get(_unit(1.0, 0.01), 3, session_id="b") == list(self.RESULTS)
+        assert cache.get(_unit(1.0, 1.0), 3, session_id="b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_same_session_uses_looser_threshold(self):
+        cache = SemanticResultCache(threshold=0.99, session_threshold=0.9)
+        cache.put(_unit(1.0, 0.0), 3, list(self.RESULTS), session_id="a")
+        query = _unit(1.0, 0.3)  # cosine ~0.96
+
+        assert cache.get(query, 3, session_id="b") is None
+        assert cache.get(query, 3, session_id="a") == list(self.RESULTS)
+        assert cache.stats()["session_hits"] == 1
+
+    def test_scope_must_match(self):
+        cache = SemanticResultCache()
+        cache.put(_unit(1.0, 0.0), (3, None), list(self.RESULTS))
+        assert cache.get(_unit(1.0, 0.0), (5, None)) is None
+        assert cache.get(_unit(1.0, 0.0), (3, None)) == list(self.RESULTS)
+
+    def test_returns_copies(self):
+        cache = SemanticResultCache()
+        cache.put(_unit(1.0, 0.0), 3, list(self.RESULTS))
+        cache.get(_unit(1.0, 0.0), 3).clear()
+        assert cache.get(_unit(1.0, 0.0), 3) == list(self.RESULTS)
+
+    def test_evicts_least_recently_used_beyond_max_entries(self):
+        cache = SemanticResultCache(max_entries=2)
+        cache.put(_unit(1.0, 0.0, 0.0), 3, [("x", 1.0)])
+        cache.put(_unit(0.0, 1.0, 0.0), 3, [("y", 1.0)])
+        cache.get(_unit(1.0, 0.0, 0.0), 3)
+        cache.put(_unit(0.0, 0.0, 1.0), 3, [("z", 1.0)])
+
+        assert len(cache) == 2
+        assert cache.get(_unit(0.0, 1.0, 0.0), 3) is None
+        assert cache.get(_unit(1.0, 0.0, 0.0), 3) == [("x", 1.0)]
+
+    def test_bounded_by_bytes(self):
+        cache = SemanticResultCache(max_bytes=600)
+        for i in range(5):
+            cache.put(_unit(1.0, float(i)), 3, [("doc " * 20, 1.0)])
+            assert cache.nbytes <= 600
+        assert 0 < len(cache) < 5
+        cache.put(_unit(1.0, 0.0), 3, [("x" * 1000, 1.0)])
+        assert cache.get(_unit(1.0, 0.0), 3) is None
+
+    def test_clear_drops_entries(self):
+        cache = SemanticResultCache()
+        cache.put(_unit(1.0, 0.0), 3, list(self.RESULTS), session_id="a")
+        cache.clear()
+        assert cache.get(_unit(1.0, 0.0), 3, session_id="a") is None
+        assert cache.stats()["size"] == 0
+        assert cache.nbytes == 0
+
+    @pytest.mark.parametrize("kwargs", [{"max_entries": 0}, {"max_bytes": 0}])
+    def test_rejects_non_positive_bounds(self, kwargs):
+        with pytest.raises(ValueError):
+            SemanticResultCache(**kwargs)
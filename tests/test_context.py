@@ -0,0 +1,92 @@
+"""Tests for token-budgeted context assembly."""
+
+import pytest
+
+from conversational_rag.context import Context, ContextBuilder
+from conversational_rag.lexical import estimate_tokens
+from conversational_rag.memory import ConversationMemory
+from conversational_rag.models import Message
+
+
+def _memory(turns):
+    memory = ConversationMemory()
+    for i, topic in enumerate(turns):
+        memory.add_message("user", f"Tell me about {topic}")
+        memory.add_message("assistant", f"Answer number {i}")
+    return memory
+
+
+class TestContext:
+    def test_render_lists_summary_history_and_sources(self):
+        context = Context(
+            summary="Earlier topics: refunds",
+            history=[Message(role="user", content="And shipping?")],
+            sources=["Shipping takes five days"],
+        )
+
+        assert context.render() == (
+            "Earlier topics: refunds\nUser: And shipping?\nSources:\n- Shipping takes five days"
+        )
+
+    def test_render_empty(self):
+        assert Context().render() == ""
+
+
+class TestContextBuilder:
+    def test_everything_fits(self):
+        memory = _memory(["refund policy"])
+
+        context = ContextBuilder(max_tokens=200).build(memory, ["doc one", "doc two"])
+
+        assert context.summary == ""
+        assert len(context.history) == 2
+        assert context.sources == ["doc one", "doc two"]
+        assert context.tokens == 17 + 2 * estimate_tokens("doc one")
+
+    def test_sources_fill_remaining_budget_and_skip_oversized(self):
+        memory = ConversationMemory()
+        long_source = " ".join(["word"] * 50)
+
+        context = ContextBuilder(max_tokens=20).build(memory, [long_source, "short doc"])
+
+        assert context.sources == ["short doc"]
+        assert context.tokens == 2
+
+    def test_history_share_bounds_history_and_summarizes_the_rest(self):
+        memory = _memory(["refund policy", "shipping costs", "warranty claims", "returns"])
+        builder = ContextBuilder(max_tokens=100, history_share=0.4, summary_tokens=20)
+
+        context = builder.build(memory, ["doc"] * 3)
+
+        assert context.summary.startswith("Earlier topics: ")
+        assert context.history[-1].content == "Answer number 3"
+        assert len(context.history) < len(memory)
+        assert context.tokens <= 100
+        assert len(context.sources) == 3
+
+    def test_history_budget_below_summary_tokens_keeps_verbatim_history(self):
+        memory = _memory([f"topic {i}" for i in range(30)])
+        builder = ContextBuilder(max_tokens=60)
+
+        context = builder.build(memory, [])
+
+        assert builder.summary_tokens > 60
+        assert context.summary.startswith("Earlier topics: ")
+        assert context.history[-1].content == "Answer number 29"
+        assert context.tokens <= 60
+
+    def test_budget_holds_as_conversation_grows(self):
+        memory = ConversationMemory(max_history=1000)
+        builder = ContextBuilder(max_tokens=120)
+        for i in range(200):
+            memory.add_message("user", f"Question {i} about topic {i % 17}")
+            memory.add_message("assistant", "A fairly long answer " * (i % 5 + 1))
+            context = builder.build(memory, ["source text " * 10])
+            assert context.tokens <= 120
+
+    @pytest.mark.parametrize(
+        "kwargs", [{"max_tokens": 0}, {"history_share": -0.1}, {"history_share": 1.5}]
+    )
+    def test_invalid_arguments_raise(self, kwargs):
+        with pytest.raises(ValueError):
+            ContextBuilder(**kwargs)
@@ -0,0 +1,163 @@
+"""Tests for the persistent content-addressed embedding cache."""
+
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from conversational_rag.embedding_cache import EmbeddingCache, content_key
+from conversational_rag.encoders import HashingEncoder
+from conversational_rag.retriever import Retriever
+
+MODEL = "test-model"
+
+
+def _vectors(n, dim=4, offset=0.0):
+    return np.arange(n * dim, dtype=np.float32).reshape(n, dim) + offset
+
+
+class TestContentKey:
+    def test_is_stable_and_compact(self):
+        assert content_key("alpha") == content_key("alpha")
+        assert content_key("alpha") != content_key("beta")
+        assert len(content_key("alpha")) == 16
+
+
+class TestEmbeddingCache:
+    def test_put_then_get(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        cache.put(MODEL, ["a", "b"], _vectors(2))
+
+        positions, vectors = cache.get(MODEL, ["b", "x", "a"])
+
+        assert positions.tolist() == [0, 2]
+        np.testing.assert_array_equal(vectors, _vectors(2)[[1, 0]])
+        assert cache.stats() == {
+            "hits": 2,
+            "misses": 1,
+            "evictions": 0,
+            "size": 2,
+            "nbytes": 2 * (24 + 16),
+        }
+
+    def test_models_are_separate(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        cache.put(MODEL, ["a"], _vectors(1))
+
+        positions, _ = cache.get("other-model", ["a"])
+
+        assert positions.size == 0
+
+    def test_persists_across_instances_after_flush(self, tmp_path):
+        with EmbeddingCache(tmp_path) as cache:
+            cache.put(MODEL, ["a", "b"], _vectors(2))
+
+        positions, vectors = EmbeddingCache(tmp_path).get(MODEL, ["a", "b"])
+
+        assert positions.tolist() == [0, 1]
+        np.testing.assert_array_equal(vectors, _vectors(2))
+
+    def test_unflushed_entries_are_not_visible_to_other_instances(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        cache.put(MODEL, ["a"], _vectors(1))
+        cache.flush()
+        cache.put(MODEL, ["b"], _vectors(1, offset=1.0))
+
+        positions, _ = EmbeddingCache(tmp_path).get(MODEL, ["a", "b"])
+
+        assert positions.tolist() == [0]
+
+    def test_grows_beyond_initial_capacity(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        texts = [f"text {i}" for i in range(3000)]
+        cache.put(MODEL, texts, _vectors(3000))
+        cache.close()
+
+        positions, vectors = EmbeddingCache(tmp_path).get(MODEL, texts[::500])
+
+        assert len(positions) == 6
+        np.testing.assert_array_equal(vectors, _vectors(3000)[::500])
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = EmbeddingCache(tmp_path, max_entries=10)
+        texts = [f"text {i}" for i in range(10)]
+        cache.put(MODEL, texts, _vectors(10))
+        cache.get(MODEL, texts[:5])
+
+        cache.put(MODEL, ["new"], _vectors(1))
+
+        positions, _ = cache.get(MODEL, texts)
+        assert positions.tolist()[:5] == [0, 1, 2, 3, 4]
+        assert len(positions) == 8
+        assert cache.stats()["evictions"] == 2
+        assert len(cache) == 9
+
+    def test_evicted_rows_are_reused_consistently_after_reopen(self, tmp_path):
+        cache = EmbeddingCache(tmp_path, max_entries=4)
+        cache.put(MODEL, ["a", "b", "c", "d"], _vectors(4))
+        cache.put(MODEL, ["e"], _vectors(1, offset=100.0))
+
+        reopened = EmbeddingCache(tmp_path, max_entries=4)
+        positions, vectors = reopened.get(MODEL, ["a", "e"])
+
+        assert positions.tolist() == []
+        cache.flush()
+        positions, vectors = EmbeddingCache(tmp_path).get(MODEL, ["a", "e"])
+        assert positions.tolist() == [1]
+        np.testing.assert_array_equal(vectors, _vectors(1, offset=100.0))
+
+    def test_encode_only_calls_model_for_missing_texts(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        cache.put(MODEL, ["a"], _vectors(1))
+        encode = MagicMock(return_value=_vectors(1, offset=10.0))
+
+        vectors = cache.encode(MODEL, ["b", "a"], encode)
+
+        encode.assert_called_once_with(["b"])
+        np.testing.assert_array_equal(
+            vectors, np.concatenate([_vectors(1, offset=10.0), _vectors(1)])
+        )
+
+    def test_dimension_mismatch_raises(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        cache.put(MODEL, ["a"], _vectors(1))
+        with pytest.raises(ValueError):
+            cache.put(MODEL, ["b"], _vectors(1, dim=8))
+
+    def test_clear_removes_files(self, tmp_path):
+        cache = EmbeddingCache(tmp_path / "cache")
+        cache.put(MODEL, ["a"], _vectors(1))
+        cache.close()
+
+        cache.clear()
+
+        assert len(cache) == 0
+        assert not (tmp_path / "cache").exists()
+
+
+class TestRetrieverEmbeddingCache:
+    def test_rebuild_encodes_only_changed_text(self, tmp_path):
+        encoder = MagicMock(wraps=HashingEncoder(dim=16))
+        Retriever(encoder=encoder, embedding_cache=EmbeddingCache(tmp_path)).index(
+            ["alpha", "beta"]
+        )
+        encoder.encode.reset_mock()
+
+        retriever = Retriever(encoder=encoder, embedding_cache=EmbeddingCache(tmp_path))
+        retriever.index(["alpha", "beta", "gamma"])
+
+        encoder.encode.assert_called_once_with(["gamma"])
+        assert retriever.search("beta", top_k=1)[0][0] == "beta"
+
+    def test_fully_cached_build_does_not_load_model(self, tmp_path):
+        with EmbeddingCache(tmp_path) as cache:
+            cache.put("lazy-model", ["alpha"], _vectors(1))
+        registry = MagicMock()
+
+        retriever = Retriever(
+            model_name="lazy-model", registry=registry, embedding_cache=EmbeddingCache(tmp_path)
+        )
+        retriever.index(["alpha"])
+
+        registry.get.assert_not_called()
+        assert len(retriever) == 1
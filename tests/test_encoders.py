@@ -0,0 +1,148 @@
+"""Tests for the encoders module."""
+
+import pickle
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from conversational_rag.encoders import (
+    EncoderRegistry,
+    HashingEncoder,
+    OnnxEncoder,
+    SentenceTransformerEncoder,
+    default_registry,
+)
+
+
+class TestEncoderRegistry:
+    def test_loads_each_model_once(self):
+        loader = MagicMock(side_effect=lambda name: object())
+        registry = EncoderRegistry(loader=loader)
+
+        first = registry.get("a")
+        assert registry.get("a") is first
+        assert registry.get("b") is not first
+        assert loader.call_count == 2
+
+    def test_concurrent_gets_share_one_load(self):
+        started = threading.Event()
+
+        def slow_loader(name):
+            started.wait(0.05)
+            return object()
+
+        loader = MagicMock(side_effect=slow_loader)
+        registry = EncoderRegistry(loader=loader)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get("m"))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+
+        assert loader.call_count == 1
+        assert all(result is results[0] for result in results)
+
+    def test_default_loader_builds_sentence_transformer_encoders(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_load:
+            encoder = default_registry.get("m")
+            assert isinstance(encoder, SentenceTransformerEncoder)
+            assert encoder.model is mock_load.return_value
+            mock_load.assert_called_once_with("m")
+
+    def test_warm_up_encodes_once_and_pins_threads(self):
+        model = MagicMock()
+        registry = EncoderRegistry(loader=lambda _: model)
+
+        with patch("conversational_rag.encoders.set_num_threads") as mock_threads:
+            registry.warm_up(["m"], num_threads=2)
+
+        mock_threads.assert_called_once_with(2)
+        model.encode.assert_called_once()
+
+    def test_release_and_clear(self):
+        registry = EncoderRegistry(loader=lambda _: object())
+        registry.get("a")
+        registry.get("b")
+
+        assert registry.release("a") is True
+        assert registry.release("a") is False
+        assert "a" not in registry
+        registry.clear()
+        assert len(registry) == 0
+
+
+class TestSentenceTransformerEncoder:
+    def test_encode_disables_progress_bar(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_load:
+            SentenceTransformerEncoder("m").encode(("a", "b"))
+            mock_load.return_value.encode.assert_called_once_with(
+                ["a", "b"], show_progress_bar=False
+            )
+
+    def test_pickles_by_name(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_load:
+            mock_load.return_value = "weights"
+            clone = pickle.loads(pickle.dumps(SentenceTransformerEncoder("m")))
+            assert clone.model_name == "m"
+            assert mock_load.call_count == 2
+
+
+class TestHashingEncoder:
+    def test_is_deterministic_across_instances(self):
+        first = HashingEncoder().encode(["Refund policy"])
+        second = HashingEncoder().encode(["refund POLICY"])
+        np.testing.assert_array_equal(first, second)
+
+    def test_shared_words_increase_similarity(self):
+        a, b, c = HashingEncoder(dim=256).encode(["red apple pie", "red apple tart", "blue car"])
+        assert a @ b > a @ c
+
+    def test_seed_changes_embedding(self):
+        assert not np.array_equal(
+            HashingEncoder(seed=0).encode(["word"]), HashingEncoder(seed=1).encode(["word"])
+        )
+
+
+def _fake_onnx_modules(token_embeddings):
+    """Stand-ins for onnxruntime and tokenizers that return fixed token embeddings."""
+    session = MagicMock()
+    session.get_inputs.return_value = [
+        SimpleNamespace(name="input_ids"),
+        SimpleNamespace(name="attention_mask"),
+    ]
+    session.run.return_value = [token_embeddings]
+    onnxruntime = MagicMock()
+    onnxruntime.InferenceSession.return_value = session
+    tokenizer = MagicMock()
+    tokenizer.encode_batch.side_effect = lambda texts: [
+        SimpleNamespace(ids=[1, 2], attention_mask=[1, 1], type_ids=[0, 0]),
+        SimpleNamespace(ids=[1, 0], attention_mask=[1, 0], type_ids=[0, 0]),
+    ][: len(texts)]
+    tokenizers = MagicMock()
+    tokenizers.Tokenizer.from_file.return_value = tokenizer
+    return {"onnxruntime": onnxruntime, "tokenizers": tokenizers}, session
+
+
+class TestOnnxEncoder:
+    def test_mean_pools_over_attention_mask(self, tmp_path):
+        token_embeddings = np.array([[[1.0, 3.0], [3.0, 5.0]], [[2.0, 2.0], [9.0, 9.0]]])
+        modules, session = _fake_onnx_modules(token_embeddings)
+        with patch.dict(sys.modules, modules):
+            encoder = OnnxEncoder(tmp_path)
+            embeddings = encoder.encode(["long text", "short"])
+
+        np.testing.assert_allclose(embeddings, [[2.0, 4.0], [2.0, 2.0]])
+        feed = session.run.call_args.args[1]
+        assert set(feed) == {"input_ids", "attention_mask"}
+
+    def test_missing_runtime_raises_helpful_import_error(self, tmp_path):
+        with patch.dict(sys.modules, {"onnxruntime": None}), pytest.raises(ImportError):
+            OnnxEncoder(tmp_path)
@@ -0,0 +1,84 @@
+"""Tests for metadata filter indexes."""
+
+import pytest
+
+from conversational_rag.filters import MetadataIndex, filter_key
+
+METADATA = [
+    {"tenant": "acme", "year": 2021, "tags": ["billing", "faq"]},
+    {"tenant": "acme", "year": 2023},
+    {"tenant": "globex", "year": 2023, "tags": ["faq"]},
+    None,
+    {"tenant": "globex", "year": 2024.5, "draft": True},
+]
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex()
+    index.add(METADATA[:2])
+    index.add(METADATA[2:])
+    return index
+
+
+class TestMetadataIndex:
+    def test_counts_rows_across_appends(self, index):
+        assert index.num_rows == 5
+
+    def test_equality(self, index):
+        assert index.rows({"tenant": "acme"}).tolist() == [0, 1]
+
+    def test_unknown_value_matches_nothing(self, index):
+        assert index.rows({"tenant": "initech"}).tolist() == []
+        assert index.rows({"missing": 1}).tolist() == []
+
+    def test_list_valued_fields_match_any_item(self, index):
+        assert index.rows({"tags": "faq"}).tolist() == [0, 2]
+
+    def test_in_operator_and_list_shorthand(self, index):
+        assert index.rows({"tenant": {"$in": ["acme", "globex"]}}).tolist() == [0, 1, 2, 4]
+        assert index.rows({"year": [2021, 2024.5]}).tolist() == [0, 4]
+
+    def test_range_operators(self, index):
+        assert index.rows({"year": {"$gte": 2023}}).tolist() == [1, 2, 4]
+        assert index.rows({"year": {"$gt": 2021, "$lt": 2024}}).tolist() == [1, 2]
+
+    def test_booleans_are_not_numeric(self, index):
+        assert index.rows({"draft": True}).tolist() == [4]
+        assert index.rows({"draft": {"$gte": 0}}).tolist() == []
+
+    def test_conditions_are_combined_with_and(self, index):
+        assert index.rows({"tenant": "globex", "year": {"$lte": 2023}}).tolist() == [2]
+
+    def test_empty_filter_matches_every_row(self, index):
+        assert index.rows({}).tolist() == [0, 1, 2, 3, 4]
+
+    def test_list_valued_numeric_ranges_return_each_row_once(self):
+        index = MetadataIndex()
+        index.add([{"years": [2020, 2021]}, {"years": [2019]}, {"years": [2022, 2022]}])
+
+        assert index.rows({"years": {"$gte": 2020}}).tolist() == [0, 2]
+        assert index.rows({"years": 2022}).tolist() == [2]
+        assert index.rows({"years": {"$in": [2020, 2021], "$lte": 2022}}).tolist() == [0]
+
+    def test_empty_operator_condition_raises(self, index):
+        with pytest.raises(ValueError):
+            index.rows({"year": {}})
+
+    def test_unsupported_operator_raises(self, index):
+        with pytest.raises(ValueError):
+            index.rows({"year": {"$regex": "20.*"}})
+
+
+class TestFilterKey:
+    def test_is_independent_of_key_order(self):
+        assert filter_key({"a": 1, "b": {"$in": [1, 2]}}) == filter_key(
+            {"b": {"$in": [1, 2]}, "a": 1}
+        )
+
+    def test_is_hashable(self):
+        hash(filter_key({"tags": {"$in": ["x"]}, "year": {"$gte": 2020}}))
+
+    def test_empty_filter_is_none(self):
+        assert filter_key(None) is None
+        assert filter_key({}) is None
@@ -0,0 +1,56 @@
+"""Tests for chunking and streaming ingest helpers."""
+
+import pytest
+
+from conversational_rag.ingest import chunk_text, iter_batches, iter_chunks
+
+
+class TestChunkText:
+    def test_short_text_is_single_chunk(self):
+        assert chunk_text("a b c", chunk_size=5, overlap=1) == ["a b c"]
+
+    def test_blank_text_has_no_chunks(self):
+        assert chunk_text("   ", chunk_size=5, overlap=1) == []
+
+    def test_long_text_is_split_with_overlap(self):
+        text = " ".join(str(i) for i in range(10))
+        assert chunk_text(text, chunk_size=4, overlap=1) == ["0 1 2 3", "3 4 5 6", "6 7 8 9"]
+
+    def test_every_word_is_covered(self):
+        words = [f"w{i}" for i in range(23)]
+        chunks = chunk_text(" ".join(words), chunk_size=5, overlap=2)
+        covered = {word for chunk in chunks for word in chunk.split()}
+        assert covered == set(words)
+        assert all(len(chunk.split()) <= 5 for chunk in chunks)
+
+    def test_rejects_overlap_not_smaller_than_size(self):
+        with pytest.raises(ValueError):
+            chunk_text("a b c", chunk_size=3, overlap=3)
+
+
+class TestIterChunks:
+    def test_assigns_positional_parent_ids_to_bare_texts(self):
+        chunks = list(iter_chunks(["one", "two"], chunk_size=5, overlap=0))
+        assert chunks == [("0#0", "0", "one"), ("1#0", "1", "two")]
+
+    def test_uses_given_document_ids(self):
+        chunks = list(iter_chunks([("doc", "a b c d")], chunk_size=2, overlap=0))
+        assert chunks == [("doc#0", "doc", "a b"), ("doc#1", "doc", "c d")]
+
+    def test_consumes_generators_lazily(self):
+        consumed = []
+
+        def documents():
+            for i in range(3):
+                consumed.append(i)
+                yield f"doc {i}"
+
+        stream = iter_chunks(documents(), chunk_size=5, overlap=0)
+        next(stream)
+        assert consumed == [0]
+
+
+class TestIterBatches:
+    def test_groups_into_fixed_size_batches(self):
+        batches = list(iter_batches(iter(range(5)), batch_size=2))
+        assert batches == [[0, 1], [2, 3], [4]]
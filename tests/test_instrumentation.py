@@ -0,0 +1,103 @@
+"""Tests for the instrumentation module."""
+
+import time
+
+import pytest
+
+from conversational_rag.instrumentation import (
+    NULL_TRACE,
+    MetricsRegistry,
+    PrometheusMetrics,
+    SamplingProfiler,
+    Trace,
+)
+from conversational_rag.models import ConversationTurn
+
+
+class TestTrace:
+    def test_stages_accumulate(self):
+        trace = Trace()
+        with trace.stage("encode"):
+            pass
+        with trace.stage("encode"):
+            pass
+        with trace.stage("search"):
+            pass
+
+        assert set(trace.stages) == {"encode", "search"}
+        assert trace.total == pytest.approx(sum(trace.stages.values()))
+
+    def test_null_trace_records_nothing(self):
+        with NULL_TRACE.stage("encode"):
+            pass
+        assert NULL_TRACE.stages == {}
+
+
+class TestMetricsRegistry:
+    def test_counter_exposition(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.")
+        counter.inc()
+        counter.inc(2, route="search")
+
+        assert registry.export().splitlines() == [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            "requests_total 1",
+            'requests_total{route="search"} 2',
+        ]
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+        lines = registry.export().splitlines()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+        assert "latency_seconds_sum 5.55" in lines
+        assert "latency_seconds_count 3" in lines
+
+    def test_same_name_returns_same_metric(self):
+        registry = MetricsRegistry()
+        assert registry.counter("a", "A.") is registry.counter("a", "A.")
+
+    def test_name_cannot_change_kind(self):
+        registry = MetricsRegistry()
+        registry.counter("a", "A.")
+        with pytest.raises(TypeError):
+            registry.histogram("a", "A.")
+
+
+class TestPrometheusMetrics:
+    def test_records_queries_and_stage_latencies(self):
+        metrics = PrometheusMetrics()
+        turn = ConversationTurn(
+            user_query="q",
+            reformulated_query="q",
+            response="r",
+            timings={"encode": 0.002, "search": 0.001},
+        )
+        metrics.on_turn(turn)
+
+        assert metrics.registry.counter("rag_queries_total", "").value() == 1
+        assert metrics.registry.counter("rag_empty_results_total", "").value() == 1
+        assert metrics.registry.histogram("rag_stage_seconds", "").count(stage="encode") == 1
+        assert 'rag_stage_seconds_count{stage="search"} 1' in metrics.export()
+
+
+class TestSamplingProfiler:
+    def test_collects_samples_of_calling_thread(self):
+        def busy():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+        with SamplingProfiler(interval=0.001) as profiler:
+            busy()
+
+        assert not profiler.running
+        assert "busy" in profiler.collapsed()
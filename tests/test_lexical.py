@@ -0,0 +1,135 @@
+"""Tests for the lexical module."""
+
+import numpy as np
+
+from conversational_rag.lexical import (
+    BM25Index,
+    estimate_tokens,
+    reciprocal_rank_fusion,
+    tokenize,
+    weighted_fusion,
+)
+
+
+class TestTokenize:
+    def test_lowercases_and_keeps_codes_intact(self):
+        assert tokenize("Error ERR-404 in v2.1!") == ["error", "err-404", "in", "v2.1"]
+
+
+class TestEstimateTokens:
+    def test_counts_punctuation_and_splits_long_words(self):
+        # "internationalization" has 20 characters and counts as four subwords.
+        assert estimate_tokens("User: What is internationalization?") == 9
+
+    def test_empty_text(self):
+        assert estimate_tokens("") == 0
+
+
+class TestBM25Index:
+    def test_exact_code_match_ranks_first(self):
+        index = BM25Index()
+        index.build(["printer shows ERR-404", "printer is offline", "reset the router"])
+
+        rows, scores = index.search("err-404", k=3)
+
+        assert rows.tolist() == [0]
+        assert scores[0] > 0
+
+    def test_rarer_terms_weigh_more(self):
+        index = BM25Index()
+        index.build(["refund policy", "shipping policy", "policy overview"])
+
+        rows, _ = index.search("refund policy", k=3)
+
+        assert rows[0] == 0
+        assert len(rows) == 3
+
+    def test_postings_are_compact_arrays(self):
+        index = BM25Index()
+        index.build(["a b", "b c", "c c"])
+
+        assert index._doc_ids.dtype == np.int32
+        assert index._offsets.tolist() == [0, 1, 3, 5]
+        assert index._tfs.tolist() == [1.0, 1.0, 1.0, 1.0, 2.0]
+
+    def test_dead_rows_are_excluded(self):
+        index = BM25Index()
+        index.build(["alpha", "alpha beta"])
+
+        rows, _ = index.search("alpha", k=2, alive=np.array([False, True]))
+
+        assert rows.tolist() == [1]
+
+    def test_unknown_terms_return_nothing(self):
+        index = BM25Index()
+        index.build(["alpha"])
+
+        rows, scores = index.search("zeta", k=5)
+
+        assert len(rows) == 0
+        assert len(scores) == 0
+
+    def test_added_documents_score_like_a_full_build(self):
+        texts = [f"doc {i} alpha" if i % 3 else f"doc {i} beta alpha" for i in range(40)]
+        built = BM25Index()
+        built.build(texts)
+        grown = BM25Index()
+        grown.build(texts[:30])
+        for text in texts[30:]:
+            grown.add([text])
+
+        assert grown._delta
+        np.testing.assert_allclose(grown.scores("beta alpha"), built.scores("beta alpha"))
+
+    def test_delta_is_merged_once_it_outgrows_the_threshold(self):
+        index = BM25Index()
+        index.build(["alpha"] * 10)
+
+        index.add(["beta"] * 2)
+
+        assert not index._delta
+        assert sorted(index.search("beta", k=5)[0].tolist()) == [10, 11]
+
+    def test_compact_renumbers_rows_like_a_rebuild(self):
+        texts = ["alpha beta", "beta", "gamma alpha", "alpha alpha", "delta"]
+        index = BM25Index()
+        index.build(texts[:3])
+        index.add(texts[3:])
+
+        index.compact(np.array([0, 3, 4]))
+
+        rebuilt = BM25Index()
+        rebuilt.build([texts[0], texts[3], texts[4]])
+        assert index.num_docs == 3
+        np.testing.assert_allclose(index.scores("alpha delta"), rebuilt.scores("alpha delta"))
+
+    def test_empty_index(self):
+        index = BM25Index()
+        index.build([])
+
+        rows, _ = index.search("alpha", k=5)
+        assert len(rows) == 0
+
+
+class TestFusion:
+    def test_rrf_rewards_agreement(self):
+        rows, scores = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([2, 4])], k=2)
+
+        assert rows.tolist() == [2, 1]
+        assert scores[0] > scores[1]
+
+    def test_weighted_fusion_normalizes_scales(self):
+        dense = (np.array([0, 1]), np.array([0.9, 0.8]))
+        lexical = (np.array([1, 2]), np.array([12.0, 3.0]))
+
+        rows, _ = weighted_fusion([dense, lexical], [0.5, 0.5], k=3)
+
+        assert rows.tolist()[0] == 1
+        assert sorted(rows.tolist()) == [0, 1, 2]
+
+    def test_weighted_fusion_skips_empty_lists(self):
+        rows, _ = weighted_fusion(
+            [(np.array([3]), np.array([0.5])), (np.empty(0, dtype=int), np.empty(0))], [0.5, 0.5], 2
+        )
+
+        assert rows.tolist() == [3]
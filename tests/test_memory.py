@@ -1,6 +1,10 @@
 import time
+from unittest.mock import patch
 
-from conversational_rag.memory import ConversationMemory
+import pytest
+
+from conversational_rag.lexical import estimate_tokens
+from conversational_rag.memory import SUMMARY_PREFIX, ConversationMemory
 
 
 class TestConversationMemoryInit:
@@ -114,6 +118,13 @@ class TestClear:
         assert len(history) == 1
         assert history[0].content == "After clear"
 
+    def test_resets_topic(self):
+        memory = ConversationMemory()
+        memory.topic.key_phrases = ["pixel 8"]
+        memory.clear()
+        assert memory.topic.key_phrases == []
+        assert memory.topic.embedding is None
+
 
 class TestSummarizeHistory:
     def test_produces_text_summary(self):
@@ -135,3 +146,171 @@ class TestSummarizeHistory:
         memory.add_message("user", "Q2")
         summary = memory.summarize_history()
         assert summary == "User: Q1\nAssistant: A1\nUser: Q2"
+
+    def test_summary_is_joined_on_demand_and_cached_until_next_message(self):
+        memory = ConversationMemory()
+        memory.add_message("user", "Q1")
+        assert memory._summary is None
+
+        summary = memory.summarize_history()
+        assert memory.summarize_history() is summary
+
+        memory.add_message("assistant", "A1")
+        assert memory.summarize_history() == "User: Q1\nAssistant: A1"
+
+
+class TestRingBuffer:
+    def test_evicts_oldest_when_full(self):
+        memory = ConversationMemory(max_history=3)
+        for i in range(5):
+            memory.add_message("user", f"Message {i}")
+        assert [m.content for m in memory.get_history()] == ["Message 2", "Message 3", "Message 4"]
+        assert len(memory) == 3
+
+    def test_summary_tracks_evictions(self):
+        memory = ConversationMemory(max_history=2)
+        memory.add_message("user", "Q1")
+        memory.add_message("assistant", "A1")
+        memory.add_message("user", "Q2")
+        assert memory.summarize_history() == "Assistant: A1\nUser: Q2"
+
+    def test_summary_handles_multiline_content(self):
+        memory = ConversationMemory(max_history=2)
+        memory.add_message("user", "line one\nline two")
+        memory.add_message("assistant", "A1")
+        memory.add_message("user", "Q2")
+        assert memory.summarize_history() == "Assistant: A1\nUser: Q2"
+
+    def test_summary_resets_on_clear(self):
+        memory = ConversationMemory()
+        memory.add_message("user", "Q1")
+        memory.clear()
+        memory.add_message("user", "Q2")
+        assert memory.summarize_history() == "User: Q2"
+
+    def test_messages_use_slots(self):
+        memory = ConversationMemory()
+        memory.add_message("user", "Hello")
+        assert not hasattr(memory.get_history()[0], "__dict__")
+
+
+class TestWindow:
+    def test_window_views_recent_messages(self):
+        memory = ConversationMemory()
+        for i in range(5):
+            memory.add_message("user", f"Message {i}")
+        window = memory.window(2)
+        assert len(window) == 2
+        assert [m.content for m in window] == ["Message 3", "Message 4"]
+        assert [m.content for m in reversed(window)] == ["Message 4", "Message 3"]
+        assert window[-1].content == "Message 4"
+
+    def test_window_larger_than_history(self):
+        memory = ConversationMemory()
+        memory.add_message("user", "Only one")
+        assert len(memory.window(10)) == 1
+
+    def test_window_is_invalidated_by_mutation(self):
+        memory = ConversationMemory()
+        memory.add_message("user", "First")
+        window = memory.window(1)
+        memory.add_message("user", "Second")
+        with pytest.raises(RuntimeError):
+            list(window)
+
+
+class TestBudgetedContext:
+    def _memory(self, turns, **kwargs):
+        memory = ConversationMemory(**kwargs)
+        for i, topic in enumerate(turns):
+            memory.add_message("user", f"Tell me about {topic}")
+            memory.add_message("assistant", f"Answer number {i}")
+        return memory
+
+    def test_whole_history_fits_without_summary(self):
+        memory = self._memory(["refund policy"])
+
+        summary, messages, tokens = memory.budgeted_context(max_tokens=100)
+
+        assert summary == ""
+        assert [m.content for m in messages] == ["Tell me about refund policy", "Answer number 0"]
+        assert tokens == estimate_tokens(memory.summarize_history().replace("\n", " "))
+
+    def test_older_turns_are_rolled_into_summary(self):
+        memory = self._memory(["refund policy", "shipping costs", "warranty claims"])
+
+        summary, messages, tokens = memory.budgeted_context(max_tokens=40, summary_tokens=20)
+
+        assert summary == f"{SUMMARY_PREFIX}shipping costs; refund policy"
+        assert [m.content for m in messages] == [
+            "Answer number 1",
+            "Tell me about warranty claims",
+            "Answer number 2",
+        ]
+        assert tokens <= 40
+
+    def test_budget_smaller_than_summary_tokens_keeps_newest_messages(self):
+        memory = self._memory([f"topic {i}" for i in range(20)])
+
+        summary, messages, tokens = memory.budgeted_context(max_tokens=30, summary_tokens=64)
+
+        assert summary.startswith(SUMMARY_PREFIX)
+        assert estimate_tokens(summary) <= 15
+        assert messages[-1].content == "Answer number 19"
+        assert tokens <= 30
+
+    def test_messages_are_tokenized_lazily_and_once(self):
+        def message_calls(spy):
+            return sum(call.args[0].startswith(("User:", "Assistant:")) for call in spy.mock_calls)
+
+        with patch("conversational_rag.memory.estimate_tokens", wraps=estimate_tokens) as count:
+            memory = self._memory(["refund policy", "shipping costs", "warranty claims"])
+            assert count.call_count == 0
+            memory.budgeted_context(max_tokens=30, summary_tokens=12)
+            assert message_calls(count) == 6
+            memory.add_message("user", "Tell me about returns")
+            memory.budgeted_context(max_tokens=30, summary_tokens=12)
+            assert message_calls(count) == 7
+
+    def test_each_message_is_folded_once(self):
+        memory = self._memory(["refund policy", "shipping costs", "warranty claims"])
+        with patch(
+            "conversational_rag.memory.extract_key_phrases", return_value=["topic"]
+        ) as extract:
+            memory.budgeted_context(max_tokens=30, summary_tokens=12)
+            folded = extract.call_count
+            memory.budgeted_context(max_tokens=30, summary_tokens=12)
+            assert extract.call_count == folded > 0
+            memory.add_message("user", "Tell me about returns")
+            memory.add_message("assistant", "Answer number 3")
+            memory.budgeted_context(max_tokens=30, summary_tokens=12)
+            assert extract.call_count == folded + 1
+
+    def test_token_totals_follow_evictions(self):
+        memory = self._memory(["a", "b", "c", "d"], max_history=2)
+
+        summary, messages, _ = memory.budgeted_context(max_tokens=1000)
+
+        assert summary == ""
+        assert [m.content for m in messages] == ["Tell me about d", "Answer number 3"]
+
+    def test_cached_token_counts_stay_aligned_across_evictions(self):
+        memory = self._memory(["a", "b"], max_history=3)
+        memory.budgeted_context(max_tokens=1000)
+        for topic in ["a much longer topic about shipping", "e"]:
+            memory.add_message("user", f"Tell me about {topic}")
+
+        _, messages, tokens = memory.budgeted_context(max_tokens=1000)
+
+        lines = [f"{m.role.capitalize()}: {m.content}" for m in messages]
+        assert len(messages) == 3
+        assert tokens == sum(estimate_tokens(line) for line in lines)
+
+    def test_clear_resets_summary(self):
+        memory = self._memory(["refund policy", "shipping costs", "warranty claims"])
+        memory.budgeted_context(max_tokens=30, summary_tokens=12)
+
+        memory.clear()
+
+        assert memory.history_summary.key_phrases == []
+        assert memory.budgeted_context(max_tokens=30) == ("", [], 0)
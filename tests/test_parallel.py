@@ -0,0 +1,100 @@
+"""Tests for multi-process corpus embedding."""
+
+import numpy as np
+import pytest
+
+from conversational_rag.embedding_cache import EmbeddingCache
+from conversational_rag.encoders import HashingEncoder
+from conversational_rag.parallel import encode_parallel
+from conversational_rag.retriever import Retriever
+
+
+class LengthModel:
+    """Picklable stand-in model that embeds a text by its length."""
+
+    def encode(self, texts):
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+TEXTS = [f"document number {'x' * i}" for i in range(10)]
+
+
+def _expected(texts):
+    return LengthModel().encode(texts)
+
+
+class TestEncodeParallel:
+    def test_merges_shards_in_original_order(self):
+        embeddings = encode_parallel(
+            TEXTS, "stub", workers=2, shard_size=3, model_factory=LengthModel
+        )
+        np.testing.assert_array_equal(embeddings, _expected(TEXTS))
+
+    def test_empty_corpus(self):
+        assert encode_parallel([], "stub", model_factory=LengthModel).shape == (0, 0)
+
+    def test_resumes_from_checkpointed_shards(self, tmp_path):
+        encode_parallel(
+            TEXTS,
+            "stub",
+            workers=2,
+            shard_size=4,
+            checkpoint_dir=tmp_path,
+            model_factory=LengthModel,
+        )
+        # Mark a finished shard so a resumed build that reuses it is observable,
+        # and delete another to simulate an interrupted build.
+        np.save(tmp_path / "shard-000000.npy", np.full((4, 2), -1.0, dtype=np.float32))
+        (tmp_path / "shard-000001.npy").unlink()
+
+        embeddings = encode_parallel(
+            TEXTS,
+            "stub",
+            workers=2,
+            shard_size=4,
+            checkpoint_dir=tmp_path,
+            model_factory=LengthModel,
+        )
+
+        assert (embeddings[:4] == -1.0).all()
+        np.testing.assert_array_equal(embeddings[4:], _expected(TEXTS)[4:])
+
+    def test_rejects_checkpoints_of_another_corpus(self, tmp_path):
+        encode_parallel(
+            TEXTS, "stub", shard_size=4, checkpoint_dir=tmp_path, model_factory=LengthModel
+        )
+        with pytest.raises(ValueError):
+            encode_parallel(
+                TEXTS[:5], "stub", shard_size=4, checkpoint_dir=tmp_path, model_factory=LengthModel
+            )
+
+
+class TestRetrieverIndexParallel:
+    def test_index_parallel_builds_searchable_index(self):
+        retriever = Retriever(encoder=LengthModel())
+
+        retriever.index_parallel(TEXTS, workers=1, shard_size=3, model_factory=LengthModel)
+
+        assert retriever._documents == TEXTS
+        assert retriever._ids == [str(i) for i in range(len(TEXTS))]
+        assert len(retriever) == len(TEXTS)
+
+    def test_custom_encoder_is_shipped_to_workers(self):
+        retriever = Retriever(encoder=HashingEncoder(dim=8))
+
+        retriever.index_parallel(TEXTS, workers=1, shard_size=4)
+
+        np.testing.assert_allclose(
+            retriever._embeddings, retriever._normalize(HashingEncoder(dim=8).encode(TEXTS))
+        )
+
+    def test_index_parallel_reuses_cached_embeddings(self, tmp_path):
+        cache = EmbeddingCache(tmp_path)
+        cache.put("stub", TEXTS[:4], np.full((4, 2), -1.0, dtype=np.float32))
+        retriever = Retriever(model_name="stub", encoder=LengthModel(), embedding_cache=cache)
+
+        retriever.index_parallel(TEXTS, workers=1, shard_size=3, model_factory=LengthModel)
+
+        expected = np.concatenate([np.full((4, 2), -1.0), _expected(TEXTS[4:])])
+        np.testing.assert_allclose(retriever._embeddings, retriever._normalize(expected))
+        assert cache.stats()["size"] == len(TEXTS)
@@ -1,18 +1,28 @@
 """Tests for the ConversationalRAG pipeline."""
 
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import numpy as np
 import pytest
 
+from conversational_rag.cache import SemanticResultCache
+from conversational_rag.context import ContextBuilder
+from conversational_rag.encoders import HashingEncoder
 from conversational_rag.models import ConversationTurn, Message
 from conversational_rag.pipeline import ConversationalRAG
+from conversational_rag.rerank import Reranker
+from conversational_rag.retriever import Retriever
+from conversational_rag.sessions import SessionStore
+from conversational_rag.storage import SQLiteStore
 
 
 @pytest.fixture
 def mock_dependencies():
     """Mock SentenceTransformer to avoid loading real models."""
-    with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
+    with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
         mock_model = MagicMock()
         mock_model.encode.return_value = np.array([[0.1, 0.2]])
         mock_st.return_value = mock_model
@@ -24,6 +34,23 @@ def rag(mock_dependencies):
     return ConversationalRAG()
 
 
+class GatedEncoder(HashingEncoder):
+    """HashingEncoder whose next encode, once armed, blocks until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__(dim=32)
+        self.armed = False
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, texts):
+        if self.armed:
+            self.armed = False
+            self.started.set()
+            self.release.wait(timeout=5)
+        return super().encode(texts)
+
+
 class TestConversationalRAGInit:
     def test_initialization(self, rag):
         assert rag.memory is not None
@@ -33,6 +60,12 @@ class TestConversationalRAGInit:
     def test_initialization_creates_empty_state(self, rag):
         assert rag.get_history() == []
 
+    def test_accepts_prebuilt_retriever(self, mock_dependencies):
+        retriever = Retriever(model_name="custom-model")
+        rag = ConversationalRAG(retriever=retriever)
+        assert rag.retriever is retriever
+        assert rag.reformulator.model_name == "custom-model"
+
 
 class TestConversationalRAGIndex:
     def test_index_stores_documents(self, rag, mock_dependencies):
@@ -84,6 +117,144 @@ class TestConversationalRAGQuery:
         assert result.sources == []
 
 
+class TestConversationalRAGQueryBatch:
+    def test_query_batch_uses_single_search_encode(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]])
+        rag.index(["first doc", "second doc"])
+
+        mock_dependencies.encode.reset_mock()
+        mock_dependencies.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]])
+        turns = rag.query_batch(["question one", "question two"], top_k=1)
+
+        mock_dependencies.encode.assert_called_once()
+        assert [t.sources for t in turns] == [["first doc"], ["second doc"]]
+
+    def test_query_batch_records_turns_in_order(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2]])
+        rag.index(["doc"])
+
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2], [0.1, 0.2]])
+        rag.query_batch(["q1", "q2"])
+
+        history = rag.get_history()
+        assert [m.content for m in history if m.role == "user"] == ["q1", "q2"]
+
+
+class TestConversationalRAGAsync:
+    def test_aindex_indexes_documents(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2], [0.3, 0.4]])
+        asyncio.run(rag.aindex(["doc one", "doc two"]))
+        assert rag.retriever._documents == ["doc one", "doc two"]
+
+    def test_aquery_returns_conversation_turn(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]])
+        rag.index(["first doc", "second doc"])
+
+        mock_dependencies.encode.return_value = np.array([[0.0, 1.0]])
+        turn = asyncio.run(rag.aquery("question", top_k=1))
+
+        assert turn.sources == ["second doc"]
+        assert rag.get_history()[0].content == "question"
+
+    def test_thread_pool_executor_serves_aindex_and_aquery(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            rag = ConversationalRAG(
+                retriever=Retriever(encoder=HashingEncoder(dim=32)), executor=executor
+            )
+            asyncio.run(rag.aindex(["refund policy", "shipping times"]))
+            turn = asyncio.run(rag.aquery("refund policy", top_k=1))
+
+        assert turn.sources == ["refund policy"]
+
+    def test_aquery_serves_previous_documents_while_aindex_encodes(self):
+        encoder = GatedEncoder()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            rag = ConversationalRAG(retriever=Retriever(encoder=encoder), executor=executor)
+            rag.index(["refund policy", "shipping times"])
+            encoder.armed = True
+
+            async def run():
+                indexing = asyncio.create_task(rag.aindex(["warranty claims"]))
+                await asyncio.to_thread(encoder.started.wait, 5)
+                turn = await rag.aquery("refund policy", top_k=1)
+                encoder.release.set()
+                await indexing
+                return turn
+
+            turn = asyncio.run(run())
+
+        assert turn.sources == ["refund policy"]
+        assert rag.retriever._documents == ["warranty claims"]
+
+    def test_rejects_process_pool_executor(self, mock_dependencies):
+        with ProcessPoolExecutor(max_workers=1) as executor, pytest.raises(TypeError):
+            ConversationalRAG(executor=executor)
+
+    def test_concurrent_aqueries_share_one_encode(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]])
+        rag.index(["first doc", "second doc"])
+        mock_dependencies.encode.reset_mock()
+        mock_dependencies.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]])
+
+        async def run():
+            return await asyncio.gather(rag.aquery("one", top_k=1), rag.aquery("two", top_k=1))
+
+        turns = asyncio.run(run())
+
+        mock_dependencies.encode.assert_called_once()
+        assert [t.sources for t in turns] == [["first doc"], ["second doc"]]
+
+
+class TestConversationalRAGSessions:
+    def test_sessions_keep_separate_histories(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2]])
+        rag.index(["doc"])
+
+        rag.query("from alice", session_id="alice")
+        rag.query("from bob", session_id="bob")
+
+        assert rag.get_history("alice")[0].content == "from alice"
+        assert rag.get_history("bob")[0].content == "from bob"
+        assert rag.get_history() == []
+
+    def test_reformulation_uses_only_own_session(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2]])
+        rag.index(["doc"])
+
+        rag.query("Tell me about Python", session_id="alice")
+        turn = rag.query("What can it do?", session_id="bob")
+
+        assert turn.reformulated_query == "What can it do?"
+
+    def test_query_batch_uses_per_session_context(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2]])
+        rag.index(["doc"])
+        rag.query("Tell me about Python", session_id="alice")
+
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2], [0.1, 0.2]])
+        turns = rag.query_batch(
+            ["What can it do?", "What can it do?"], session_ids=["alice", "bob"]
+        )
+
+        assert "Tell me about Python" in turns[0].reformulated_query
+        assert turns[1].reformulated_query == "What can it do?"
+
+    def test_reset_clears_only_given_session(self, rag, mock_dependencies):
+        mock_dependencies.encode.return_value = np.array([[0.1, 0.2]])
+        rag.index(["doc"])
+        rag.query("q", session_id="alice")
+        rag.query("q", session_id="bob")
+
+        rag.reset("alice")
+
+        assert rag.get_history("alice") == []
+        assert len(rag.get_history("bob")) == 2
+
+    def test_sessions_share_one_retriever(self, rag):
+        assert rag.sessions.get("alice") is not rag.sessions.get("bob")
+        assert len(rag.sessions) >= 2
+
+
 class TestConversationalRAGSequentialQueries:
     def test_sequential_queries_maintain_history(self, rag, mock_dependencies):
         mock_dependencies.encode.return_value = np.array([[0.1, 0.2]])
@@ -111,6 +282,23 @@ class TestConversationalRAGGetHistory:
         assert len(history) >= 2
         assert all(isinstance(m, Message) for m in history)
 
+    def test_get_history_reads_persisted_sessions_after_reopening_store(self, tmp_path):
+        path = tmp_path / "messages.db"
+        retriever = Retriever(encoder=HashingEncoder(dim=32))
+        retriever.index(["refund policy"])
+        with SQLiteStore(path) as store:
+            rag = ConversationalRAG(retriever=retriever, sessions=SessionStore(store=store))
+            rag.query("refunds?", session_id="u1")
+            rag.query("and returns?", session_id="u1")
+
+        with SQLiteStore(path) as store:
+            rag = ConversationalRAG(retriever=retriever, sessions=SessionStore(store=store))
+            history = rag.get_history("u1")
+            assert "u1" not in rag.sessions
+
+        assert [m.content for m in history if m.role == "user"] == ["refunds?", "and returns?"]
+        assert len(history) == 4
+
 
 class TestConversationalRAGReset:
     def test_reset_clears_memory(self, rag, mock_dependencies):
@@ -123,3 +311,254 @@ class TestConversationalRAGReset:
         assert len(rag.get_history()) > 0
         rag.reset()
         assert rag.get_history() == []
+
+
+class TestConversationalRAGInstrumentation:
+    def _index(self, rag, mock_dependencies):
+        mock_dependencies.encode.side_effect = lambda texts, **_: np.ones((len(texts), 2))
+        rag.index(["doc one", "doc two"])
+
+    def test_timings_are_empty_by_default(self, rag, mock_dependencies):
+        self._index(rag, mock_dependencies)
+        assert rag.query("doc").timings == {}
+
+    def test_collect_timings_records_each_stage(self, mock_dependencies):
+        rag = ConversationalRAG(collect_timings=True)
+        self._index(rag, mock_dependencies)
+
+        turn = rag.query("doc")
+
+        assert set(turn.timings) == {"context", "reformulate", "encode", "search", "record"}
+        assert all(seconds >= 0 for seconds in turn.timings.values())
+
+    def test_async_query_records_timings(self, mock_dependencies):
+        rag = ConversationalRAG(collect_timings=True)
+        self._index(rag, mock_dependencies)
+
+        turn = asyncio.run(rag.aquery("doc"))
+
+        assert {"encode", "search"} <= set(turn.timings)
+
+    def test_metrics_hook_receives_every_turn(self, mock_dependencies):
+        hook = MagicMock()
+        rag = ConversationalRAG(metrics=hook)
+        self._index(rag, mock_dependencies)
+
+        rag.query_batch(["doc", "one"])
+
+        assert hook.on_turn.call_count == 2
+        assert "encode" in hook.on_turn.call_args.args[0].timings
+
+
+class CountingEncoder(HashingEncoder):
+    """Hashing encoder that records how many encode calls it served."""
+
+    def __init__(self):
+        super().__init__(dim=64)
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return super().encode(texts)
+
+
+class TestConversationalRAGSemanticReformulation:
+    DOCUMENTS = (
+        "Pixel 8 phone camera has a 50 MP sensor",
+        "Pixel 8 phone price starts at 699 dollars",
+        "Paris weather is mild in spring",
+    )
+
+    @pytest.fixture
+    def encoder(self):
+        return CountingEncoder()
+
+    @pytest.fixture
+    def semantic_rag(self, encoder):
+        rag = ConversationalRAG(
+            retriever=Retriever(encoder=encoder, query_cache_size=0), reformulation="semantic"
+        )
+        rag.index(list(self.DOCUMENTS))
+        return rag
+
+    def test_rejects_unknown_mode(self, mock_dependencies):
+        with pytest.raises(ValueError):
+            ConversationalRAG(reformulation="neural")
+
+    def test_elliptical_followup_uses_key_phrases(self, semantic_rag):
+        semantic_rag.query("Pixel 8 phone camera")
+
+        turn = semantic_rag.query("and the price?")
+
+        assert turn.reformulated_query == "Regarding pixel 8 phone camera: and the price?"
+        assert turn.sources[0] == self.DOCUMENTS[1]
+
+    def test_new_topic_is_not_reformulated(self, semantic_rag):
+        semantic_rag.query("Pixel 8 phone camera")
+
+        turn = semantic_rag.query("Paris weather in spring")
+
+        assert turn.reformulated_query == "Paris weather in spring"
+        assert semantic_rag.memory.topic.key_phrases == ["paris weather", "spring"]
+
+    def test_one_encode_per_turn(self, semantic_rag, encoder):
+        calls = encoder.calls
+        semantic_rag.query("Pixel 8 phone camera")
+        semantic_rag.query("and the price?")
+        assert encoder.calls == calls + 2
+
+    def test_topics_are_tracked_per_session(self, semantic_rag):
+        semantic_rag.query("Pixel 8 phone camera", session_id="a")
+
+        turn = semantic_rag.query("and the price?", session_id="b")
+
+        assert turn.reformulated_query == "and the price?"
+
+    def test_filter_restricts_sources(self, encoder):
+        rag = ConversationalRAG(retriever=Retriever(encoder=encoder))
+        metadata = [{"topic": "phone"}, {"topic": "phone"}, {"topic": "travel"}]
+        rag.index(list(self.DOCUMENTS), metadata=metadata)
+
+        turn = rag.query("Pixel 8 phone camera", top_k=3, filter={"topic": "travel"})
+
+        assert turn.sources == [self.DOCUMENTS[2]]
+
+    def test_query_batch_and_aquery_track_topics(self, semantic_rag, encoder):
+        calls = encoder.calls
+        turns = semantic_rag.query_batch(["Pixel 8 phone camera", "and the price?"])
+        assert encoder.calls == calls + 1
+        assert turns[1].reformulated_query.startswith("Regarding pixel 8 phone camera")
+
+        turn = asyncio.run(semantic_rag.aquery("also the colors?"))
+        assert turn.reformulated_query.startswith("Regarding ")
+
+
+class TestConversationalRAGReranking:
+    DOCUMENTS = (
+        "Pixel 8 phone camera review",
+        "Pixel 8 phone camera review",
+        "Pixel 8 phone battery review",
+        "Paris weather is mild in spring",
+    )
+
+    def _rag(self, **kwargs):
+        rag = ConversationalRAG(retriever=Retriever(encoder=HashingEncoder(dim=64)), **kwargs)
+        rag.index(list(self.DOCUMENTS))
+        return rag
+
+    def test_without_reranker_duplicates_fill_the_response(self):
+        turn = self._rag().query("Pixel 8 phone review", top_k=2)
+        assert turn.sources == [self.DOCUMENTS[0], self.DOCUMENTS[1]]
+
+    def test_mmr_reranking_diversifies_sources(self):
+        rag = self._rag(reranker=Reranker(shortlist_size=4))
+
+        turn = rag.query("Pixel 8 phone review", top_k=2)
+
+        assert turn.sources == [self.DOCUMENTS[0], self.DOCUMENTS[2]]
+
+    def test_cross_encoder_sees_only_the_shortlist(self):
+        cross_encoder = MagicMock()
+        cross_encoder.score.side_effect = lambda query, texts: np.zeros(len(texts))
+        reranker = Reranker(shortlist_size=3, cross_encoder=cross_encoder)
+        rag = self._rag(reranker=reranker, collect_timings=True)
+
+        turn = rag.query("Pixel 8 phone review", top_k=2)
+
+        assert len(cross_encoder.score.call_args.args[1]) == 3
+        assert len(turn.sources) == 2
+        assert "rerank" in turn.timings
+
+    def test_warm_up_loads_the_cross_encoder(self):
+        cross_encoder = MagicMock()
+        rag = self._rag(reranker=Reranker(cross_encoder=cross_encoder))
+
+        rag.warm_up()
+
+        cross_encoder.load.assert_called_once_with()
+
+    def test_batch_async_and_semantic_paths_rerank(self):
+        reranker = Reranker(shortlist_size=4)
+        expected = [self.DOCUMENTS[0], self.DOCUMENTS[2]]
+        for mode in ("pronoun", "semantic"):
+            rag = self._rag(reranker=reranker, reformulation=mode)
+            [turn] = rag.query_batch(["Pixel 8 phone review"], top_k=2)
+            assert turn.sources == expected
+            turn = asyncio.run(rag.aquery("Pixel 8 phone review", top_k=2, session_id="x"))
+            assert turn.sources == expected
+
+
+class TestConversationalRAGResultCache:
+    DOCUMENTS = (
+        "Refunds are issued within 14 days of purchase",
+        "Shipping takes three to five business days",
+    )
+
+    @pytest.fixture
+    def cached_rag(self):
+        rag = ConversationalRAG(
+            retriever=Retriever(encoder=HashingEncoder(dim=64)),
+            result_cache=SemanticResultCache(threshold=0.99),
+            collect_timings=True,
+        )
+        rag.index(list(self.DOCUMENTS))
+        return rag
+
+    def test_repeated_query_skips_search(self, cached_rag):
+        first = cached_rag.query("how do refunds work", top_k=1)
+        with patch.object(cached_rag.retriever, "search_embeddings") as search:
+            second = cached_rag.query("How do refunds  work?", top_k=1, session_id="other")
+
+        search.assert_not_called()
+        assert second.sources == first.sources == [self.DOCUMENTS[0]]
+        assert "cache" in second.timings
+        assert cached_rag.result_cache.stats()["hits"] == 1
+
+    def test_index_mutation_invalidates_entries(self, cached_rag):
+        cached_rag.query("how do refunds work", top_k=1)
+        cached_rag.retriever.add_documents(["How do refunds work: ask support"])
+
+        turn = cached_rag.query("how do refunds work", top_k=1)
+
+        assert turn.sources == ["How do refunds work: ask support"]
+
+    def test_batch_and_async_paths_use_cache(self, cached_rag):
+        cached_rag.query_batch(["how do refunds work", "shipping time"], top_k=1)
+        with patch.object(cached_rag.retriever, "search_embeddings") as search:
+            turn = asyncio.run(cached_rag.aquery("shipping time", top_k=1))
+
+        search.assert_not_called()
+        assert turn.sources == [self.DOCUMENTS[1]]
+
+
+class TestConversationalRAGContextBuilder:
+    DOCUMENTS = (
+        "Refunds are issued within 14 days of purchase",
+        "Shipping takes three to five business days",
+    )
+
+    def _rag(self, **kwargs):
+        rag = ConversationalRAG(retriever=Retriever(encoder=HashingEncoder(dim=64)), **kwargs)
+        rag.index(list(self.DOCUMENTS))
+        return rag
+
+    def test_context_is_empty_without_builder(self):
+        assert self._rag().query("refund window").context == ""
+
+    def test_context_combines_history_and_sources(self):
+        rag = self._rag(context_builder=ContextBuilder(max_tokens=200), collect_timings=True)
+        rag.query("refund window", top_k=1)
+
+        turn = rag.query("shipping time", top_k=1)
+
+        assert turn.context.startswith("User: refund window\nAssistant: ")
+        assert turn.context.endswith(f"Sources:\n- {self.DOCUMENTS[1]}")
+        assert "assemble" in turn.timings
+
+    def test_long_conversations_are_summarized(self):
+        rag = self._rag(context_builder=ContextBuilder(max_tokens=60, summary_tokens=16))
+        for topic in ("refund window", "store credit", "gift cards", "shipping time"):
+            turn = rag.query(f"what about {topic}", top_k=1)
+
+        assert turn.context.startswith("Earlier topics: ")
+        assert "refund window" not in turn.context.split("\n", 1)[1]
@@ -1,5 +1,7 @@
-from conversational_rag.models import Message
-from conversational_rag.reformulator import QueryReformulator
+import numpy as np
+
+from conversational_rag.models import Message, TopicState
+from conversational_rag.reformulator import QueryReformulator, extract_key_phrases
 
 
 class TestQueryReformulatorInit:
@@ -85,3 +87,77 @@ class TestReformulateWithHistory:
         # The topic portion should be at most 100 chars from the original
         assert long_content[:100] in result
         assert long_content[:101] not in result
+
+
+def _unit(values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestExtractKeyPhrases:
+    def test_splits_on_stopwords(self):
+        assert extract_key_phrases("What is the battery life of the Pixel 8?") == [
+            "battery life",
+            "pixel 8",
+        ]
+
+    def test_elliptical_query_keeps_content_word(self):
+        assert extract_key_phrases("and the price?") == ["price"]
+
+    def test_limits_phrase_count_and_length(self):
+        phrases = extract_key_phrases("alpha beta gamma delta epsilon of zeta of eta of theta", 2)
+        assert phrases == ["beta gamma delta epsilon", "zeta"]
+
+
+class TestTrack:
+    def test_first_query_starts_topic_unchanged(self):
+        reformulator = QueryReformulator()
+        topic = TopicState()
+        embedding = _unit([1.0, 0.0, 0.0])
+
+        text, search_embedding = reformulator.track("Pixel 8 camera", embedding, topic)
+
+        assert text == "Pixel 8 camera"
+        assert search_embedding is embedding
+        np.testing.assert_array_equal(topic.embedding, embedding)
+        assert topic.key_phrases == ["pixel 8 camera"]
+
+    def test_similar_query_is_followup_with_key_phrases(self):
+        reformulator = QueryReformulator()
+        previous = _unit([1.0, 0.0, 0.0])
+        topic = TopicState(embedding=previous, key_phrases=["pixel 8 camera"])
+        embedding = _unit([0.8, 0.6, 0.0])
+
+        text, search_embedding = reformulator.track("Is the zoom good?", embedding, topic)
+
+        assert text == "Regarding pixel 8 camera: Is the zoom good?"
+        np.testing.assert_allclose(np.linalg.norm(search_embedding), 1.0, rtol=1e-6)
+        assert search_embedding @ previous > embedding @ previous
+        assert topic.key_phrases == ["zoom good", "pixel 8 camera"]
+
+    def test_elliptical_query_is_followup_despite_low_similarity(self):
+        reformulator = QueryReformulator()
+        topic = TopicState(embedding=_unit([1.0, 0.0]), key_phrases=["pixel 8"])
+
+        text, _ = reformulator.track("and the price?", _unit([0.0, 1.0]), topic)
+
+        assert text == "Regarding pixel 8: and the price?"
+
+    def test_dissimilar_query_restarts_topic(self):
+        reformulator = QueryReformulator()
+        topic = TopicState(embedding=_unit([1.0, 0.0]), key_phrases=["pixel 8"])
+        embedding = _unit([0.0, 1.0])
+
+        text, _ = reformulator.track("Weather in Paris", embedding, topic)
+
+        assert text == "Weather in Paris"
+        np.testing.assert_array_equal(topic.embedding, embedding)
+        assert topic.key_phrases == ["weather", "paris"]
+
+    def test_skips_phrases_already_in_query(self):
+        reformulator = QueryReformulator()
+        topic = TopicState(embedding=_unit([1.0, 0.0]), key_phrases=["pixel 8"])
+
+        text, _ = reformulator.track("Pixel 8 price", _unit([1.0, 0.0]), topic)
+
+        assert text == "Pixel 8 price"
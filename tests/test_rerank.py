@@ -0,0 +1,172 @@
+"""Tests for the reranking stage."""
+
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from conversational_rag.rerank import (
+    Candidates,
+    CrossEncoder,
+    Reranker,
+    SentenceTransformerCrossEncoder,
+    maximal_marginal_relevance,
+)
+
+
+def _candidates(texts, scores, embeddings):
+    vectors = np.array(embeddings, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return Candidates(list(texts), np.array(scores, dtype=np.float32), vectors)
+
+
+class ReverseCrossEncoder(CrossEncoder):
+    """Scores texts in reverse order of arrival and records every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def score(self, query, texts):
+        self.calls.append(list(texts))
+        return np.arange(len(texts), dtype=np.float32)
+
+
+class TestMaximalMarginalRelevance:
+    def test_prefers_diverse_item_over_near_duplicate(self):
+        candidates = _candidates(
+            ["a", "a copy", "b"], [0.9, 0.89, 0.7], [[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]]
+        )
+
+        picked = maximal_marginal_relevance(candidates.scores, candidates.embeddings, 2, 0.5)
+
+        assert picked.tolist() == [0, 2]
+
+    def test_lambda_one_keeps_relevance_order(self):
+        candidates = _candidates(
+            ["a", "a copy", "b"], [0.9, 0.89, 0.7], [[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]]
+        )
+
+        picked = maximal_marginal_relevance(candidates.scores, candidates.embeddings, 3, 1.0)
+
+        assert picked.tolist() == [0, 1, 2]
+
+    def test_k_is_capped_by_candidates(self):
+        picked = maximal_marginal_relevance(np.ones(2), np.eye(2, dtype=np.float32), 5)
+        assert sorted(picked.tolist()) == [0, 1]
+
+    def test_empty_candidates(self):
+        picked = maximal_marginal_relevance(np.empty(0), np.empty((0, 2)), 3)
+        assert picked.tolist() == []
+
+
+class TestReranker:
+    def test_mmr_removes_near_duplicate(self):
+        candidates = _candidates(
+            ["a", "a copy", "b"], [0.9, 0.89, 0.7], [[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]]
+        )
+
+        results = Reranker(mmr_lambda=0.5).rerank("q", candidates, top_k=2)
+
+        assert [text for text, _ in results] == ["a", "b"]
+        assert results[0][1] == pytest.approx(0.9)
+
+    def test_cross_encoder_scores_only_the_shortlist_in_one_batch(self):
+        cross_encoder = ReverseCrossEncoder()
+        candidates = _candidates("abcd", [0.4, 0.3, 0.2, 0.1], np.eye(4))
+        reranker = Reranker(shortlist_size=3, mmr_lambda=None, cross_encoder=cross_encoder)
+
+        results = reranker.rerank("q", candidates, top_k=2)
+
+        assert cross_encoder.calls == [["a", "b", "c"]]
+        assert results == [("c", 2.0), ("b", 1.0)]
+
+    def test_latency_budget_limits_cross_scored_pairs(self):
+        cross_encoder = ReverseCrossEncoder()
+        candidates = _candidates("abcd", [0.4, 0.3, 0.2, 0.1], np.eye(4))
+        reranker = Reranker(mmr_lambda=None, cross_encoder=cross_encoder, latency_budget_ms=1000.0)
+        reranker.seconds_per_pair = 0.4
+
+        results = reranker.rerank("q", candidates, top_k=4)
+
+        assert cross_encoder.calls == [["a", "b"]]
+        assert [text for text, _ in results] == ["b", "a", "c", "d"]
+
+    def test_model_loading_is_excluded_from_latency_estimate(self):
+        class SlowLoadingCrossEncoder(ReverseCrossEncoder):
+            def __init__(self):
+                super().__init__()
+                self.loaded = False
+
+            def load(self):
+                if not self.loaded:
+                    time.sleep(0.2)
+                    self.loaded = True
+
+        cross_encoder = SlowLoadingCrossEncoder()
+        candidates = _candidates("abcd", [0.4, 0.3, 0.2, 0.1], np.eye(4))
+        reranker = Reranker(mmr_lambda=None, cross_encoder=cross_encoder, latency_budget_ms=50.0)
+
+        reranker.rerank("q", candidates, top_k=4)
+        reranker.rerank("q", candidates, top_k=4)
+
+        assert reranker.seconds_per_pair < 0.01
+        assert cross_encoder.calls == [["a", "b", "c", "d"]] * 2
+
+    def test_overrun_budget_still_scores_one_pair(self):
+        cross_encoder = ReverseCrossEncoder()
+        candidates = _candidates("abc", [0.3, 0.2, 0.1], np.eye(3))
+        reranker = Reranker(mmr_lambda=None, cross_encoder=cross_encoder, latency_budget_ms=1.0)
+        reranker.seconds_per_pair = 10.0
+
+        reranker.rerank("q", candidates, top_k=3)
+
+        assert cross_encoder.calls == [["a"]]
+        assert reranker.seconds_per_pair < 10.0
+
+    def test_shortlist_grows_to_top_k(self):
+        candidates = _candidates("abc", [0.3, 0.2, 0.1], np.eye(3))
+
+        results = Reranker(shortlist_size=1, mmr_lambda=None).rerank("q", candidates, top_k=3)
+
+        assert [text for text, _ in results] == ["a", "b", "c"]
+
+    def test_empty_candidates(self):
+        candidates = Candidates([], np.empty(0, dtype=np.float32), np.empty((0, 2)))
+        reranker = Reranker(cross_encoder=ReverseCrossEncoder())
+        assert reranker.rerank("q", candidates, top_k=3) == []
+
+    @pytest.mark.parametrize(
+        "kwargs", [{"shortlist_size": 0}, {"mmr_lambda": -0.1}, {"mmr_lambda": 1.5}]
+    )
+    def test_invalid_arguments_raise(self, kwargs):
+        with pytest.raises(ValueError):
+            Reranker(**kwargs)
+
+
+class TestSentenceTransformerCrossEncoder:
+    def test_loads_model_once_and_predicts_pairs(self):
+        module = MagicMock()
+        module.CrossEncoder.return_value.predict.return_value = [0.2, 0.8]
+        cross_encoder = SentenceTransformerCrossEncoder("custom-model")
+
+        with patch.dict(sys.modules, {"sentence_transformers": module}):
+            scores = cross_encoder.score("q", ["a", "b"])
+            cross_encoder.score("q", ["c"])
+
+        module.CrossEncoder.assert_called_once_with("custom-model")
+        pairs = module.CrossEncoder.return_value.predict.call_args_list[0].args[0]
+        assert pairs == [("q", "a"), ("q", "b")]
+        assert scores.tolist() == pytest.approx([0.2, 0.8])
+
+    def test_load_is_separate_from_scoring(self):
+        module = MagicMock()
+        cross_encoder = SentenceTransformerCrossEncoder("custom-model")
+
+        with patch.dict(sys.modules, {"sentence_transformers": module}):
+            cross_encoder.load()
+            cross_encoder.load()
+
+        module.CrossEncoder.assert_called_once_with("custom-model")
+        module.CrossEncoder.return_value.predict.assert_not_called()
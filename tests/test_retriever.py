@@ -3,23 +3,46 @@
 from unittest.mock import MagicMock, patch
 
 import numpy as np
+import pytest
 
+from conversational_rag.backends import BinaryBackend, Int8Backend, IVFBackend
+from conversational_rag.encoders import HashingEncoder
 from conversational_rag.retriever import Retriever
 
 
 class TestRetrieverInit:
     def test_default_model_name(self):
-        with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
-            Retriever()
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            retriever = Retriever()
+            assert retriever.encoder.model is mock_st.return_value
             mock_st.assert_called_once_with("all-MiniLM-L6-v2")
 
     def test_custom_model_name(self):
-        with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
-            Retriever(model_name="custom-model")
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            Retriever(model_name="custom-model").warm_up()
             mock_st.assert_called_once_with("custom-model")
 
+    def test_model_is_loaded_lazily(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            Retriever()
+            mock_st.assert_not_called()
+
+    def test_retrievers_share_one_model_per_name(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            first, second = Retriever(), Retriever()
+            assert first.encoder is second.encoder
+            mock_st.assert_called_once()
+
+    def test_custom_encoder_bypasses_registry(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            retriever = Retriever(encoder=HashingEncoder())
+            retriever.index(["refund policy", "shipping times"])
+
+            assert retriever.search("refund", top_k=1)[0][0] == "refund policy"
+            mock_st.assert_not_called()
+
     def test_initial_state_empty(self):
-        with patch("conversational_rag.retriever.SentenceTransformer"):
+        with patch("conversational_rag.encoders.load_sentence_transformer"):
             retriever = Retriever()
             assert retriever._documents == []
             assert retriever._embeddings is None
@@ -27,7 +50,7 @@ class TestRetrieverInit:
 
 class TestRetrieverIndex:
     def test_index_stores_documents(self):
-        with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
             mock_model = MagicMock()
             mock_model.encode.return_value = np.array([[0.1, 0.2], [0.3, 0.4]])
             mock_st.return_value = mock_model
@@ -38,12 +61,13 @@ class TestRetrieverIndex:
 
             assert retriever._documents == docs
             mock_model.encode.assert_called_once_with(docs, show_progress_bar=False)
-            np.testing.assert_array_equal(
-                retriever._embeddings, np.array([[0.1, 0.2], [0.3, 0.4]])
+            raw = np.array([[0.1, 0.2], [0.3, 0.4]])
+            np.testing.assert_allclose(
+                retriever._embeddings, raw / np.linalg.norm(raw, axis=1, keepdims=True), rtol=1e-6
             )
 
     def test_index_replaces_previous_documents(self):
-        with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
             mock_model = MagicMock()
             mock_model.encode.side_effect = [
                 np.array([[0.1, 0.2]]),
@@ -60,7 +84,7 @@ class TestRetrieverIndex:
 
 class TestRetrieverSearch:
     def _make_retriever_with_docs(self, docs, embeddings, query_embedding):
-        with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
             mock_model = MagicMock()
             mock_model.encode.side_effect = [
                 embeddings,  # index call
@@ -108,7 +132,7 @@ class TestRetrieverSearch:
         assert len(results) == 2
 
     def test_search_on_empty_index_returns_empty_list(self):
-        with patch("conversational_rag.retriever.SentenceTransformer") as mock_st:
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
             mock_model = MagicMock()
             mock_st.return_value = mock_model
 
@@ -139,3 +163,570 @@ class TestRetrieverSearch:
         results = retriever.search("query", top_k=10)
 
         assert len(results) == 2
+
+
+class TestRetrieverStorage:
+    def test_index_stores_normalized_contiguous_float32(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            mock_model = MagicMock()
+            mock_model.encode.return_value = np.array([[3.0, 4.0], [0.0, 2.0]], dtype=np.float64)
+            mock_st.return_value = mock_model
+
+            retriever = Retriever()
+            retriever.index(["doc one", "doc two"])
+
+            embeddings = retriever._embeddings
+            assert embeddings.dtype == np.float32
+            assert embeddings.flags.c_contiguous
+            np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), [1.0, 1.0], rtol=1e-6)
+
+    def test_index_supports_float16_storage(self):
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            mock_model = MagicMock()
+            mock_model.encode.side_effect = [
+                np.array([[1.0, 0.0], [0.0, 1.0]]),
+                np.array([[0.0, 1.0]]),
+            ]
+            mock_st.return_value = mock_model
+
+            retriever = Retriever(dtype="float16")
+            retriever.index(["a", "b"])
+
+            assert retriever._embeddings.dtype == np.float16
+            assert retriever.search("query", top_k=1)[0][0] == "b"
+
+    def test_rejects_unsupported_dtype(self):
+        with (
+            patch("conversational_rag.encoders.load_sentence_transformer"),
+            pytest.raises(ValueError),
+        ):
+            Retriever(dtype="int8")
+
+
+TEXT_VECTORS = {
+    "alpha": [1.0, 0.0],
+    "beta": [0.0, 1.0],
+    "gamma": [0.7, 0.7],
+    "delta": [0.9, 0.1],
+}
+
+
+def make_text_retriever(**kwargs):
+    """Build a Retriever whose mock model embeds texts via TEXT_VECTORS."""
+    mock_model = MagicMock()
+    mock_model.encode.side_effect = lambda texts, **_: np.array([TEXT_VECTORS[t] for t in texts])
+    return Retriever(encoder=mock_model, **kwargs), mock_model
+
+
+class TestRetrieverIncremental:
+    def test_index_assigns_positional_ids(self):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta"])
+        assert retriever._ids == ["0", "1"]
+
+    def test_add_documents_encodes_only_new_texts(self):
+        retriever, mock_model = make_text_retriever()
+        retriever.index(["alpha", "beta"])
+        ids = retriever.add_documents(["gamma"], ids=["g"])
+
+        assert ids == ["g"]
+        assert len(retriever) == 3
+        mock_model.encode.assert_called_with(["gamma"])
+
+    def test_add_documents_rejects_existing_id(self):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha"], ids=["a"])
+        with pytest.raises(ValueError):
+            retriever.add_documents(["beta"], ids=["a"])
+
+    def test_remove_documents_excludes_from_search(self):
+        retriever, _ = make_text_retriever(compaction_threshold=1.0)
+        retriever.index(["alpha", "beta", "delta"], ids=["a", "b", "d"])
+        assert retriever.remove_documents(["a", "missing"]) == 1
+
+        results = retriever.search("alpha", top_k=3)
+        assert [text for text, _ in results] == ["delta", "beta"]
+
+    def test_upsert_skips_unchanged_and_replaces_changed(self):
+        retriever, mock_model = make_text_retriever(compaction_threshold=1.0)
+        retriever.index(["alpha", "beta"], ids=["a", "b"])
+        mock_model.encode.reset_mock()
+
+        updated = retriever.upsert(["alpha", "gamma", "delta"], ids=["a", "b", "d"])
+
+        assert updated == ["b", "d"]
+        mock_model.encode.assert_called_once_with(["gamma", "delta"])
+        assert len(retriever) == 3
+
+    def test_compaction_drops_tombstones(self):
+        retriever, _ = make_text_retriever(compaction_threshold=0.0)
+        retriever.index(["alpha", "beta", "gamma"], ids=["a", "b", "g"])
+        retriever.remove_documents(["b"])
+
+        assert retriever._documents == ["alpha", "gamma"]
+        assert retriever._ids == ["a", "g"]
+        assert retriever._embeddings.shape == (2, 2)
+
+    def test_version_changes_on_every_mutation(self):
+        retriever, _ = make_text_retriever(compaction_threshold=1.0)
+        versions = [retriever.version]
+        retriever.index(["alpha"], ids=["a"])
+        versions.append(retriever.version)
+        retriever.add_documents(["beta"], ids=["b"])
+        versions.append(retriever.version)
+        retriever.remove_documents(["a"])
+        versions.append(retriever.version)
+
+        assert len(set(versions)) == len(versions)
+
+
+class TestRetrieverSearchBatch:
+    def test_search_batch_encodes_all_queries_in_one_call(self):
+        retriever, mock_model = make_text_retriever()
+        retriever.index(["alpha", "beta", "delta"])
+        mock_model.encode.reset_mock()
+
+        results = retriever.search_batch(["alpha", "beta"], top_k=1)
+
+        mock_model.encode.assert_called_once_with(["alpha", "beta"])
+        assert [r[0][0] for r in results] == ["alpha", "beta"]
+
+    def test_search_batch_matches_single_search(self):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta", "gamma", "delta"])
+
+        batch = retriever.search_batch(["delta", "gamma"], top_k=3)
+
+        assert batch == [retriever.search("delta", top_k=3), retriever.search("gamma", top_k=3)]
+
+    def test_search_batch_on_empty_index_returns_empty_lists(self):
+        retriever, _ = make_text_retriever()
+        assert retriever.search_batch(["alpha", "beta"]) == [[], []]
+
+
+class TestRetrieverPersistence:
+    def _load(self, path, **kwargs):
+        mock_model = MagicMock()
+        mock_model.encode.side_effect = lambda texts, **_: np.array(
+            [TEXT_VECTORS[t] for t in texts]
+        )
+        return Retriever.load(path, encoder=mock_model, **kwargs)
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta", "gamma"], ids=["a", "b", "g"])
+        retriever.save(tmp_path)
+
+        loaded = self._load(tmp_path)
+
+        assert loaded._ids == ["a", "b", "g"]
+        assert loaded._documents == ["alpha", "beta", "gamma"]
+        np.testing.assert_array_equal(loaded._embeddings, retriever._embeddings)
+        assert loaded.search("alpha", top_k=1)[0][0] == "alpha"
+
+    def test_load_memory_maps_embeddings_by_default(self, tmp_path):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta"])
+        retriever.save(tmp_path)
+
+        assert isinstance(self._load(tmp_path)._embeddings, np.memmap)
+        assert not isinstance(self._load(tmp_path, mmap=False)._embeddings, np.memmap)
+
+    def test_save_skips_removed_documents(self, tmp_path):
+        retriever, _ = make_text_retriever(compaction_threshold=1.0)
+        retriever.index(["alpha", "beta", "gamma"], ids=["a", "b", "g"])
+        retriever.remove_documents(["b"])
+        retriever.save(tmp_path)
+
+        loaded = self._load(tmp_path)
+        assert loaded._ids == ["a", "g"]
+        assert loaded._embeddings.shape == (2, 2)
+
+    def test_loaded_index_accepts_new_documents(self, tmp_path):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta"], ids=["a", "b"])
+        retriever.save(tmp_path)
+
+        loaded = self._load(tmp_path)
+        loaded.add_documents(["delta"], ids=["d"])
+
+        assert len(loaded) == 3
+        assert loaded.search("delta", top_k=1)[0][0] == "delta"
+
+    def test_load_rejects_unknown_format_version(self, tmp_path):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha"])
+        retriever.save(tmp_path)
+        manifest = tmp_path / "manifest.json"
+        content = manifest.read_text().replace('"format_version": 1', '"format_version": 99')
+        manifest.write_text(content)
+
+        with pytest.raises(ValueError):
+            self._load(tmp_path)
+
+
+class TestRetrieverCaching:
+    def test_repeated_query_skips_encoding(self):
+        retriever, mock_model = make_text_retriever()
+        retriever.index(["alpha", "beta"])
+        mock_model.encode.reset_mock()
+
+        first = retriever.search("alpha", top_k=1)
+        second = retriever.search("  alpha ", top_k=1)
+
+        assert first == second
+        mock_model.encode.assert_called_once_with(["alpha"])
+        assert retriever.query_cache.stats()["hits"] == 1
+
+    def test_batch_encodes_each_distinct_query_once(self):
+        retriever, mock_model = make_text_retriever()
+        retriever.index(["alpha", "beta"])
+        mock_model.encode.reset_mock()
+
+        retriever.search_batch(["beta", "alpha", "beta"], top_k=1)
+
+        mock_model.encode.assert_called_once_with(["beta", "alpha"])
+
+    def test_query_cache_can_be_disabled(self):
+        retriever, mock_model = make_text_retriever(query_cache_size=0)
+        retriever.index(["alpha", "beta"])
+        mock_model.encode.reset_mock()
+
+        retriever.search("alpha")
+        retriever.search("alpha")
+
+        assert retriever.query_cache is None
+        assert mock_model.encode.call_count == 2
+
+    def test_result_cache_is_invalidated_on_index_change(self):
+        retriever, _ = make_text_retriever(result_cache_size=8)
+        retriever.index(["alpha", "beta"], ids=["a", "b"])
+
+        assert retriever.search("delta", top_k=1)[0][0] == "alpha"
+        assert retriever.search("delta", top_k=1)[0][0] == "alpha"
+        assert retriever.result_cache.hits == 1
+
+        retriever.add_documents(["delta"], ids=["d"])
+        assert retriever.search("delta", top_k=1)[0][0] == "delta"
+
+
+class TestRetrieverBackend:
+    def test_ivf_backend_supports_incremental_updates(self):
+        retriever, _ = make_text_retriever(
+            backend=IVFBackend(n_lists=2, nprobe=2), compaction_threshold=1.0
+        )
+        retriever.index(["alpha", "beta", "gamma"], ids=["a", "b", "g"])
+        retriever.add_documents(["delta"], ids=["d"])
+        retriever.remove_documents(["a"])
+
+        results = retriever.search("alpha", top_k=2)
+        assert [text for text, _ in results] == ["delta", "gamma"]
+
+    def test_backend_is_rebuilt_after_compaction(self):
+        retriever, _ = make_text_retriever(
+            backend=IVFBackend(n_lists=2, nprobe=2), compaction_threshold=0.0
+        )
+        retriever.index(["alpha", "beta", "gamma"], ids=["a", "b", "g"])
+        retriever.remove_documents(["b"])
+
+        assert retriever.search("beta", top_k=1)[0][0] == "gamma"
+
+
+def make_length_retriever(**kwargs):
+    """Build a Retriever whose mock model embeds any text by its length."""
+    mock_model = MagicMock()
+    mock_model.encode.side_effect = lambda texts, **_: np.array(
+        [[float(len(text)), 1.0] for text in texts]
+    )
+    return Retriever(encoder=mock_model, **kwargs), mock_model
+
+
+class TestRetrieverIngest:
+    def test_ingest_chunks_streamed_documents(self):
+        retriever, _ = make_length_retriever()
+        documents = (text for text in ["a b c d e", "short"])
+
+        count = retriever.ingest(documents, chunk_size=3, overlap=1)
+
+        assert count == 3
+        assert retriever._ids == ["0#0", "0#1", "1#0"]
+        assert retriever._documents == ["a b c", "c d e", "short"]
+
+    def test_ingest_encodes_in_fixed_batches(self):
+        retriever, mock_model = make_length_retriever()
+        retriever.ingest([f"doc {i}" for i in range(5)], batch_size=2)
+
+        assert [len(call.args[0]) for call in mock_model.encode.call_args_list] == [2, 2, 1]
+
+    def test_ingesting_bare_texts_in_pieces_keeps_earlier_documents(self):
+        retriever, _ = make_length_retriever()
+
+        retriever.ingest(["doc A"])
+        retriever.ingest(["doc B"])
+
+        assert sorted(retriever._documents) == ["doc A", "doc B"]
+        assert len(set(map(retriever.parent_of, retriever._ids))) == 2
+
+    def test_chunks_map_to_parent_document(self):
+        retriever, _ = make_length_retriever()
+        retriever.ingest([("manual", "a b c d e")], chunk_size=3, overlap=1)
+
+        assert retriever.parent_of("manual#1") == "manual"
+        assert retriever.parent_of("missing") is None
+
+    def test_reingesting_document_replaces_its_chunks(self):
+        retriever, _ = make_length_retriever(compaction_threshold=1.0)
+        retriever.ingest([("manual", "a b c d e")], chunk_size=3, overlap=1)
+        retriever.ingest([("manual", "new text")], chunk_size=3, overlap=1)
+
+        assert len(retriever) == 1
+        assert retriever.search("x", top_k=5)[0][0] == "new text"
+
+    def test_remove_parents_removes_all_chunks(self):
+        retriever, _ = make_length_retriever()
+        retriever.ingest([("a", "one two three four"), ("b", "five")], chunk_size=2, overlap=0)
+
+        assert retriever.remove_parents(["a"]) == 2
+        assert retriever._documents == ["five"]
+
+    def test_parents_survive_save_and_load(self, tmp_path):
+        retriever, _ = make_length_retriever()
+        retriever.ingest([("manual", "a b c d e")], chunk_size=3, overlap=1)
+        retriever.save(tmp_path)
+
+        loaded = Retriever.load(tmp_path)
+        assert loaded.parent_of("manual#0") == "manual"
+
+    def test_lexical_search_on_loaded_index_never_loads_model(self, tmp_path):
+        retriever, _ = make_length_retriever()
+        retriever.index(["printer error", "router reset"])
+        retriever.save(tmp_path)
+
+        with patch("conversational_rag.encoders.load_sentence_transformer") as mock_st:
+            loaded = Retriever.load(tmp_path)
+            assert loaded.search("error", mode="lexical")[0][0] == "printer error"
+            mock_st.assert_not_called()
+
+
+class TestRetrieverHybrid:
+    def test_lexical_mode_skips_encoding(self):
+        retriever, mock_model = make_length_retriever()
+        retriever.index(["printer shows ERR-404", "printer is offline"])
+        mock_model.encode.reset_mock()
+
+        results = retriever.search("ERR-404", top_k=2, mode="lexical")
+
+        assert [text for text, _ in results] == ["printer shows ERR-404"]
+        mock_model.encode.assert_not_called()
+
+    def test_lexical_index_is_built_by_first_lexical_search(self):
+        retriever, _ = make_length_retriever()
+        retriever.index(["alpha", "beta"])
+
+        assert retriever._lexical is None
+        retriever.search("alpha", mode="lexical")
+        assert retriever._lexical.num_docs == 2
+
+    def test_updates_extend_lexical_index_without_rebuilding(self):
+        retriever, _ = make_length_retriever(compaction_threshold=0.3)
+        retriever.index(["alpha one", "beta", "gamma"], ids=["a", "b", "c"])
+        retriever.search("alpha", mode="lexical")
+        lexical = retriever._lexical
+
+        with patch.object(lexical, "build") as build:
+            retriever.add_documents(["alpha two"], ids=["d"])
+            retriever.upsert(["beta alpha"], ids=["b"])
+            retriever.remove_documents(["a", "c"])
+            results = retriever.search("alpha", top_k=5, mode="lexical")
+
+        build.assert_not_called()
+        assert retriever._lexical is lexical
+        assert retriever._num_deleted == 0
+        assert sorted(text for text, _ in results) == ["alpha two", "beta alpha"]
+
+    def test_lexical_mode_tracks_incremental_updates(self):
+        retriever, _ = make_length_retriever(compaction_threshold=1.0)
+        retriever.index(["alpha one", "beta"], ids=["a", "b"])
+        retriever.add_documents(["alpha two"], ids=["c"])
+        retriever.remove_documents(["a"])
+
+        results = retriever.search("alpha", top_k=5, mode="lexical")
+
+        assert [text for text, _ in results] == ["alpha two"]
+
+    def test_hybrid_mode_fuses_dense_and_lexical(self):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta", "gamma"])
+
+        results = retriever.search("alpha", top_k=2, mode="hybrid")
+
+        assert results[0][0] == "alpha"
+        assert len(results) == 2
+
+    def test_weighted_fusion(self):
+        retriever, _ = make_text_retriever(fusion="weighted", dense_weight=0.0)
+        retriever.index(["alpha", "beta"])
+
+        assert retriever.search("beta", top_k=1, mode="hybrid")[0][0] == "beta"
+
+    def test_invalid_mode_raises(self):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha"])
+
+        with pytest.raises(ValueError):
+            retriever.search("alpha", mode="sparse")
+
+    def test_invalid_fusion_raises(self):
+        with pytest.raises(ValueError):
+            make_text_retriever(fusion="max")
+
+    def test_result_cache_keys_include_mode(self):
+        retriever, _ = make_text_retriever(result_cache_size=8)
+        retriever.index(["alpha", "beta"])
+
+        dense = retriever.search("delta", top_k=1)
+        lexical = retriever.search("delta", top_k=1, mode="lexical")
+
+        assert dense[0][0] == "alpha"
+        assert lexical == []
+
+
+class TestRetrieverQuantization:
+    def test_int8_backend_returns_exact_scores(self):
+        retriever, _ = make_text_retriever(backend=Int8Backend())
+        retriever.index(["alpha", "beta", "gamma"])
+
+        results = retriever.search("alpha", top_k=1)
+
+        assert results[0][0] == "alpha"
+        assert results[0][1] == pytest.approx(1.0)
+
+    def test_binary_backend_rescores_memory_mapped_index(self, tmp_path):
+        retriever, _ = make_text_retriever()
+        retriever.index(["alpha", "beta", "gamma"])
+        retriever.save(tmp_path)
+
+        loaded = Retriever.load(tmp_path, backend=BinaryBackend(), encoder=retriever.encoder)
+
+        assert isinstance(loaded._buffer, np.memmap)
+        assert loaded.search("gamma", top_k=1)[0][0] == "gamma"
+
+
+class TestRetrieverFilters:
+    DOCUMENTS = ("alpha report", "alpha memo", "beta report", "beta memo")
+    METADATA = (
+        {"tenant": "acme", "year": 2022},
+        {"tenant": "globex", "year": 2023},
+        {"tenant": "acme", "year": 2024},
+        None,
+    )
+
+    def _retriever(self, **kwargs):
+        retriever = Retriever(encoder=HashingEncoder(dim=32), **kwargs)
+        retriever.index(list(self.DOCUMENTS), ids=list("abcd"), metadata=list(self.METADATA))
+        return retriever
+
+    def test_filter_restricts_dense_results_without_dropping_any(self):
+        retriever = self._retriever()
+
+        results = retriever.search("alpha memo", top_k=3, filter={"tenant": "acme"})
+
+        assert {text for text, _ in results} == {"alpha report", "beta report"}
+
+    def test_filter_scores_only_matching_rows(self):
+        retriever = self._retriever()
+
+        with patch("conversational_rag.retriever.score_subset") as score_subset:
+            score_subset.return_value = [(np.array([2]), np.array([0.5], dtype=np.float32))]
+            retriever.search("beta", top_k=2, filter={"year": {"$gte": 2024}})
+
+        assert score_subset.call_args.args[2].tolist() == [2]
+
+    def test_filter_applies_to_lexical_and_hybrid(self):
+        retriever = self._retriever()
+
+        lexical = retriever.search("alpha", top_k=5, mode="lexical", filter={"tenant": "globex"})
+        hybrid = retriever.search("alpha", top_k=5, mode="hybrid", filter={"tenant": "globex"})
+
+        assert [text for text, _ in lexical] == ["alpha memo"]
+        assert [text for text, _ in hybrid] == ["alpha memo"]
+
+    def test_filter_skips_removed_documents(self):
+        retriever = self._retriever(compaction_threshold=1.0)
+        retriever.remove_documents(["a"])
+
+        results = retriever.search("alpha", top_k=5, filter={"tenant": "acme"})
+
+        assert [text for text, _ in results] == ["beta report"]
+
+    def test_filter_tracks_additions_and_compaction(self):
+        retriever = self._retriever(compaction_threshold=0.0)
+        retriever.search("alpha", filter={"tenant": "acme"})
+        retriever.add_documents(["gamma"], ids=["e"], metadata=[{"tenant": "acme"}])
+        retriever.remove_documents(["c"])
+
+        results = retriever.search("alpha", top_k=5, filter={"tenant": "acme"})
+
+        assert {text for text, _ in results} == {"alpha report", "gamma"}
+
+    def test_upsert_metadata_only_reuses_embedding(self):
+        encoder = MagicMock(wraps=HashingEncoder(dim=32))
+        retriever = Retriever(encoder=encoder)
+        retriever.index(["alpha"], ids=["a"], metadata=[{"tenant": "acme"}])
+        encoder.encode.reset_mock()
+
+        assert retriever.upsert(["alpha"], ids=["a"], metadata=[{"tenant": "globex"}]) == []
+
+        encoder.encode.assert_not_called()
+        assert retriever.metadata_of("a") == {"tenant": "globex"}
+        assert retriever.search("alpha", filter={"tenant": "globex"})[0][0] == "alpha"
+
+    def test_upsert_without_metadata_keeps_existing(self):
+        retriever = self._retriever()
+
+        retriever.upsert(["alpha report v2"], ids=["a"])
+
+        assert retriever.metadata_of("a") == {"tenant": "acme", "year": 2022}
+
+    def test_metadata_survives_save_and_load(self, tmp_path):
+        self._retriever().save(tmp_path)
+
+        loaded = Retriever.load(tmp_path, encoder=HashingEncoder(dim=32))
+
+        assert loaded.metadata_of("b") == {"tenant": "globex", "year": 2023}
+        results = loaded.search("report", top_k=5, filter={"year": {"$lt": 2024}})
+        assert {text for text, _ in results} == {"alpha report", "alpha memo"}
+
+    def test_result_cache_keys_include_filter(self):
+        retriever = self._retriever(result_cache_size=8)
+
+        unfiltered = retriever.search("alpha", top_k=1)
+        filtered = retriever.search("alpha", top_k=1, filter={"tenant": "acme", "year": 2024})
+
+        assert unfiltered[0][0] != filtered[0][0]
+        assert filtered[0][0] == "beta report"
+
+    def test_shortlist_returns_candidate_embeddings(self):
+        retriever = self._retriever()
+        query = retriever.encode_queries(["alpha"])
+
+        [candidates] = retriever.shortlist(query, 3, filter={"tenant": "acme"})
+
+        assert set(candidates.texts) == {"alpha report", "beta report"}
+        expected = retriever.encode_queries(candidates.texts)
+        np.testing.assert_allclose(candidates.embeddings, expected, atol=1e-6)
+        [results] = retriever.search_embeddings(query, 3, filter={"tenant": "acme"})
+        assert candidates.texts == [text for text, _ in results]
+
+    def test_shortlist_of_empty_index(self):
+        retriever = Retriever(encoder=HashingEncoder(dim=32))
+
+        [candidates] = retriever.shortlist(np.ones((1, 32)), 3)
+
+        assert candidates.texts == []
+        assert candidates.embeddings.shape == (0, 32)
+
+    def test_metadata_length_mismatch_raises(self):
+        retriever = Retriever(encoder=HashingEncoder(dim=32))
+        with pytest.raises(ValueError):
+            retriever.index(["alpha"], metadata=[None, None])
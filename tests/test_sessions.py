@@ -0,0 +1,66 @@
+"""Tests for the multi-session conversation store."""
+
+from unittest.mock import patch
+
+import pytest
+
+from conversational_rag.sessions import SessionStore
+
+
+class TestSessionStore:
+    def test_rejects_non_positive_max_sessions(self):
+        with pytest.raises(ValueError):
+            SessionStore(max_sessions=0)
+
+    def test_get_creates_independent_memories(self):
+        store = SessionStore()
+        store.get("a").add_message("user", "hello from a")
+
+        assert store.get("b").get_history() == []
+        assert store.get("a").get_history()[0].content == "hello from a"
+        assert len(store) == 2
+
+    def test_get_returns_same_memory_for_same_session(self):
+        store = SessionStore()
+        assert store.get("a") is store.get("a")
+
+    def test_evicts_least_recently_used_beyond_max_sessions(self):
+        store = SessionStore(max_sessions=2)
+        store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+
+        assert "a" in store
+        assert "b" not in store
+        assert store.evictions == 1
+
+    def test_evicts_idle_sessions(self):
+        store = SessionStore(idle_ttl=10.0)
+        with patch("conversational_rag.sessions.time.monotonic", side_effect=[0.0, 15.0, 20.0]):
+            store.get("a")
+            store.get("b")
+            store.get("c")
+
+        assert "a" not in store
+        assert "b" in store
+
+    def test_global_message_cap_evicts_oldest_sessions(self):
+        store = SessionStore(max_total_messages=3)
+        for session_id in ["a", "b"]:
+            store.get(session_id).add_message("user", "hi")
+            store.get(session_id).add_message("assistant", "hello")
+            store.touch(session_id)
+
+        assert "a" not in store
+        assert "b" in store
+        assert store.total_messages == 2
+
+    def test_drop_removes_session(self):
+        store = SessionStore()
+        store.get("a").add_message("user", "hi")
+        store.touch("a")
+
+        assert store.drop("a")
+        assert not store.drop("a")
+        assert store.total_messages == 0
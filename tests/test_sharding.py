@@ -0,0 +1,93 @@
+"""Tests for the sharded, multi-process retriever."""
+
+import pytest
+
+from conversational_rag.encoders import HashingEncoder
+from conversational_rag.retriever import Retriever
+from conversational_rag.sharding import ShardedRetriever, merge_top_k
+
+DOCUMENTS = tuple(f"document {i} about topic {i % 7} and item {i % 13}" for i in range(60))
+METADATA = tuple({"group": i % 4} for i in range(60))
+QUERY = "topic 3 and item 4"
+
+
+def _encoder():
+    return HashingEncoder(dim=32)
+
+
+def _assert_same(results, expected):
+    assert [text for text, _ in results] == [text for text, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected])
+
+
+@pytest.fixture(scope="module")
+def reference():
+    retriever = Retriever(encoder=_encoder())
+    retriever.index(list(DOCUMENTS), metadata=list(METADATA))
+    return retriever
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    with ShardedRetriever(num_shards=3, encoder=_encoder()) as retriever:
+        retriever.index(list(DOCUMENTS), metadata=list(METADATA))
+        yield retriever
+
+
+class TestMergeTopK:
+    def test_merges_sorted_lists(self):
+        merged = merge_top_k([[("a", 0.9), ("c", 0.5)], [("b", 0.7), ("d", 0.1)], []], 3)
+        assert merged == [("a", 0.9), ("b", 0.7), ("c", 0.5)]
+
+    def test_k_larger_than_results(self):
+        assert merge_top_k([[("a", 0.9)], [("b", 0.7)]], 5) == [("a", 0.9), ("b", 0.7)]
+
+
+class TestShardedRetriever:
+    def test_matches_single_process_retriever(self, sharded, reference):
+        assert len(sharded) == len(DOCUMENTS)
+        _assert_same(sharded.search(QUERY, top_k=5), reference.search(QUERY, top_k=5))
+
+    def test_search_batch_and_filters(self, sharded, reference):
+        queries = [QUERY, "item 12"]
+        results = sharded.search_batch(queries, top_k=4, filter={"group": {"$in": [1, 2]}})
+        expected = reference.search_batch(queries, top_k=4, filter={"group": {"$in": [1, 2]}})
+        for found, wanted in zip(results, expected, strict=True):
+            _assert_same(found, wanted)
+
+    def test_rejects_non_dense_modes(self, sharded):
+        with pytest.raises(ValueError):
+            sharded.search(QUERY, mode="lexical")
+
+    def test_load_serves_saved_shards(self, tmp_path, reference):
+        with ShardedRetriever(num_shards=2, directory=tmp_path, encoder=_encoder()) as built:
+            built.index(list(DOCUMENTS), metadata=list(METADATA))
+
+        with ShardedRetriever.load(tmp_path, encoder=_encoder()) as loaded:
+            assert loaded.num_shards == 2
+            _assert_same(loaded.search(QUERY, top_k=3), reference.search(QUERY, top_k=3))
+        assert (tmp_path / "shards.json").exists()
+
+    def test_small_corpus_uses_fewer_shards_and_close_cleans_up(self):
+        retriever = ShardedRetriever(num_shards=4, encoder=_encoder())
+        retriever.index(["only doc"])
+        assert sorted(path.name for path in retriever.directory.iterdir()) == [
+            "shard-0000",
+            "shards.json",
+        ]
+        assert retriever.search("only doc", top_k=2)[0][0] == "only doc"
+
+        retriever.close()
+
+        assert not retriever.directory.exists()
+        assert retriever.search("only doc") == []
+
+    def test_mismatched_ids_raise(self):
+        retriever = ShardedRetriever(num_shards=1, encoder=_encoder())
+        with pytest.raises(ValueError):
+            retriever.index(["a", "b"], ids=["only-one"])
+        retriever.close()
+
+    def test_invalid_num_shards_raises(self):
+        with pytest.raises(ValueError):
+            ShardedRetriever(num_shards=-1)
@@ -0,0 +1,164 @@
+"""Tests for the persistent message stores and their use by ConversationMemory."""
+
+from unittest.mock import MagicMock
+
+from conversational_rag.memory import ConversationMemory
+from conversational_rag.models import Message
+from conversational_rag.sessions import SessionStore
+from conversational_rag.storage import InMemoryStore, SQLiteStore
+
+
+class TestInMemoryStore:
+    def test_load_recent_returns_tail_in_order(self):
+        store = InMemoryStore()
+        store.append("s", [Message(role="user", content=f"m{i}") for i in range(5)])
+        assert [m.content for m in store.load_recent("s", 2)] == ["m3", "m4"]
+
+    def test_count(self):
+        store = InMemoryStore()
+        store.append("s", [Message(role="user", content="hi")] * 3)
+        assert store.count("s") == 3
+        assert store.count("other") == 0
+
+    def test_delete_removes_session(self):
+        store = InMemoryStore()
+        store.append("s", [Message(role="user", content="hi")])
+        store.delete("s")
+        assert store.load_recent("s", 10) == []
+
+
+class TestSQLiteStore:
+    def test_persists_across_connections(self, tmp_path):
+        path = tmp_path / "messages.db"
+        with SQLiteStore(path) as store:
+            store.append("s", [Message(role="user", content="hello")])
+            store.append("s", [Message(role="assistant", content="hi")])
+
+        with SQLiteStore(path) as store:
+            messages = store.load_recent("s", 10)
+        assert [(m.role, m.content) for m in messages] == [("user", "hello"), ("assistant", "hi")]
+
+    def test_appends_are_buffered_until_flush(self, tmp_path):
+        store = SQLiteStore(tmp_path / "messages.db", flush_interval=60)
+        store.append("s", [Message(role="user", content="queued")])
+        count = store._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        assert count == 0
+
+        store.flush()
+        count = store._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        assert count == 1
+        store.close()
+
+    def test_load_recent_sees_pending_writes(self):
+        with SQLiteStore(":memory:", flush_interval=60) as store:
+            store.append("s", [Message(role="user", content=f"m{i}") for i in range(4)])
+            assert [m.content for m in store.load_recent("s", 2)] == ["m2", "m3"]
+
+    def test_count_includes_pending_writes(self):
+        with SQLiteStore(":memory:", flush_interval=60) as store:
+            store.append("s", [Message(role="user", content="written")])
+            store.flush()
+            store.append("s", [Message(role="user", content="queued")])
+            store.append("other", [Message(role="user", content="elsewhere")])
+            assert store.count("s") == 2
+
+    def test_workers_flushing_out_of_order_read_back_in_message_order(self, tmp_path):
+        path = tmp_path / "messages.db"
+        with SQLiteStore(path, flush_interval=60) as a, SQLiteStore(path, flush_interval=60) as b:
+            a.append("s", [Message(role="user", content="refund?", timestamp=1.0)])
+            b.append("s", [Message(role="user", content="shipping?", timestamp=2.0)])
+            a.append("s", [Message(role="user", content="and it?", timestamp=3.0)])
+            a.flush()
+            b.flush()
+
+            messages = a.load_recent("s", 10)
+
+        assert [m.content for m in messages] == ["refund?", "shipping?", "and it?"]
+
+    def test_sessions_are_isolated(self):
+        with SQLiteStore(":memory:") as store:
+            store.append("a", [Message(role="user", content="from a")])
+            store.append("b", [Message(role="user", content="from b")])
+            store.delete("a")
+            assert store.load_recent("a", 10) == []
+            assert store.load_recent("b", 10)[0].content == "from b"
+
+
+class TestMemoryWithStore:
+    def test_messages_are_persisted(self):
+        store = InMemoryStore()
+        memory = ConversationMemory(store=store, session_id="s")
+        memory.add_message("user", "hello")
+        assert store.load_recent("s", 10)[0].content == "hello"
+
+    def test_history_is_restored_by_new_memory(self):
+        store = InMemoryStore()
+        first = ConversationMemory(store=store, session_id="s")
+        first.add_message("user", "Q1")
+        first.add_message("assistant", "A1")
+
+        second = ConversationMemory(store=store, session_id="s")
+        assert [m.content for m in second.get_history()] == ["Q1", "A1"]
+        assert second.summarize_history() == "User: Q1\nAssistant: A1"
+
+    def test_context_window_loads_only_last_n(self):
+        store = InMemoryStore()
+        store.append("s", [Message(role="user", content=f"m{i}") for i in range(20)])
+        spy = MagicMock(wraps=store)
+
+        memory = ConversationMemory(store=spy, session_id="s")
+        window = memory.get_context_window(n=3)
+
+        assert [m.content for m in window] == ["m17", "m18", "m19"]
+        spy.load_recent.assert_called_once_with("s", 3)
+
+    def test_new_messages_follow_restored_history(self):
+        store = InMemoryStore()
+        store.append("s", [Message(role="user", content="old")])
+        memory = ConversationMemory(store=store, session_id="s")
+        memory.add_message("user", "new")
+        assert [m.content for m in memory.get_history()] == ["old", "new"]
+
+    def test_resident_history_picks_up_turns_written_by_another_worker(self, tmp_path):
+        path = tmp_path / "messages.db"
+        with SQLiteStore(path) as store_a, SQLiteStore(path) as store_b:
+            worker_a = ConversationMemory(store=store_a, session_id="s")
+            worker_b = ConversationMemory(store=store_b, session_id="s")
+            worker_a.add_message("user", "refund?")
+            worker_a.add_message("assistant", "30 days")
+            assert len(worker_a.get_history()) == 2
+            store_a.flush()
+
+            worker_b.add_message("user", "shipping?")
+            worker_b.add_message("assistant", "2 days")
+            store_b.flush()
+
+            window = worker_a.get_context_window(n=3)
+            worker_a.add_message("user", "and it?")
+            history = worker_a.get_history()
+
+        assert [m.content for m in window] == ["30 days", "shipping?", "2 days"]
+        assert [m.content for m in history] == [
+            "refund?",
+            "30 days",
+            "shipping?",
+            "2 days",
+            "and it?",
+        ]
+
+    def test_clear_deletes_persisted_history(self):
+        store = InMemoryStore()
+        memory = ConversationMemory(store=store, session_id="s")
+        memory.add_message("user", "hello")
+        memory.clear()
+        assert ConversationMemory(store=store, session_id="s").get_history() == []
+
+
+class TestSessionStoreWithStore:
+    def test_evicted_session_reloads_from_store(self):
+        sessions = SessionStore(max_sessions=1, store=InMemoryStore())
+        sessions.get("a").add_message("user", "remember me")
+        sessions.get("b")
+
+        assert "a" not in sessions
+        assert sessions.get("a").get_history()[0].content == "remember me"